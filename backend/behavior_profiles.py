@@ -0,0 +1,67 @@
+"""
+Timing models of bot.py's MaliciousBehavior and HumanBehavior, without any
+browser dependency.
+
+bot.py replays them through Selenium; the benchmarks use them to synthesize
+keystroke timings and to pace simulated users.
+"""
+
+import random
+from typing import Dict, Any, List, NamedTuple, Tuple
+
+Span = Tuple[float, float]  # uniform range, seconds
+
+class BehaviorProfile(NamedTuple):
+    name: str
+    key_delay_s: Span  # between keystrokes
+    space_pause_s: Span  # extra pause after a space
+    key_jitter_s: Span  # per-keystroke driver/OS noise on top of key_delay_s
+    key_dwell_s: Span  # key held down
+    think_s: Span  # before a click
+    after_click_s: Span  # after a click
+    action_interval_s: Span  # between consecutive actions
+
+HUMAN = BehaviorProfile(
+    name='human',
+    key_delay_s=(0.08, 0.15),  # 60-80 WPM
+    space_pause_s=(0.1, 0.3),
+    key_jitter_s=(0.0, 0.0),
+    key_dwell_s=(0.05, 0.13),
+    think_s=(0.2, 0.5),
+    after_click_s=(0.1, 0.3),
+    action_interval_s=(1.0, 4.0),  # reading between actions
+)
+
+MALICIOUS = BehaviorProfile(
+    name='malicious',
+    key_delay_s=(0.01, 0.01),  # 10 ms per char, ~600 WPM
+    space_pause_s=(0.0, 0.0),
+    key_jitter_s=(0.0, 0.0015),  # send_keys round trip
+    key_dwell_s=(0.0, 0.001),
+    think_s=(0.0, 0.0),
+    after_click_s=(0.0, 0.0),
+    action_interval_s=(0.05, 0.1),  # like spam every 50 ms, chat flood every 100 ms
+)
+
+PROFILES = {profile.name: profile for profile in (HUMAN, MALICIOUS)}
+
+def pause(span: Span, rng: random.Random = random) -> float:
+    return rng.uniform(*span)
+
+def keystroke_timings(
+    profile: BehaviorProfile,
+    text: str,
+    rng: random.Random = random,
+    start_ms: float = 0.0
+) -> Dict[str, List[Any]]:
+    """Raw key_down/key_up timestamps (ms) and keys for typing `text`."""
+    t = start_ms
+    key_down, key_up, keys = [], [], []
+    for char in text:
+        key_down.append(t)
+        key_up.append(t + pause(profile.key_dwell_s, rng) * 1000)
+        keys.append(char)
+        t += (pause(profile.key_delay_s, rng) + pause(profile.key_jitter_s, rng)) * 1000
+        if char == ' ':
+            t += pause(profile.space_pause_s, rng) * 1000
+    return {'key_down': key_down, 'key_up': key_up, 'keys': keys}
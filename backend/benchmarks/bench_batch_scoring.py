@@ -0,0 +1,63 @@
+"""
+Compare BehavioGuard per-dict scoring against the vectorized batch path.
+
+Usage (from backend/):
+    python -m benchmarks.bench_batch_scoring --samples 10000
+"""
+
+import argparse
+import random
+import time
+import numpy as np
+from services.behavioguard import BehavioGuard
+
+def generate_samples(n, seed=42):
+    """Synthetic behavioral samples with ~10% out-of-range values."""
+    rng = random.Random(seed)
+    samples = []
+    for _ in range(n):
+        sample = {
+            'typing_speed': rng.choice([rng.uniform(60, 150)] * 9 + [rng.uniform(250, 600)]),
+            'tap_pressure': rng.choice([rng.uniform(0.3, 0.8)] * 9 + [rng.uniform(0.95, 1.0)]),
+            'scroll_velocity': rng.choice([rng.uniform(100, 800)] * 9 + [rng.uniform(1500, 3000)]),
+        }
+        sample['device_fingerprint'] = f"fp-{rng.getrandbits(32):08x}" if rng.random() > 0.1 else None
+        samples.append(sample)
+    return samples
+
+def score_per_dict(behavioguard, samples):
+    # Same rules as score_batch, one dict at a time
+    for sample in samples:
+        behavioguard.analyze_behavioral_data(sample)
+        behavioguard.analyze_login(0, sample, '10.0.0.1', 'bench')
+
+def best_of(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark BehavioGuard batch scoring")
+    parser.add_argument("--samples", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    
+    behavioguard = BehavioGuard()
+    samples = generate_samples(args.samples)
+    columns = behavioguard.samples_to_columns(samples)
+    
+    per_dict = best_of(lambda: score_per_dict(behavioguard, samples), args.repeat)
+    packing = best_of(lambda: behavioguard.samples_to_columns(samples), args.repeat)
+    batch = best_of(lambda: behavioguard.score_batch(columns), args.repeat)
+    
+    n = args.samples
+    print(f"samples:                 {n}")
+    print(f"per-dict:                {n / per_dict:>14,.0f} samples/s")
+    print(f"score_batch:             {n / batch:>14,.0f} samples/s  ({per_dict / batch:.0f}x)")
+    print(f"pack + score_batch:      {n / (packing + batch):>14,.0f} samples/s  ({per_dict / (packing + batch):.0f}x)")
+
+if __name__ == "__main__":
+    main()
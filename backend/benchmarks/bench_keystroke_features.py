@@ -0,0 +1,79 @@
+"""
+Per-sample cost of keystroke feature extraction, and how well the features
+separate scripted typing (bot.py's fixed 10 ms sleep) from human typing.
+
+Usage (from backend/):
+    python -m benchmarks.bench_keystroke_features --samples 2000 --keys 80
+"""
+
+import argparse
+import random
+import time
+from behavior_profiles import HUMAN, MALICIOUS, keystroke_timings
+from services.behavioguard import BehavioGuard
+from services.keystroke import extract_keystroke_features
+
+TEXT = "the quick brown fox jumps over the lazy dog while the bot keeps typing "
+
+def typed_text(n_keys):
+    return (TEXT * (n_keys // len(TEXT) + 1))[:n_keys]
+
+def human_sample(rng, n_keys):
+    """HumanBehavior.human_type_natural: 80-150 ms per key, longer pauses at spaces."""
+    return keystroke_timings(HUMAN, typed_text(n_keys), rng)
+
+def bot_sample(rng, n_keys):
+    """MaliciousBehavior.bot_type_fast: send_keys then sleep(0.01), with driver jitter."""
+    return keystroke_timings(MALICIOUS, typed_text(n_keys), rng)
+
+def best_of(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark keystroke feature extraction")
+    parser.add_argument("--samples", type=int, default=2000)
+    parser.add_argument("--keys", type=int, default=80)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    
+    rng = random.Random(42)
+    humans = [human_sample(rng, args.keys) for _ in range(args.samples // 2)]
+    bots = [bot_sample(rng, args.keys) for _ in range(args.samples - len(humans))]
+    samples = humans + bots
+    
+    behavioguard = BehavioGuard()
+    
+    def extract_all():
+        for sample in samples:
+            extract_keystroke_features(sample['key_down'], sample['key_up'], sample['keys'])
+    
+    def extract_timings_only():
+        for sample in samples:
+            extract_keystroke_features(sample['key_down'], sample['key_up'])
+    
+    def analyze_all():
+        for sample in samples:
+            behavioguard.analyze_keystrokes(sample)
+    
+    n = len(samples)
+    full = best_of(extract_all, args.repeat)
+    timings_only = best_of(extract_timings_only, args.repeat)
+    analyze = best_of(analyze_all, args.repeat)
+    
+    flagged_humans = sum(1 for s in humans if behavioguard.analyze_keystrokes(s)[1])
+    flagged_bots = sum(1 for s in bots if 'robotic_keystroke_cadence' in behavioguard.analyze_keystrokes(s)[1])
+    
+    print(f"samples:                 {n} x {args.keys} keys")
+    print(f"extract (with digraphs): {full / n * 1e6:>10.1f} us/sample")
+    print(f"extract (timings only):  {timings_only / n * 1e6:>10.1f} us/sample")
+    print(f"analyze_keystrokes:      {analyze / n * 1e6:>10.1f} us/sample")
+    print(f"humans flagged:          {flagged_humans}/{len(humans)}")
+    print(f"bots flagged robotic:    {flagged_bots}/{len(bots)}")
+
+if __name__ == "__main__":
+    main()
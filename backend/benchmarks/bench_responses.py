@@ -0,0 +1,135 @@
+"""
+Throughput of the list endpoints whose cost is dominated by building and
+encoding the JSON body: the cached feed head, an older feed page read from
+the database and a conversation history page, all at their maximum page
+size.
+
+A closed loop of --concurrency clients hits each endpoint for --duration
+seconds against the app in-process (ASGI transport), so numbers include
+client overhead and are for before/after comparison on one machine.
+
+Usage (from backend/; seeds its own users, posts and messages):
+    python -m benchmarks.bench_responses --duration 10 --concurrency 16
+"""
+
+import argparse
+import asyncio
+import importlib
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Any, List
+import httpx
+import numpy as np
+from config import settings
+
+async def seed(posts: int, messages: int) -> Dict[str, Any]:
+    """Two users, `posts` feed posts and `messages` messages between them; returns ids and tokens."""
+    from sqlalchemy import delete, select
+    from sqlalchemy.dialects.postgresql import insert
+    from database import async_session_maker
+    from models.conversation import Conversation
+    from models.message import Message
+    from models.post import Post
+    from models.user import User
+    from services.conversations import record_message
+    from utils.auth import create_access_token, user_claims
+    
+    async with async_session_maker() as session:
+        stmt = insert(User).values([
+            dict(email=f"bench-responses-{index}@example.com", name=f"Bench {index}", password_hash='-')
+            for index in range(2)
+        ])
+        await session.execute(stmt.on_conflict_do_update(index_elements=[User.email], set_={'is_locked': False}))
+        result = await session.execute(
+            select(User).where(User.email.like('bench-responses-%')).order_by(User.email)
+        )
+        sender, receiver = result.scalars().all()
+        
+        await session.execute(delete(Post).where(Post.user_id == sender.id))
+        await session.execute(delete(Conversation).where(Conversation.user_id.in_([sender.id, receiver.id])))
+        await session.execute(delete(Message).where(Message.sender_id.in_([sender.id, receiver.id])))
+        now = datetime.utcnow()
+        await session.execute(insert(Post).values([
+            dict(user_id=sender.id, content=f"Benchmark post {index} " * 4, likes=index % 50,
+                 created_at=now - timedelta(minutes=index))
+            for index in range(posts)
+        ]))
+        for index in range(messages):
+            message = Message(
+                sender_id=(sender.id, receiver.id)[index % 2],
+                receiver_id=(receiver.id, sender.id)[index % 2],
+                text=f"Benchmark message number {index}",
+                is_read=True,
+                created_at=now - timedelta(seconds=index)
+            )
+            session.add(message)
+            await session.flush()
+            await record_message(session, message)
+        await session.commit()
+        
+        return {
+            'peer_id': receiver.id,
+            'headers': {'Authorization': f"Bearer {create_access_token(data=user_claims(sender))}"},
+        }
+
+async def measure(client: httpx.AsyncClient, url: str, headers: Dict[str, str], duration: float, concurrency: int) -> Dict[str, Any]:
+    latencies: List[float] = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+    
+    async def worker():
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            response = await client.get(url, headers=headers)
+            latencies.append(time.perf_counter() - started)
+            if response.status_code != 200:
+                errors += 1
+    
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    
+    ms = np.array(latencies) * 1000
+    return {
+        'requests': len(latencies),
+        'rps': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(float(np.percentile(ms, 50)), 2),
+        'p99_ms': round(float(np.percentile(ms, 99)), 2),
+        'errors': errors,
+    }
+
+async def main_async(args) -> Dict[str, Dict[str, Any]]:
+    app_module = importlib.import_module('main')
+    async with app_module.lifespan(app_module.app):
+        setup = await seed(args.posts, args.messages)
+        transport = httpx.ASGITransport(app=app_module.app)
+        async with httpx.AsyncClient(transport=transport, base_url='http://bench') as client:
+            feed_limit = settings.FEED_MAX_PAGE_SIZE
+            first_page = (await client.get(f"/api/posts?limit={feed_limit}", headers=setup['headers'])).json()
+            urls = {
+                'feed head (cached)': f"/api/posts?limit={feed_limit}",
+                'feed page 2 (db)': f"/api/posts?limit={feed_limit}&cursor={first_page['next_cursor']}",
+                'message history': f"/api/messages/{setup['peer_id']}?limit={settings.MESSAGES_MAX_PAGE_SIZE}",
+            }
+            results = {}
+            for name, url in urls.items():
+                await measure(client, url, setup['headers'], min(1.0, args.duration), args.concurrency)  # warm-up
+                results[name] = await measure(client, url, setup['headers'], args.duration, args.concurrency)
+            return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure feed and message list throughput")
+    parser.add_argument("--duration", type=float, default=10, help="seconds per endpoint")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--posts", type=int, default=500)
+    parser.add_argument("--messages", type=int, default=500)
+    args = parser.parse_args()
+    
+    results = asyncio.run(main_async(args))
+    print(f"\n{'endpoint':<22}{'requests':>10}{'rps':>10}{'p50 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    for name, row in results.items():
+        print(f"{name:<22}{row['requests']:>10}{row['rps']:>10}{row['p50_ms']:>10}{row['p99_ms']:>10}{row['errors']:>8}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,337 @@
+"""
+Load generator: thousands of simulated users whose traffic follows bot.py's
+behavior profiles (see behavior_profiles), against the app in-process over
+the ASGI transport or against a running server.
+
+Humans log in, then read the feed, like, post and chat at reading pace.
+Bots log in with scripted keystrokes, then flood chat, spam likes and
+scrape the feed. Per endpoint the report gives throughput and p50/p95/p99
+latency; 429s from the action rate limits are counted apart from errors.
+
+In-process, the generator and the app share one event loop, so latencies
+include client overhead; use --url against uvicorn for absolute numbers.
+
+Usage (from backend/):
+    python -m benchmarks.loadgen --users 2000 --bot-ratio 0.2 --duration 30 --seed-direct --bcrypt-rounds 4
+    python -m benchmarks.loadgen --url http://localhost:8000 --users 500 --duration 60
+"""
+
+import argparse
+import asyncio
+import importlib
+import json
+import random
+import time
+from collections import defaultdict
+from typing import Dict, Any, List, Optional
+import httpx
+import numpy as np
+from behavior_profiles import HUMAN, MALICIOUS, BehaviorProfile, pause, keystroke_timings
+
+PASSWORD = "LoadTest123!"
+
+POST_TEXTS = [
+    "Just finished a long run, feeling great",
+    "Anyone up for coffee later?",
+    "Reading a really good book this week",
+]
+
+CHAT_TEXTS = [
+    "Hello there!",
+    "This is a test message",
+    "Sending very quickly",
+    "Flooding the chat now",
+]
+
+# Action weights per profile
+HUMAN_MIX = {'feed': 0.45, 'like': 0.25, 'chat': 0.2, 'post': 0.1}
+BOT_MIX = {'chat_flood': 0.4, 'like_spam': 0.4, 'feed': 0.2}
+
+# test_malicious_chat_flooding sends 10 messages, test_malicious_like_spam clicks 20 times
+CHAT_FLOOD_SIZE = 10
+LIKE_SPAM_SIZE = 20
+
+class LatencyStats:
+    """Latencies and status codes per endpoint label."""
+    
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.statuses: Dict[str, Dict[int, int]] = defaultdict(lambda: defaultdict(int))
+    
+    def record(self, endpoint: str, status: int, elapsed_ms: float):
+        self.latencies[endpoint].append(elapsed_ms)
+        self.statuses[endpoint][status] += 1
+    
+    def report(self, duration_s: float) -> Dict[str, Dict[str, Any]]:
+        report = {}
+        for endpoint in sorted(self.latencies):
+            latencies = np.asarray(self.latencies[endpoint])
+            p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+            statuses = self.statuses[endpoint]
+            report[endpoint] = {
+                'requests': len(latencies),
+                'rps': round(len(latencies) / duration_s, 1),
+                'p50_ms': round(float(p50), 2),
+                'p95_ms': round(float(p95), 2),
+                'p99_ms': round(float(p99), 2),
+                'rate_limited': statuses.get(429, 0),
+                'errors': sum(count for status, count in statuses.items() if status >= 400 and status != 429),
+            }
+        return report
+
+class SimulatedUser:
+    """One account driven by a behavior profile until the deadline."""
+    
+    def __init__(self, index: int, profile: BehaviorProfile, client: httpx.AsyncClient,
+                 stats: LatencyStats, rng: random.Random, think_scale: float):
+        self.index = index
+        self.email = f"loadgen-{index}@example.com"
+        self.profile = profile
+        self.client = client
+        self.stats = stats
+        self.rng = rng
+        self.think_scale = think_scale
+        self.headers: Optional[Dict[str, str]] = None
+        self.user_id: Optional[int] = None
+        self.post_ids: List[int] = []
+    
+    async def request(self, endpoint: str, method: str, url: str, **kwargs) -> Optional[httpx.Response]:
+        start = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, headers=self.headers, **kwargs)
+        except httpx.HTTPError:
+            self.stats.record(endpoint, 599, (time.perf_counter() - start) * 1000)
+            return None
+        self.stats.record(endpoint, response.status_code, (time.perf_counter() - start) * 1000)
+        return response
+    
+    async def wait(self, span):
+        delay = pause(span, self.rng) * self.think_scale
+        if delay > 0:
+            await asyncio.sleep(delay)
+    
+    async def type_text(self, text: str) -> Dict[str, Any]:
+        """Keystroke timings for `text`, after waiting as long as typing it takes."""
+        timings = keystroke_timings(self.profile, text, self.rng)
+        if self.think_scale > 0 and timings['key_down']:
+            await asyncio.sleep(timings['key_down'][-1] / 1000 * self.think_scale)
+        return timings
+    
+    async def login(self) -> bool:
+        timings = await self.type_text(PASSWORD)
+        response = await self.request('POST /api/auth/login', 'POST', '/api/auth/login', json={
+            'email': self.email,
+            'password': PASSWORD,
+            'behavioral_data': {
+                # The login form reports password keydowns only
+                'key_down': timings['key_down'],
+                'device_fingerprint': f"loadgen-{self.profile.name}-{self.index}",
+            }
+        })
+        if response is None or response.status_code != 200:
+            return False
+        body = response.json()
+        if body.get('requires_challenge'):
+            self.headers = {'Authorization': f"Bearer {body['session_token']}"}
+            response = await self.request(
+                'POST /api/auth/verify-challenge', 'POST', '/api/auth/verify-challenge',
+                json={'challenge_type': 'captcha'}
+            )
+            if response is None or response.status_code != 200:
+                self.headers = None
+                return False
+            body = response.json()
+        self.headers = {'Authorization': f"Bearer {body['access_token']}"}
+        self.user_id = body['user']['id']
+        return True
+    
+    async def feed(self):
+        response = await self.request('GET /api/posts', 'GET', '/api/posts')
+        if response is not None and response.status_code == 200:
+            self.post_ids = [post['id'] for post in response.json()['posts']]
+    
+    async def like(self, count: int = 1):
+        if not self.post_ids:
+            await self.feed()
+        for _ in range(count):
+            if not self.post_ids:
+                return
+            await self.wait(self.profile.think_s)
+            await self.request('POST /api/posts/{id}/like', 'POST', f"/api/posts/{self.rng.choice(self.post_ids)}/like")
+            if count > 1:
+                await self.wait(self.profile.action_interval_s)
+    
+    async def post(self):
+        text = self.rng.choice(POST_TEXTS)
+        timings = await self.type_text(text)
+        await self.request('POST /api/posts', 'POST', '/api/posts', json={
+            'content': text,
+            'behavioral_data': {'key_down': timings['key_down'], 'keys': timings['keys']}
+        })
+    
+    async def chat(self, peer_ids: List[int], count: int = 1):
+        if not peer_ids:
+            return
+        receiver_id = self.rng.choice(peer_ids)
+        for _ in range(count):
+            text = self.rng.choice(CHAT_TEXTS)
+            await self.type_text(text)
+            await self.request('POST /api/messages', 'POST', '/api/messages', json={
+                'receiver_id': receiver_id,
+                'text': text
+            })
+            if count > 1:
+                await self.wait(self.profile.action_interval_s)
+    
+    async def run(self, deadline: float, peer_ids: List[int]):
+        """Log in, then act until the deadline; `peer_ids` collects every logged-in user."""
+        if not await self.login():
+            return
+        peer_ids.append(self.user_id)
+        mix = HUMAN_MIX if self.profile is HUMAN else BOT_MIX
+        actions, weights = list(mix), list(mix.values())
+        while time.monotonic() < deadline:
+            action = self.rng.choices(actions, weights)[0]
+            if action == 'feed':
+                await self.feed()
+            elif action == 'like':
+                await self.like()
+            elif action == 'post':
+                await self.post()
+            elif action == 'chat':
+                await self.chat(peer_ids)
+            elif action == 'chat_flood':
+                await self.chat(peer_ids, CHAT_FLOOD_SIZE)
+            elif action == 'like_spam':
+                await self.like(LIKE_SPAM_SIZE)
+            await self.wait(self.profile.action_interval_s)
+
+async def register_users(client: httpx.AsyncClient, count: int, concurrency: int) -> None:
+    """Create the accounts through the API; existing accounts are reused."""
+    semaphore = asyncio.Semaphore(concurrency)
+    
+    async def register(index: int):
+        async with semaphore:
+            while True:
+                response = await client.post('/api/auth/register', json={
+                    'email': f"loadgen-{index}@example.com",
+                    'password': PASSWORD,
+                    'name': f"Load {index}"
+                })
+                # The password pool sheds load with 503 + Retry-After
+                if response.status_code != 503:
+                    return
+                await asyncio.sleep(float(response.headers.get('retry-after', '1')))
+    
+    await asyncio.gather(*(register(index) for index in range(count)))
+
+async def seed_users(count: int, bcrypt_rounds: int) -> None:
+    """In-process only: upsert the accounts directly, sharing one password hash."""
+    import bcrypt
+    from sqlalchemy.dialects.postgresql import insert
+    from database import async_session_maker
+    from models.user import User
+    
+    password_hash = bcrypt.hashpw(PASSWORD.encode('utf-8'), bcrypt.gensalt(bcrypt_rounds)).decode('utf-8')
+    async with async_session_maker() as session:
+        for start in range(0, count, 1000):
+            stmt = insert(User).values([
+                dict(email=f"loadgen-{index}@example.com", name=f"Load {index}", password_hash=password_hash)
+                for index in range(start, min(start + 1000, count))
+            ])
+            await session.execute(stmt.on_conflict_do_update(
+                index_elements=[User.email],
+                set_={'password_hash': stmt.excluded.password_hash, 'is_locked': False}
+            ))
+        await session.commit()
+
+async def run_load(args, client: httpx.AsyncClient) -> Dict[str, Any]:
+    if args.seed_direct:
+        await seed_users(args.users, args.bcrypt_rounds)
+    else:
+        await register_users(client, args.users, args.setup_concurrency)
+    peer_ids: List[int] = []
+    
+    rng = random.Random(args.seed)
+    stats = LatencyStats()
+    n_bots = int(args.users * args.bot_ratio)
+    users = [
+        SimulatedUser(index, MALICIOUS if index < n_bots else HUMAN, client, stats,
+                      random.Random(rng.random()), args.think_scale)
+        for index in range(args.users)
+    ]
+    
+    start = time.monotonic()
+    deadline = start + args.duration
+    
+    async def launch(user: SimulatedUser, delay: float):
+        # Logins are spread over the ramp-up instead of arriving all at once
+        await asyncio.sleep(delay)
+        await user.run(deadline, peer_ids)
+    
+    await asyncio.gather(*(
+        launch(user, rng.uniform(0, args.ramp_up)) for user in users
+    ))
+    elapsed = time.monotonic() - start
+    
+    return {
+        'users': args.users,
+        'bots': n_bots,
+        'duration_s': round(elapsed, 1),
+        'requests': sum(len(latencies) for latencies in stats.latencies.values()),
+        'endpoints': stats.report(elapsed),
+    }
+
+async def main_async(args) -> Dict[str, Any]:
+    limits = httpx.Limits(max_connections=args.connections, max_keepalive_connections=args.connections)
+    timeout = httpx.Timeout(args.timeout)
+    if args.url:
+        async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=timeout) as client:
+            return await run_load(args, client)
+    
+    app_module = importlib.import_module('main')
+    async with app_module.lifespan(app_module.app):
+        # Unhandled app errors become 500s, as they would behind a real server
+        transport = httpx.ASGITransport(app=app_module.app, raise_app_exceptions=False)
+        async with httpx.AsyncClient(transport=transport, base_url='http://loadgen', timeout=timeout) as client:
+            return await run_load(args, client)
+
+def print_report(result: Dict[str, Any]):
+    print(f"\nusers: {result['users']} ({result['bots']} bots)   "
+          f"duration: {result['duration_s']} s   requests: {result['requests']}")
+    print(f"{'endpoint':<34}{'requests':>9}{'rps':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'429':>7}{'errors':>8}")
+    for endpoint, row in result['endpoints'].items():
+        print(f"{endpoint:<34}{row['requests']:>9}{row['rps']:>9}{row['p50_ms']:>9}"
+              f"{row['p95_ms']:>9}{row['p99_ms']:>9}{row['rate_limited']:>7}{row['errors']:>8}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Drive simulated human and bot users against the API")
+    parser.add_argument("--url", help="base URL of a running server (default: in-process ASGI)")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--bot-ratio", type=float, default=0.2)
+    parser.add_argument("--duration", type=float, default=30, help="seconds of traffic after ramp-up starts")
+    parser.add_argument("--ramp-up", type=float, default=10, help="seconds over which users log in")
+    parser.add_argument("--think-scale", type=float, default=1.0,
+                        help="multiplier on profile pauses (0 = no pauses, closed-loop max load)")
+    parser.add_argument("--connections", type=int, default=200, help="HTTP connection limit (--url only)")
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--setup-concurrency", type=int, default=32)
+    parser.add_argument("--seed-direct", action="store_true",
+                        help="in-process only: insert accounts directly instead of registering them")
+    parser.add_argument("--bcrypt-rounds", type=int, default=12,
+                        help="cost of the seeded password hash (lower it to take bcrypt out of login latency)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args()
+    
+    if args.seed_direct and args.url:
+        parser.error("--seed-direct needs the in-process app (no --url)")
+    
+    result = asyncio.run(main_async(args))
+    print_report(result)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(result, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,389 @@
+"""
+Micro-benchmark suite for the per-request hot paths: BehavioGuard scoring,
+RiskCalculator, JWT encode/decode, the model serializers and the typed
+response path of the list routes.
+
+Every case runs over a batch of synthetic inputs at realistic sizes (login
+keystrokes from the bot.py behavior profiles, mature per-user baselines,
+full-width rows) and reports the per-call time. Runs are appended to a
+history file; --compare checks the new run against the latest run from the
+same machine and exits 1 when any case got slower than --threshold.
+
+Usage (from backend/; DATABASE_URL must be set but no connection is made):
+    python -m benchmarks.suite                      # run and record
+    python -m benchmarks.suite --compare            # run, fail on regression
+    python -m benchmarks.suite --compare --cases serialize --threshold 0.1
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from typing import Callable, Dict, Any, List, Optional
+from jose import jwt
+from pydantic import TypeAdapter
+from behavior_profiles import HUMAN, MALICIOUS, keystroke_timings
+from config import settings
+from models.behavioral_data import serialize_behavioral_data
+from models.message import serialize_message
+from models.post import serialize_post
+from models.security_event import serialize_security_event
+from models.user import User
+from schemas import FeedPage, MessagePage
+from services.baseline_store import UserBaseline
+from services.behavioguard import BehavioGuard
+from services.risk_calculator import RiskCalculator
+from utils.auth import create_access_token, authenticate_token, user_claims
+from utils.principal_cache import principal_cache
+from utils.responses import ORJSONResponse
+
+HISTORY_PATH = os.path.join(os.path.dirname(__file__), 'history.jsonl')
+
+PASSWORD = "Test123!"
+POST_TEXT = "the quick brown fox jumps over the lazy dog while the bot keeps typing "
+
+# ============================================================================
+# SYNTHETIC DATA
+# ============================================================================
+
+def login_payloads(rng: random.Random, n: int) -> List[Dict[str, Any]]:
+    """Login form data: password keydowns plus the client-side summary fields."""
+    payloads = []
+    for i in range(n):
+        profile = MALICIOUS if i % 5 == 0 else HUMAN
+        timings = keystroke_timings(profile, PASSWORD, rng)
+        payloads.append({
+            'key_down': timings['key_down'],
+            'typing_speed': rng.uniform(250, 600) if profile is MALICIOUS else rng.uniform(40, 90),
+            'tap_pressure': rng.uniform(0.2, 0.8),
+            'device_fingerprint': f"device-{i % 50}",
+        })
+    return payloads
+
+def behavioral_samples(rng: random.Random, n: int, n_keys: int = 60) -> List[Dict[str, Any]]:
+    """Post composer samples: ~60 keystrokes with keys, taps and scrolls."""
+    samples = []
+    for i in range(n):
+        profile = MALICIOUS if i % 5 == 0 else HUMAN
+        timings = keystroke_timings(profile, POST_TEXT[:n_keys], rng)
+        samples.append({
+            **timings,
+            'tap_pressure': rng.uniform(0.2, 0.8),
+            'tap_duration': rng.uniform(60, 180),
+            'scroll_velocity': rng.uniform(100, 900),
+            'session_duration': rng.uniform(30, 900),
+        })
+    return samples
+
+def mature_baseline(rng: random.Random, user_id: int) -> UserBaseline:
+    baseline = UserBaseline(user_id)
+    for sample in behavioral_samples(rng, settings.BASELINE_MIN_SAMPLES * 4, n_keys=20):
+        baseline.update({**sample, 'typing_speed': rng.uniform(40, 90)})
+    return baseline
+
+def user_instances(n: int) -> List[User]:
+    now = datetime.utcnow()
+    return [
+        User(id=i, email=f"user{i}@example.com", name=f"User {i}", avatar='👤', is_admin=i % 100 == 0,
+             is_locked=False, security_score=50, token_version=0, created_at=now - timedelta(days=i % 365))
+        for i in range(1, n + 1)
+    ]
+
+def post_rows(rng: random.Random, n: int) -> List[SimpleNamespace]:
+    now = datetime.utcnow()
+    return [
+        SimpleNamespace(id=i, content=POST_TEXT, likes=rng.randint(0, 500), author=f"User {i % 97}",
+                        avatar='👤', created_at=now - timedelta(minutes=rng.randint(0, 10000)))
+        for i in range(n)
+    ]
+
+def message_rows(rng: random.Random, n: int) -> List[SimpleNamespace]:
+    now = datetime.utcnow()
+    return [
+        SimpleNamespace(id=i, text="Hello there, this is a test message", sender_id=i % 2 + 1,
+                        sender='me' if i % 2 == 0 else 'them', sender_name="User", is_read=bool(i % 3), created_at=now - timedelta(seconds=i * 30))
+        for i in range(n)
+    ]
+
+def security_event_rows(rng: random.Random, n: int) -> List[SimpleNamespace]:
+    now = datetime.utcnow()
+    return [
+        SimpleNamespace(id=i, user_id=i % 500, user_email=f"user{i % 500}@example.com", user_name="User",
+                        event_type='login', risk_score=rng.randint(0, 100), risk_level='medium',
+                        reason="Unusual typing speed", action_taken='allowed', ip_address='203.0.113.7',
+                        device_info={'user_agent': 'Mozilla/5.0'}, location=None,
+                        behavioral_signals=['inhuman_keystroke_speed', 'robotic_keystroke_cadence'],
+                        status='active', created_at=now - timedelta(minutes=rng.randint(0, 3000)))
+        for i in range(n)
+    ]
+
+def behavioral_data_rows(rng: random.Random, n: int) -> List[SimpleNamespace]:
+    now = datetime.utcnow()
+    return [
+        SimpleNamespace(id=i, typing_speed=rng.uniform(40, 90), tap_pressure=rng.uniform(0.2, 0.8),
+                        scroll_velocity=rng.uniform(100, 900), device_type='mobile', location=None,
+                        created_at=now - timedelta(minutes=i))
+        for i in range(n)
+    ]
+
+# ============================================================================
+# CASES
+# ============================================================================
+
+def build_cases(scale: int) -> Dict[str, Callable[[], int]]:
+    """Case name -> function that runs one batch and returns how many calls it made."""
+    rng = random.Random(42)
+    behavioguard = BehavioGuard()
+    
+    logins = login_payloads(rng, 20 * scale)
+    samples = behavioral_samples(rng, 20 * scale)
+    baselines = [mature_baseline(rng, user_id) for user_id in range(10)]
+    risk_inputs = [(rng.uniform(0, 100), rng.uniform(0, 100), rng.uniform(0, 100)) for _ in range(100 * scale)]
+    users = user_instances(100 * scale)
+    claims = [user_claims(user) for user in users]
+    tokens = [create_access_token(data=claim) for claim in claims]
+    posts = post_rows(rng, 100 * scale)
+    messages = message_rows(rng, 100 * scale)
+    events = security_event_rows(rng, 100 * scale)
+    behavioral_rows = behavioral_data_rows(rng, 100 * scale)
+    
+    def analyze_login():
+        for i, payload in enumerate(logins):
+            behavioguard.analyze_login(
+                user_id=i, behavioral_data=payload, ip_address='203.0.113.7',
+                device_info='Mozilla/5.0', baseline=baselines[i % len(baselines)]
+            )
+        return len(logins)
+    
+    def analyze_behavioral_data():
+        for i, sample in enumerate(samples):
+            behavioguard.analyze_behavioral_data(
+                sample, baseline=baselines[i % len(baselines)],
+                action_velocity={'message': 900.0, 'like': 400.0}
+            )
+        return len(samples)
+    
+    def composite_risk():
+        for behavioral, device, location in risk_inputs:
+            RiskCalculator.calculate_composite_risk(behavioral, device, location)
+        return len(risk_inputs)
+    
+    def jwt_encode():
+        for claim in claims:
+            create_access_token(data=claim)
+        return len(claims)
+    
+    def jwt_decode():
+        for token in tokens:
+            jwt.decode(token, settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
+        return len(tokens)
+    
+    # The authenticated-request hot path: decode plus a principal cache hit
+    loop = asyncio.new_event_loop()
+    
+    async def authenticate_all():
+        for token in tokens:
+            await authenticate_token(token, None)
+    
+    def authenticate_cached():
+        for user in users:
+            principal_cache.put(user)
+        loop.run_until_complete(authenticate_all())
+        return len(tokens)
+    
+    def serialize_users():
+        for user in users:
+            user.to_dict()
+        return len(users)
+    
+    def serialize_posts():
+        for row in posts:
+            serialize_post(row)
+        return len(posts)
+    
+    def serialize_messages():
+        for row in messages:
+            serialize_message(row, 1)
+        return len(messages)
+    
+    def serialize_security_events():
+        for row in events:
+            serialize_security_event(row)
+        return len(events)
+    
+    def serialize_behavioral():
+        for row in behavioral_rows:
+            serialize_behavioral_data(row)
+        return len(behavioral_rows)
+    
+    # The response path of the list routes: rows validated into the response
+    # model, dumped by pydantic-core and rendered with orjson; per row
+    feed_page = TypeAdapter(FeedPage)
+    message_page = TypeAdapter(MessagePage)
+    
+    def encode_feed_pages():
+        size = settings.FEED_MAX_PAGE_SIZE
+        for start in range(0, len(posts), size):
+            page = feed_page.validate_python({'posts': posts[start:start + size]})
+            ORJSONResponse(feed_page.dump_python(page, mode='json'))
+        return len(posts)
+    
+    def encode_message_pages():
+        size = settings.MESSAGES_MAX_PAGE_SIZE
+        for start in range(0, len(messages), size):
+            page = message_page.validate_python({'messages': messages[start:start + size]})
+            ORJSONResponse(message_page.dump_python(page, mode='json'))
+        return len(messages)
+    
+    return {
+        'behavioguard.analyze_login': analyze_login,
+        'behavioguard.analyze_behavioral_data': analyze_behavioral_data,
+        'risk_calculator.calculate_composite_risk': composite_risk,
+        'auth.jwt_encode': jwt_encode,
+        'auth.jwt_decode': jwt_decode,
+        'auth.authenticate_token_cached': authenticate_cached,
+        'serialize.user': serialize_users,
+        'serialize.post': serialize_posts,
+        'serialize.message': serialize_messages,
+        'serialize.security_event': serialize_security_events,
+        'serialize.behavioral_data': serialize_behavioral,
+        'response.feed_page': encode_feed_pages,
+        'response.message_page': encode_message_pages,
+    }
+
+# ============================================================================
+# RUNNER
+# ============================================================================
+
+def measure(batch: Callable[[], int], repeat: int, min_time: float) -> Dict[str, float]:
+    """Per-call microseconds: best and median over `repeat` timed rounds."""
+    batch()  # warm-up
+    rounds = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(rounds):
+            batch()
+        if time.perf_counter() - start >= min_time / 10 or rounds >= 1 << 16:
+            break
+        rounds *= 2
+    
+    per_call = []
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            calls = 0
+            start = time.perf_counter()
+            for _ in range(rounds):
+                calls += batch()
+            per_call.append((time.perf_counter() - start) / calls * 1e6)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    return {'min_us': round(min(per_call), 3), 'median_us': round(statistics.median(per_call), 3)}
+
+def machine_id() -> str:
+    return f"{platform.node()}/{platform.machine()}/{platform.python_implementation()}-{platform.python_version()}"
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def load_history(path: str) -> List[Dict[str, Any]]:
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def find_baseline(history: List[Dict[str, Any]], commit: Optional[str]) -> Optional[Dict[str, Any]]:
+    """Latest run from this machine, or from the given commit."""
+    for entry in reversed(history):
+        if entry['machine'] != machine_id():
+            continue
+        if commit is None or entry.get('commit') == commit:
+            return entry
+    return None
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """Print old vs new per case; returns the cases slower than baseline by more than threshold."""
+    regressions = []
+    print(f"\nvs {baseline.get('commit') or 'unknown commit'} ({baseline['timestamp']}), threshold +{threshold:.0%}")
+    print(f"{'case':<44}{'before us':>12}{'after us':>12}{'change':>10}")
+    for name, result in results.items():
+        before = baseline['results'].get(name)
+        if before is None:
+            print(f"{name:<44}{'-':>12}{result['min_us']:>12.3f}{'new':>10}")
+            continue
+        change = result['min_us'] / before['min_us'] - 1
+        flag = ''
+        if change > threshold:
+            regressions.append(name)
+            flag = '  REGRESSION'
+        print(f"{name:<44}{before['min_us']:>12.3f}{result['min_us']:>12.3f}{change:>+10.1%}{flag}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark BehavioGuard, auth and serializer hot paths")
+    parser.add_argument("--cases", help="only run cases whose name contains this substring")
+    parser.add_argument("--scale", type=int, default=10, help="batch size multiplier")
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--min-time", type=float, default=0.5, help="seconds of timed work per case")
+    parser.add_argument("--history", default=HISTORY_PATH)
+    parser.add_argument("--compare", action="store_true", help="fail when a case regressed vs the baseline run")
+    parser.add_argument("--baseline-commit", help="compare against this commit's latest run instead of the last run")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown before failing (0.25 = 25%%)")
+    parser.add_argument("--save", action="store_true", help="record the run even in --compare mode")
+    args = parser.parse_args()
+    
+    cases = build_cases(args.scale)
+    if args.cases:
+        cases = {name: batch for name, batch in cases.items() if args.cases in name}
+    
+    results = {}
+    print(f"{'case':<44}{'min us':>12}{'median us':>12}")
+    for name, batch in cases.items():
+        results[name] = measure(batch, args.repeat, args.min_time)
+        print(f"{name:<44}{results[name]['min_us']:>12.3f}{results[name]['median_us']:>12.3f}")
+    
+    history = load_history(args.history)
+    entry = {
+        'timestamp': datetime.utcnow().isoformat(timespec='seconds'),
+        'commit': git_commit(),
+        'machine': machine_id(),
+        'scale': args.scale,
+        'results': results,
+    }
+    
+    exit_code = 0
+    if args.compare:
+        baseline = find_baseline(history, args.baseline_commit)
+        if baseline is None:
+            print("\nNo baseline run from this machine to compare against")
+        else:
+            regressions = compare(results, baseline, args.threshold)
+            if regressions:
+                print(f"\n{len(regressions)} regression(s): {', '.join(regressions)}")
+                exit_code = 1
+    
+    if args.save or not args.compare:
+        with open(args.history, 'a') as f:
+            f.write(json.dumps(entry) + '\n')
+        print(f"\nRecorded in {args.history}")
+    
+    sys.exit(exit_code)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Checks read routing against a real primary and streaming replica: a user
+reads their own write right after making it, other users read from the
+replica, and a replica that can't be reached falls back to the primary
+instead of failing the request.
+
+Replay on the replica is paused while a message is sent, so which server
+answered is visible in the conversation list: the sender (inside the
+read-your-writes window) sees it, the receiver (on the replica) doesn't,
+and after the window expires the sender no longer sees it either until
+replay resumes (opening a conversation with nothing unread must not count
+as a write). An extra unreachable replica is configured alongside the
+real one; the first read that picks it must still succeed.
+
+Usage (from backend/; the replica must stream from the primary, e.g. set
+up with pg_basebackup -R, and the role needs to be able to pause replay):
+    python -m benchmarks.verify_replicas \\
+        --primary postgresql://postgres@/smoke?host=/tmp/pgdata \\
+        --replica "postgresql://postgres@/smoke?host=/tmp/pgreplica&port=5433"
+"""
+
+import argparse
+import asyncio
+import importlib
+import os
+import sys
+import time
+from uuid import uuid4
+
+async def wait_for_replay(primary, replica, timeout: float = 10):
+    """Block until the replica has replayed everything the primary has written so far."""
+    from sqlalchemy import text
+    
+    async with primary.connect() as conn:
+        lsn = (await conn.execute(text("SELECT pg_current_wal_lsn()::text"))).scalar_one()
+    deadline = time.monotonic() + timeout
+    async with replica.connect() as conn:
+        while not (await conn.execute(
+            text("SELECT pg_last_wal_replay_lsn() >= CAST(CAST(:lsn AS text) AS pg_lsn)"), {'lsn': lsn}
+        )).scalar_one():
+            if time.monotonic() > deadline:
+                raise RuntimeError("replica did not catch up; is it streaming from the primary?")
+            await asyncio.sleep(0.05)
+
+async def set_replay_paused(replica, paused: bool):
+    from sqlalchemy import text
+    
+    async with replica.connect() as conn:
+        await conn.execute(text("SELECT pg_wal_replay_pause()" if paused else "SELECT pg_wal_replay_resume()"))
+
+async def seed():
+    """Two users; returns their ids and auth headers."""
+    from sqlalchemy import select
+    from sqlalchemy.dialects.postgresql import insert
+    from database import async_session_maker
+    from models.user import User
+    from utils.auth import create_access_token, user_claims
+    
+    async with async_session_maker() as session:
+        stmt = insert(User).values([
+            dict(email=f"verify-replicas-{index}@example.com", name=f"Replica {index}", password_hash='-')
+            for index in range(2)
+        ])
+        await session.execute(stmt.on_conflict_do_update(index_elements=[User.email], set_={'is_locked': False}))
+        await session.commit()
+        result = await session.execute(
+            select(User).where(User.email.like('verify-replicas-%')).order_by(User.email)
+        )
+        users = result.scalars().all()
+        return [
+            (user.id, {'Authorization': f"Bearer {create_access_token(data=user_claims(user))}"})
+            for user in users
+        ]
+
+async def sees(client, headers, peer_id: int, text: str) -> bool:
+    response = await client.get("/api/messages/conversations", headers=headers)
+    if response.status_code != 200:
+        raise RuntimeError(f"conversation list returned {response.status_code}: {response.text}")
+    return any(
+        convo['id'] == peer_id and convo['last_message'] == text
+        for convo in response.json()['conversations']
+    )
+
+async def main_async(args) -> bool:
+    import httpx
+    import database
+    
+    app_module = importlib.import_module('main')
+    primary, replica = database.engine, database.replica_engines[0]
+    failures = []
+    
+    def check(name: str, ok: bool):
+        print(f"{'ok  ' if ok else 'FAIL'} {name}")
+        if not ok:
+            failures.append(name)
+    
+    async with app_module.lifespan(app_module.app):
+        (sender_id, sender), (receiver_id, receiver) = await seed()
+        await wait_for_replay(primary, replica)
+        transport = httpx.ASGITransport(app=app_module.app)
+        async with httpx.AsyncClient(transport=transport, base_url='http://verify') as client:
+            # Round-robin reaches the unreachable replica within two reads
+            statuses = [
+                (await client.get("/api/messages/conversations", headers=receiver)).status_code
+                for _ in range(2)
+            ]
+            check("reads succeed with an unreachable replica configured", statuses == [200, 200])
+            
+            await set_replay_paused(replica, True)
+            try:
+                text = f"replica check {uuid4().hex[:8]}"
+                response = await client.post(
+                    "/api/messages", headers=sender, json={'receiver_id': receiver_id, 'text': text}
+                )
+                check("message sent", response.status_code == 200)
+                check("sender reads their own write", await sees(client, sender, receiver_id, text))
+                check("receiver reads from the paused replica", not await sees(client, receiver, sender_id, text))
+                
+                await asyncio.sleep(args.window + 0.5)
+                # Nothing unread for the sender, so opening the conversation is not a write
+                await client.get(f"/api/messages/{receiver_id}", headers=sender)
+                check("sender reads from the replica after the window", not await sees(client, sender, receiver_id, text))
+            finally:
+                await set_replay_paused(replica, False)
+            
+            await wait_for_replay(primary, replica)
+            check("receiver sees the message once replay resumes", await sees(client, receiver, sender_id, text))
+    
+    return not failures
+
+def main():
+    parser = argparse.ArgumentParser(description="Verify replica read routing and primary fallback")
+    parser.add_argument("--primary", required=True, help="primary DATABASE_URL")
+    parser.add_argument("--replica", required=True, help="streaming replica of --primary")
+    parser.add_argument("--unreachable-replica", default="postgresql://postgres@127.0.0.1:1/postgres",
+                        help="replica URL nothing listens on")
+    parser.add_argument("--window", type=float, default=2, help="READ_YOUR_WRITES_SECONDS for the run")
+    args = parser.parse_args()
+    
+    # Settings are read at import time, so configure before the app is imported
+    os.environ['DATABASE_URL'] = args.primary
+    os.environ['DATABASE_REPLICA_URLS'] = f"{args.replica},{args.unreachable_replica}"
+    os.environ['READ_YOUR_WRITES_SECONDS'] = str(args.window)
+    os.environ['REPLICA_RETRY_SECONDS'] = '600'
+    
+    sys.exit(0 if asyncio.run(main_async(args)) else 1)
+
+if __name__ == "__main__":
+    main()
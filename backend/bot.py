@@ -24,6 +24,7 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.keys import Keys
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
 import undetected_chromedriver as uc
+from behavior_profiles import MALICIOUS, HUMAN, pause
 
 CONFIG = {
     "app_url": "http://localhost:8081",
@@ -43,7 +44,7 @@ class MaliciousBehavior:
         print(f"    → Bot typing at 250 WPM: '{text[:50]}...'")
         for char in text:
             element.send_keys(char)
-            time.sleep(0.01)  # 10ms per char = ~600 WPM!
+            time.sleep(pause(MALICIOUS.key_delay_s))  # 10ms per char = ~600 WPM!
     
     @staticmethod
     def bot_type_instant(element, text):
@@ -84,20 +85,20 @@ class HumanBehavior:
         """Type at 50-80 WPM with variance."""
         print(f"    → Human typing at 60 WPM: '{text}'")
         for char in text:
-            delay = random.uniform(0.08, 0.15)  # 60-80 WPM
+            delay = pause(HUMAN.key_delay_s)  # 60-80 WPM
             element.send_keys(char)
             time.sleep(delay)
             
             # Random pause at spaces
             if char == ' ':
-                time.sleep(random.uniform(0.1, 0.3))
+                time.sleep(pause(HUMAN.space_pause_s))
     
     @staticmethod
     def human_click_natural(driver, element):
         """Click with human-like delay."""
-        time.sleep(random.uniform(0.2, 0.5))  # Think before click
+        time.sleep(pause(HUMAN.think_s))  # Think before click
         element.click()
-        time.sleep(random.uniform(0.1, 0.3))  # Pause after
+        time.sleep(pause(HUMAN.after_click_s))  # Pause after
     
     @staticmethod
     def human_scroll_natural(driver, distance=500):
@@ -9,9 +9,74 @@ class Settings:
     JWT_ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 1440  # 24 hours
     REFRESH_TOKEN_EXPIRE_DAYS: int = 30
+    AUTH_CACHE_SIZE: int = int(os.getenv('AUTH_CACHE_SIZE', '10000'))
+    AUTH_CACHE_TTL_SECONDS: float = float(os.getenv('AUTH_CACHE_TTL_SECONDS', '30'))
+    
+    # Password hashing pool ('thread' or 'process')
+    PASSWORD_HASH_EXECUTOR: str = os.getenv('PASSWORD_HASH_EXECUTOR', 'thread')
+    PASSWORD_HASH_WORKERS: int = int(os.getenv('PASSWORD_HASH_WORKERS', '4'))
+    PASSWORD_HASH_MAX_QUEUE: int = int(os.getenv('PASSWORD_HASH_MAX_QUEUE', '64'))
     
     # Database - Neon PostgreSQL
     DATABASE_URL: str = os.getenv('DATABASE_URL', '')
+    DB_ECHO: bool = os.getenv('DB_ECHO', 'false').lower() == 'true'
+    DB_POOL_SIZE: int = int(os.getenv('DB_POOL_SIZE', '10'))
+    DB_MAX_OVERFLOW: int = int(os.getenv('DB_MAX_OVERFLOW', '10'))
+    DB_POOL_TIMEOUT_SECONDS: float = float(os.getenv('DB_POOL_TIMEOUT_SECONDS', '10'))
+    DB_POOL_RECYCLE_SECONDS: int = int(os.getenv('DB_POOL_RECYCLE_SECONDS', '240'))  # under Neon's idle timeout
+    # Off by default: a connection dropped by the server (e.g. Neon suspending an idle compute) fails
+    # its session's first statement, which is retried once on a new connection (database.ReconnectingSession)
+    DB_POOL_PRE_PING: bool = os.getenv('DB_POOL_PRE_PING', 'false').lower() == 'true'
+    DB_STATEMENT_CACHE_SIZE: int = int(os.getenv('DB_STATEMENT_CACHE_SIZE', '500'))
+    # Transaction-pooling PgBouncer (e.g. Neon's -pooler host) can't keep prepared statements across transactions
+    DB_PGBOUNCER: bool = os.getenv('DB_PGBOUNCER', 'false').lower() == 'true'
+    # Comma-separated read replicas; read-only endpoints use them round-robin
+    DATABASE_REPLICA_URLS: list = [url.strip() for url in os.getenv('DATABASE_REPLICA_URLS', '').split(',') if url.strip()]
+    # After a write, that user's reads stay on the primary for this long (covers replica lag)
+    READ_YOUR_WRITES_SECONDS: float = float(os.getenv('READ_YOUR_WRITES_SECONDS', '5'))
+    READ_YOUR_WRITES_MAX_USERS: int = 100000
+    # A replica that can't be reached is skipped (reads go to the primary) for this long
+    REPLICA_RETRY_SECONDS: float = float(os.getenv('REPLICA_RETRY_SECONDS', '30'))
+    
+    # Request instrumentation and the slow-request profiler
+    METRICS_TOKEN: str = os.getenv('METRICS_TOKEN', '')  # when set, /metrics requires "Authorization: Bearer <token>"
+    PROFILE_SLOW_REQUESTS: bool = os.getenv('PROFILE_SLOW_REQUESTS', 'false').lower() == 'true'
+    PROFILE_SAMPLE_INTERVAL_MS: float = float(os.getenv('PROFILE_SAMPLE_INTERVAL_MS', '5'))
+    PROFILE_SLOW_REQUEST_MS: float = float(os.getenv('PROFILE_SLOW_REQUEST_MS', '500'))
+    PROFILE_OUTPUT_DIR: str = os.getenv('PROFILE_OUTPUT_DIR', 'profiles')
+    PROFILE_MAX_DUMPS: int = int(os.getenv('PROFILE_MAX_DUMPS', '1000'))
+    
+    # Home feed
+    FEED_PAGE_SIZE: int = 50
+    FEED_MAX_PAGE_SIZE: int = 100
+    FEED_CACHE_SIZE: int = int(os.getenv('FEED_CACHE_SIZE', '200'))
+    FEED_CACHE_TTL_SECONDS: float = float(os.getenv('FEED_CACHE_TTL_SECONDS', '10'))
+    
+    # Likes
+    LIKE_FLUSH_INTERVAL_MS: int = int(os.getenv('LIKE_FLUSH_INTERVAL_MS', '250'))
+    LIKE_COUNTER_SHARDS: int = 16
+    LIKE_DEDUP_SIZE: int = int(os.getenv('LIKE_DEDUP_SIZE', '100000'))
+    
+    # Conversation history
+    MESSAGES_PAGE_SIZE: int = 50
+    MESSAGES_MAX_PAGE_SIZE: int = 200
+    CONVERSATIONS_PAGE_SIZE: int = 50
+    CONVERSATIONS_MAX_PAGE_SIZE: int = 200
+    
+    # Admin user listing
+    ADMIN_USERS_PAGE_SIZE: int = 100
+    ADMIN_USERS_MAX_PAGE_SIZE: int = 1000
+    ADMIN_USERS_STREAM_BATCH: int = 1000  # rows per query when streaming NDJSON
+    ADMIN_BULK_MAX_USER_IDS: int = 10000
+    
+    # Real-time messaging ('memory' or 'local_broker')
+    MESSAGE_HUB_BACKEND: str = os.getenv('MESSAGE_HUB_BACKEND', 'memory')
+    MESSAGE_HUB_MAX_PENDING: int = 10000
+    WS_SEND_TIMEOUT_SECONDS: float = 5
+    
+    # Risk rule file (JSON, or YAML with PyYAML); sections it leaves out come from the settings below
+    RISK_RULES_PATH: str = os.getenv('RISK_RULES_PATH', '')
+    RISK_RULES_CHECK_SECONDS: float = float(os.getenv('RISK_RULES_CHECK_SECONDS', '5'))
     
     # BehavioGuard Settings (for in-memory analysis only)
     RISK_THRESHOLD_LOW: int = 30
@@ -20,5 +85,74 @@ class Settings:
     RISK_THRESHOLD_CRITICAL: int = 90
     CHALLENGE_REQUIRED_THRESHOLD: int = 70
     ACCOUNT_LOCK_THRESHOLD: int = 95
+    
+    # BehavioGuard feature rules
+    TYPING_SPEED_MIN: float = 50
+    TYPING_SPEED_MAX: float = 200
+    TAP_PRESSURE_MIN: float = 0.2
+    TAP_PRESSURE_MAX: float = 0.9
+    SCROLL_VELOCITY_MAX: float = 1000
+    TYPING_SPEED_RISK: int = 20
+    MISSING_DEVICE_RISK: int = 10
+    LOCAL_IP_RISK: int = 5
+    UNUSUAL_TIME_RISK: int = 10
+    TAP_PRESSURE_RISK: int = 15
+    SCROLL_VELOCITY_RISK: int = 10
+    SUSPICIOUS_THRESHOLD: int = 50
+    KEYSTROKE_MIN_KEYS: int = 10
+    KEYSTROKE_MAX_KEYS: int = 2000
+    KEYSTROKE_MIN_INTERVAL_MS: float = 35  # ~340 WPM
+    KEYSTROKE_MIN_CV: float = 0.1  # human key intervals vary by far more than 10%
+    KEYSTROKE_MIN_DWELL_MS: float = 15
+    KEYSTROKE_SPEED_RISK: int = 25
+    KEYSTROKE_CADENCE_RISK: int = 30
+    KEYSTROKE_DWELL_RISK: int = 15
+    BEHAVIORAL_BATCH_MAX_SAMPLES: int = int(os.getenv('BEHAVIORAL_BATCH_MAX_SAMPLES', '10000'))
+    
+    # Streaming telemetry
+    TELEMETRY_WINDOW_MS: float = float(os.getenv('TELEMETRY_WINDOW_MS', '5000'))
+    TELEMETRY_MAX_EVENTS_PER_WINDOW: int = 5000
+    TELEMETRY_MAX_LINE_BYTES: int = 64 * 1024
+    TELEMETRY_MAX_REPORTED_WINDOWS: int = 100
+    
+    # Security event pipeline
+    SECURITY_EVENT_BATCH_SIZE: int = int(os.getenv('SECURITY_EVENT_BATCH_SIZE', '500'))
+    SECURITY_EVENT_FLUSH_INTERVAL_MS: int = int(os.getenv('SECURITY_EVENT_FLUSH_INTERVAL_MS', '1000'))
+    SECURITY_ROLLUP_MINUTE_RETENTION_HOURS: int = 48
+    
+    # Background table writers (security events, behavioral samples)
+    WRITER_BATCH_SIZE: int = int(os.getenv('WRITER_BATCH_SIZE', '500'))
+    WRITER_FLUSH_INTERVAL_MS: int = int(os.getenv('WRITER_FLUSH_INTERVAL_MS', '500'))
+    WRITER_MAX_QUEUE: int = int(os.getenv('WRITER_MAX_QUEUE', '50000'))
+    WRITER_OVERFLOW_POLICY: str = os.getenv('WRITER_OVERFLOW_POLICY', 'spill')  # block | drop | spill
+    WRITER_SPILL_DIR: str = os.getenv('WRITER_SPILL_DIR', 'spill')
+    WRITER_REPLAY_INTERVAL_SECONDS: int = 30
+    WRITER_USE_COPY: bool = os.getenv('WRITER_USE_COPY', 'false').lower() == 'true'
+    
+    # Admin stats counts ('counters': trigger-maintained exact counts, 'estimate': pg_class.reltuples)
+    STATS_COUNT_SOURCE: str = os.getenv('STATS_COUNT_SOURCE', 'counters')
+    STATS_CACHE_TTL_SECONDS: float = float(os.getenv('STATS_CACHE_TTL_SECONDS', '10'))
+    ROW_COUNT_SHARDS: int = 16  # spreads concurrent inserts over several counter rows
+    
+    # Per-user action rate limits: action -> (requests, window seconds)
+    ACTION_RATE_LIMITS: dict = {
+        'message': (20, 10),
+        'like': (30, 10),
+        'post': (10, 60),
+    }
+    ACTION_RATE_MAX_ENTRIES: int = int(os.getenv('ACTION_RATE_MAX_ENTRIES', '500000'))
+    ACTION_RATE_IDLE_SECONDS: float = 300
+    ACTION_RATE_EWMA_ALPHA: float = 0.3
+    ACTION_RATE_MIN_EVENTS: int = 5
+    ACTION_FLOOD_INTERVAL_MS: float = 250  # sustained faster than this looks automated
+    ACTION_FLOOD_RISK: int = 30
+    
+    # Per-user behavioral baselines
+    BASELINE_CACHE_SIZE: int = int(os.getenv('BASELINE_CACHE_SIZE', '10000'))
+    BASELINE_FLUSH_BATCH_SIZE: int = int(os.getenv('BASELINE_FLUSH_BATCH_SIZE', '50'))
+    BASELINE_MIN_SAMPLES: int = 5
+    BASELINE_Z_THRESHOLD: float = 3.0
+    BASELINE_MIN_STD_RATIO: float = 0.05  # floor std at 5% of the mean
+    BASELINE_DEVIATION_RISK: int = 15
 
 settings = Settings()
\ No newline at end of file
@@ -1,24 +1,243 @@
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
-from sqlalchemy.orm import declarative_base
+import asyncio
+import itertools
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Dict, Optional
+from uuid import uuid4
+from sqlalchemy import event
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine, AsyncSession, async_sessionmaker
+from sqlalchemy.orm import DeclarativeBase, Session
 from config import settings
 
-# Convert postgresql:// to postgresql+asyncpg://
-DATABASE_URL = settings.DATABASE_URL.replace('postgresql://', 'postgresql+asyncpg://')
+def _asyncpg_url(url: str) -> str:
+    # Convert postgresql:// to postgresql+asyncpg://
+    return url.replace('postgresql://', 'postgresql+asyncpg://')
 
-engine = create_async_engine(
-    DATABASE_URL,
-    echo=True,
-    pool_pre_ping=True,
-    pool_recycle=300,
-)
+DATABASE_URL = _asyncpg_url(settings.DATABASE_URL)
+
+def build_engine(url: str) -> AsyncEngine:
+    """
+    Async engine configured from the DB_* settings.
+    Pre-ping is off by default: a connection the server dropped while idle
+    fails its first statement with a disconnect error, which invalidates
+    the pool, and ReconnectingSession retries that statement once on a new
+    connection, instead of every checkout paying a probe round trip.
+    """
+    url = make_url(url)
+    connect_args = {}
+    if settings.DB_PGBOUNCER:
+        # PgBouncer in transaction mode may hand each transaction a different
+        # server connection, so named prepared statements must never be reused
+        url = url.update_query_dict({'prepared_statement_cache_size': '0'})
+        connect_args['statement_cache_size'] = 0
+        connect_args['prepared_statement_name_func'] = lambda: f'__asyncpg_{uuid4()}__'
+    else:
+        url = url.update_query_dict({'prepared_statement_cache_size': str(settings.DB_STATEMENT_CACHE_SIZE)})
+        connect_args['statement_cache_size'] = settings.DB_STATEMENT_CACHE_SIZE
+    
+    return create_async_engine(
+        url,
+        echo=settings.DB_ECHO,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT_SECONDS,
+        pool_recycle=settings.DB_POOL_RECYCLE_SECONDS,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        connect_args=connect_args,
+    )
+
+class PoolMetrics:
+    """Checkout, saturation and reconnect counters for one engine's pool."""
+    
+    def __init__(self, engine: AsyncEngine):
+        self.pool = engine.sync_engine.pool
+        self.capacity = settings.DB_POOL_SIZE + settings.DB_MAX_OVERFLOW
+        self.in_use = 0
+        self._stats = {
+            'checkouts': 0,
+            'saturated_checkouts': 0,
+            'peak_checked_out': 0,
+            'connections_opened': 0,
+            'invalidations': 0,
+            'disconnect_errors': 0,
+        }
+        event.listen(self.pool, 'checkout', self._on_checkout)
+        event.listen(self.pool, 'checkin', self._on_checkin)
+        event.listen(self.pool, 'connect', self._on_connect)
+        event.listen(self.pool, 'invalidate', self._on_invalidate)
+        event.listen(engine.sync_engine, 'handle_error', self._on_error)
+    
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        # Counted here rather than read from the pool, which also counts
+        # slots reserved by checkouts that are still connecting
+        self.in_use += 1
+        self._stats['checkouts'] += 1
+        if self.in_use > self._stats['peak_checked_out']:
+            self._stats['peak_checked_out'] = self.in_use
+        # The last free slot was just taken: the next request will wait
+        if self.in_use >= self.capacity:
+            self._stats['saturated_checkouts'] += 1
+    
+    def _on_checkin(self, dbapi_connection, connection_record):
+        self.in_use = max(self.in_use - 1, 0)
+    
+    def _on_connect(self, dbapi_connection, connection_record):
+        self._stats['connections_opened'] += 1
+    
+    def _on_invalidate(self, dbapi_connection, connection_record, exception):
+        self._stats['invalidations'] += 1
+    
+    def _on_error(self, context):
+        # A session's first statement is retried by ReconnectingSession
+        if context.is_disconnect:
+            self._stats['disconnect_errors'] += 1
+    
+    def metrics(self) -> dict:
+        return {
+            **self._stats,
+            'pool_size': self.pool.size(),
+            'max_overflow': settings.DB_MAX_OVERFLOW,
+            'checked_out': self.in_use,
+            'idle': self.pool.checkedin(),
+            'overflow': self.pool.overflow(),
+            'utilization': round(self.in_use / self.capacity, 3) if self.capacity else 0.0,
+        }
+
+class RecentWriters:
+    """
+    Users who committed a write in the last READ_YOUR_WRITES_SECONDS.
+    Their reads go to the primary so they never see a replica that hasn't
+    caught up with their own change. Tracked per process, like the
+    principal cache; an LRU bound keeps memory flat.
+    """
+    
+    def __init__(self, window_seconds: float = None, max_users: int = None):
+        self.window_seconds = window_seconds if window_seconds is not None else settings.READ_YOUR_WRITES_SECONDS
+        self.max_users = max_users or settings.READ_YOUR_WRITES_MAX_USERS
+        self._until: 'OrderedDict[int, float]' = OrderedDict()
+    
+    def mark(self, user_id: int):
+        self._until[user_id] = time.monotonic() + self.window_seconds
+        self._until.move_to_end(user_id)
+        while len(self._until) > self.max_users:
+            self._until.popitem(last=False)
+    
+    def is_sticky(self, user_id: int) -> bool:
+        until = self._until.get(user_id)
+        if until is None:
+            return False
+        if until < time.monotonic():
+            del self._until[user_id]
+            return False
+        return True
+
+recent_writers = RecentWriters()
+
+class ReconnectingSession(AsyncSession):
+    """
+    AsyncSession that retries its first statement once when the pooled
+    connection turns out to be dead (e.g. the server dropped it while idle).
+    Nothing has run in the session yet, so the retry can't repeat work.
+    """
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._ran_statement = False
+    
+    async def _first_statement(self, method, *args, **kwargs):
+        # Pending objects would be lost by the rollback, so a flush is never retried
+        retry = not self._ran_statement and not (self.new or self.dirty or self.deleted)
+        try:
+            return await method(*args, **kwargs)
+        except DBAPIError as e:
+            if not (retry and e.connection_invalidated):
+                raise
+            await self.rollback()
+            return await method(*args, **kwargs)
+        finally:
+            self._ran_statement = True
+    
+    async def execute(self, *args, **kwargs):
+        return await self._first_statement(super().execute, *args, **kwargs)
+    
+    async def scalar(self, *args, **kwargs):
+        return await self._first_statement(super().scalar, *args, **kwargs)
+    
+    async def get(self, *args, **kwargs):
+        return await self._first_statement(super().get, *args, **kwargs)
+
+class PrimarySession(Session):
+    """Session on the primary; commits mark the owning user as a recent writer."""
+
+@event.listens_for(PrimarySession, 'after_commit')
+def _mark_recent_writer(session):
+    # Set by authentication when the request's principal is resolved
+    user_id = session.info.get('user_id')
+    if user_id is not None:
+        recent_writers.mark(user_id)
+
+engine = build_engine(DATABASE_URL)
+pool_metrics = PoolMetrics(engine)
 
 async_session_maker = async_sessionmaker(
     engine,
-    class_=AsyncSession,
+    class_=ReconnectingSession,
+    sync_session_class=PrimarySession,
     expire_on_commit=False
 )
 
-Base = declarative_base()
+replica_engines = [build_engine(_asyncpg_url(url)) for url in settings.DATABASE_REPLICA_URLS]
+replica_pool_metrics = [PoolMetrics(replica) for replica in replica_engines]
+replica_session_makers = [
+    async_sessionmaker(replica, class_=ReconnectingSession, expire_on_commit=False)
+    for replica in replica_engines
+]
+_next_replica = itertools.cycle(replica_session_makers)
+# Replicas that failed to connect, skipped until the given monotonic time
+_replica_down_until: Dict[async_sessionmaker, float] = {}
+
+def read_session_maker(user_id: Optional[int] = None) -> async_sessionmaker:
+    """
+    Session factory for read-only work: the next reachable replica
+    round-robin, or the primary when no replicas are configured or up, or
+    the user wrote recently.
+    """
+    if not replica_session_makers or (user_id is not None and recent_writers.is_sticky(user_id)):
+        return async_session_maker
+    now = time.monotonic()
+    for _ in range(len(replica_session_makers)):
+        maker = next(_next_replica)
+        if _replica_down_until.get(maker, 0.0) <= now:
+            return maker
+    return async_session_maker
+
+@asynccontextmanager
+async def read_session(user_id: Optional[int] = None):
+    """
+    Read-only session from read_session_maker. A replica is connected up
+    front; if it can't be reached it is skipped for REPLICA_RETRY_SECONDS
+    and the session falls back to the primary.
+    """
+    maker = read_session_maker(user_id)
+    session = maker()
+    try:
+        if maker is not async_session_maker:
+            try:
+                await session.connection()
+            except (OSError, asyncio.TimeoutError, DBAPIError) as e:
+                print(f"⚠️ Replica unavailable, reading from the primary: {e}")
+                _replica_down_until[maker] = time.monotonic() + settings.REPLICA_RETRY_SECONDS
+                await session.close()
+                session = async_session_maker()
+        yield session
+    finally:
+        await session.close()
+
+class Base(DeclarativeBase):
+    pass
 
 async def init_db():
     async with engine.begin() as conn:
@@ -30,4 +249,9 @@ async def get_db():
         try:
             yield session
         finally:
-            await session.close()
\ No newline at end of file
+            await session.close()
+
+async def dispose_engines():
+    await engine.dispose()
+    for replica in replica_engines:
+        await replica.dispose()
@@ -1,27 +1,68 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
-from database import init_db
+from config import settings
+from database import init_db, dispose_engines, async_session_maker, engine, replica_engines
 from routes import auth, posts, messages, security, admin
+from services.baseline_store import baseline_store
+from services.behavioral_log import behavioral_log
+from services.like_counter import like_counter
+from services.message_hub import message_hub
+from services.conversations import backfill_conversations
+from services.instrumentation import CONTENT_TYPE, InstrumentationMiddleware, instrument_engine, request_metrics
+from services.profiler import sampling_profiler
+from services.row_counts import install_row_counters
+from services.security_events import security_events
+from utils.passwords import password_hasher
+from utils.responses import ORJSONResponse
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
     await init_db()
+    async with async_session_maker() as session:
+        if await backfill_conversations(session):
+            print("💬 Conversation summaries backfilled")
+        if await install_row_counters(session):
+            print("🔢 Row counters installed")
+    like_counter.start()
+    await security_events.start()
+    await behavioral_log.start()
+    await message_hub.start()
+    sampling_profiler.start()
     print("🚀 SecureCircle Backend Starting...")
     print("📊 Database: Neon PostgreSQL")
+    if replica_engines:
+        print(f"📖 Read replicas: {len(replica_engines)}")
     print("🔒 BehavioGuard: Active")
+    if sampling_profiler.running:
+        print(f"🔥 Profiling requests slower than {sampling_profiler.slow_ms:g} ms")
     print("✅ Ready to accept connections!\n")
     yield
     # Shutdown
     print("Shutting down...")
+    sampling_profiler.stop()
+    await like_counter.stop()
+    await security_events.stop()
+    await behavioral_log.stop()
+    await message_hub.stop()
+    async with async_session_maker() as session:
+        flushed = await baseline_store.flush(session)
+    print(f"💾 Flushed {flushed} behavioral baselines")
+    password_hasher.shutdown()
+    await dispose_engines()
 
 app = FastAPI(
     title="SecureCircle API",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
+# Per-route timings of every query the primary and replicas run
+for instrumented in [engine, *replica_engines]:
+    instrument_engine(instrumented)
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -31,6 +72,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Added last so it is the outermost middleware and times CORS handling too
+app.add_middleware(InstrumentationMiddleware)
+
 # Include routers
 app.include_router(auth.router, prefix="/api/auth", tags=["auth"])
 app.include_router(posts.router, prefix="/api/posts", tags=["posts"])
@@ -50,6 +94,13 @@ async def index():
 async def health_check():
     return {"status": "healthy"}
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics(request: Request):
+    """Request and phase histograms in the Prometheus text format."""
+    if settings.METRICS_TOKEN and request.headers.get('authorization') != f"Bearer {settings.METRICS_TOKEN}":
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
+    return Response(content=request_metrics.render(), media_type=CONTENT_TYPE)
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run("main:app", host="0.0.0.0", port=5000, reload=True)
\ No newline at end of file
@@ -3,5 +3,8 @@ from models.post import Post
 from models.message import Message
 from models.security_event import SecurityEvent
 from models.behavioral_data import BehavioralData
+from models.conversation import Conversation
+from models.security_rollup import SecurityRollup
+from models.row_count import RowCount
 
-__all__ = ['User', 'Post', 'Message', 'SecurityEvent', 'BehavioralData']
+__all__ = ['User', 'Post', 'Message', 'SecurityEvent', 'BehavioralData', 'Conversation', 'SecurityRollup', 'RowCount']
@@ -1,47 +1,67 @@
-from database import db
 from datetime import datetime
+from typing import Optional, Any
+from sqlalchemy import ForeignKey, Index, String, JSON
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+from database import Base
+from models.user import User
 
-class BehavioralData(db.Model):
+# Snapshot rows are regular behavioral_data rows tagged with this session id
+BASELINE_SESSION_ID = 'baseline-snapshot'
+
+class BehavioralData(Base):
     __tablename__ = 'behavioral_data'
+    __table_args__ = (
+        # Latest baseline snapshot of a user without walking their history
+        Index('ix_behavioral_data_user_session_created', 'user_id', 'session_id', 'created_at'),
+    )
     
-    id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
-    session_id = db.Column(db.String(255), index=True)
+    id: Mapped[int] = mapped_column(primary_key=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey('users.id', ondelete='CASCADE'))
+    session_id: Mapped[Optional[str]] = mapped_column(String(255), index=True)
     
     # Typing patterns
-    typing_speed = db.Column(db.Float)
-    key_press_intervals = db.Column(db.JSON)
-    deletion_rate = db.Column(db.Float)
+    typing_speed: Mapped[Optional[float]]
+    key_press_intervals: Mapped[Optional[Any]] = mapped_column(JSON)
+    deletion_rate: Mapped[Optional[float]]
     
     # Touch/tap patterns
-    tap_pressure = db.Column(db.Float)
-    tap_duration = db.Column(db.Float)
-    tap_locations = db.Column(db.JSON)
+    tap_pressure: Mapped[Optional[float]]
+    tap_duration: Mapped[Optional[float]]
+    tap_locations: Mapped[Optional[Any]] = mapped_column(JSON)
     
     # Navigation patterns
-    scroll_velocity = db.Column(db.Float)
-    navigation_path = db.Column(db.JSON)
-    screen_time = db.Column(db.Integer)
+    scroll_velocity: Mapped[Optional[float]]
+    navigation_path: Mapped[Optional[Any]] = mapped_column(JSON)
+    screen_time: Mapped[Optional[int]]
     
     # Device info
-    device_fingerprint = db.Column(db.String(255), index=True)
-    device_type = db.Column(db.String(50))
-    os_version = db.Column(db.String(50))
+    device_fingerprint: Mapped[Optional[str]] = mapped_column(String(255), index=True)
+    device_type: Mapped[Optional[str]] = mapped_column(String(50))
+    os_version: Mapped[Optional[str]] = mapped_column(String(50))
     
     # Context
-    access_time = db.Column(db.DateTime)
-    location = db.Column(db.String(255))
-    ip_address = db.Column(db.String(45))
+    access_time: Mapped[Optional[datetime]]
+    location: Mapped[Optional[str]] = mapped_column(String(255))
+    ip_address: Mapped[Optional[str]] = mapped_column(String(45))
+    
+    # Running baseline statistics ({feature: [count, mean, m2]}), only set on snapshot rows
+    baseline_stats: Mapped[Optional[Any]] = mapped_column(JSON)
     
-    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    created_at: Mapped[datetime] = mapped_column(default=datetime.utcnow, index=True)
+    
+    user: Mapped[User] = relationship(back_populates='behavioral_data', lazy='raise')
     
     def to_dict(self):
-        return {
-            'id': self.id,
-            'typing_speed': self.typing_speed,
-            'tap_pressure': self.tap_pressure,
-            'scroll_velocity': self.scroll_velocity,
-            'device_type': self.device_type,
-            'location': self.location,
-            'created_at': self.created_at.isoformat() if self.created_at else None
-        }
+        return serialize_behavioral_data(self)
+
+def serialize_behavioral_data(row) -> dict:
+    """Sample summary from a BehavioralData or a Core row of its columns."""
+    return {
+        'id': row.id,
+        'typing_speed': row.typing_speed,
+        'tap_pressure': row.tap_pressure,
+        'scroll_velocity': row.scroll_velocity,
+        'device_type': row.device_type,
+        'location': row.location,
+        'created_at': row.created_at.isoformat() if row.created_at else None
+    }
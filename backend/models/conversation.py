@@ -0,0 +1,23 @@
+from datetime import datetime
+from sqlalchemy import ForeignKey, Index, String
+from sqlalchemy.orm import Mapped, mapped_column
+from database import Base
+
+class Conversation(Base):
+    """
+    Per-user conversation summary, one row per (user, peer).
+    Maintained on every send and read so the conversation list is a single
+    indexed range scan instead of an aggregate over all messages.
+    """
+    __tablename__ = 'conversations'
+    __table_args__ = (
+        Index('ix_conversations_user_recent', 'user_id', 'last_message_at', 'peer_id'),
+    )
+    
+    user_id: Mapped[int] = mapped_column(ForeignKey('users.id'), primary_key=True)
+    peer_id: Mapped[int] = mapped_column(ForeignKey('users.id'), primary_key=True)
+    last_message_id: Mapped[int] = mapped_column(ForeignKey('messages.id'))
+    last_message_text: Mapped[str] = mapped_column(String(200))
+    last_sender_id: Mapped[int]
+    last_message_at: Mapped[datetime] = mapped_column(default=datetime.utcnow)
+    unread_count: Mapped[int] = mapped_column(default=0)
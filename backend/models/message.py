@@ -1,22 +1,60 @@
-from database import db
 from datetime import datetime
+from sqlalchemy import ForeignKey, Index, Text, case
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+from database import Base
+from models.user import User
 
-class Message(db.Model):
+class Message(Base):
     __tablename__ = 'messages'
+    __table_args__ = (
+        # Conversation history: one range scan per direction
+        Index('ix_messages_sender_receiver_created', 'sender_id', 'receiver_id', 'created_at'),
+    )
     
-    id = db.Column(db.Integer, primary_key=True)
-    sender_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
-    receiver_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
-    text = db.Column(db.Text, nullable=False)
-    is_read = db.Column(db.Boolean, default=False)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    id: Mapped[int] = mapped_column(primary_key=True)
+    sender_id: Mapped[int] = mapped_column(ForeignKey('users.id'), index=True)
+    receiver_id: Mapped[int] = mapped_column(ForeignKey('users.id'), index=True)
+    text: Mapped[str] = mapped_column(Text)
+    is_read: Mapped[bool] = mapped_column(default=False)
+    created_at: Mapped[datetime] = mapped_column(default=datetime.utcnow, index=True)
     
-    def to_dict(self, current_user_id):
-        return {
-            'id': self.id,
-            'text': self.text,
-            'sender': 'me' if self.sender_id == current_user_id else 'them',
-            'sender_name': self.sender.name,
-            'time': self.created_at.strftime('%I:%M %p') if self.created_at else '',
-            'is_read': self.is_read
-        }
+    sender: Mapped[User] = relationship(
+        foreign_keys=[sender_id], back_populates='messages_sent', lazy='joined', innerjoin=True
+    )
+    receiver: Mapped[User] = relationship(
+        foreign_keys=[receiver_id], back_populates='messages_received', lazy='raise'
+    )
+    
+    def to_dict(self, current_user_id, sender=None):
+        # Pass the sender when it is already at hand to skip the relationship load
+        sender = sender or self.sender
+        return _message_dict(self.id, self.text, self.sender_id, sender.name, self.is_read, self.created_at, current_user_id)
+
+# History columns for schemas.MessageResponse (with sender_side) and serialize_message;
+# select them with .join(User, User.id == Message.sender_id)
+MESSAGE_COLUMNS = (
+    Message.id,
+    Message.text,
+    Message.sender_id,
+    Message.is_read,
+    Message.created_at,
+    User.name.label('sender_name'),
+)
+
+def sender_side(current_user_id: int):
+    """'me' or 'them' relative to the current user, computed by the query."""
+    return case((Message.sender_id == current_user_id, 'me'), else_='them').label('sender')
+
+def serialize_message(row, current_user_id: int) -> dict:
+    """Chat message from a row selected with MESSAGE_COLUMNS."""
+    return _message_dict(row.id, row.text, row.sender_id, row.sender_name, row.is_read, row.created_at, current_user_id)
+
+def _message_dict(message_id, text, sender_id, sender_name, is_read, created_at, current_user_id) -> dict:
+    return {
+        'id': message_id,
+        'text': text,
+        'sender': 'me' if sender_id == current_user_id else 'them',
+        'sender_name': sender_name,
+        'time': created_at.strftime('%I:%M %p') if created_at else '',
+        'is_read': is_read
+    }
@@ -1,35 +1,64 @@
-from database import db
 from datetime import datetime
+from sqlalchemy import ForeignKey, Index, Text
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+from database import Base
+from models.user import User
 
-class Post(db.Model):
+class Post(Base):
     __tablename__ = 'posts'
+    __table_args__ = (
+        # Keyset pagination of the feed on (created_at, id)
+        Index('ix_posts_created_at_id', 'created_at', 'id'),
+    )
     
-    id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
-    content = db.Column(db.Text, nullable=False)
-    likes = db.Column(db.Integer, default=0)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    id: Mapped[int] = mapped_column(primary_key=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey('users.id', ondelete='CASCADE'), index=True)
+    content: Mapped[str] = mapped_column(Text)
+    likes: Mapped[int] = mapped_column(default=0)
+    created_at: Mapped[datetime] = mapped_column(default=datetime.utcnow, index=True)
     
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'author': self.author.name,
-            'avatar': self.author.avatar,
-            'content': self.content,
-            'likes': self.likes,
-            'time': self._format_time(),
-            'created_at': self.created_at.isoformat() if self.created_at else None
-        }
+    # Every post is rendered with its author, so load it in the same query
+    author: Mapped[User] = relationship(back_populates='posts', lazy='joined', innerjoin=True)
     
-    def _format_time(self):
-        if not self.created_at:
-            return 'just now'
-        diff = datetime.utcnow() - self.created_at
-        hours = diff.total_seconds() / 3600
-        if hours < 1:
-            minutes = int(diff.total_seconds() / 60)
-            return f"{minutes} min ago" if minutes > 0 else "just now"
-        elif hours < 24:
-            return f"{int(hours)}h ago"
-        else:
-            return f"{int(hours / 24)}d ago"
+    def to_dict(self, author=None):
+        # Pass the author when it is already at hand to skip the relationship load
+        author = author or self.author
+        return _post_dict(self.id, author.name, author.avatar, self.content, self.likes, self.created_at)
+
+# Feed columns for schemas.PostResponse and serialize_post; select them with .join(User, User.id == Post.user_id)
+POST_COLUMNS = (
+    Post.id,
+    Post.content,
+    Post.likes,
+    Post.created_at,
+    User.name.label('author'),
+    User.avatar.label('avatar'),
+)
+
+def serialize_post(row) -> dict:
+    """Feed entry from a row selected with POST_COLUMNS."""
+    return _post_dict(row.id, row.author, row.avatar, row.content, row.likes, row.created_at)
+
+def _post_dict(post_id, author_name, author_avatar, content, likes, created_at) -> dict:
+    return {
+        'id': post_id,
+        'author': author_name,
+        'avatar': author_avatar,
+        'content': content,
+        'likes': likes,
+        'time': format_relative_time(created_at),
+        'created_at': created_at.isoformat() if created_at else None
+    }
+
+def format_relative_time(created_at):
+    if not created_at:
+        return 'just now'
+    diff = datetime.utcnow() - created_at
+    hours = diff.total_seconds() / 3600
+    if hours < 1:
+        minutes = int(diff.total_seconds() / 60)
+        return f"{minutes} min ago" if minutes > 0 else "just now"
+    elif hours < 24:
+        return f"{int(hours)}h ago"
+    else:
+        return f"{int(hours / 24)}d ago"
@@ -0,0 +1,15 @@
+from sqlalchemy import BigInteger, SmallInteger, String
+from sqlalchemy.orm import Mapped, mapped_column
+from database import Base
+
+class RowCount(Base):
+    """
+    Row counts of large tables, kept current by insert/delete triggers.
+    Each table's count is split over a few shard rows so concurrent inserts
+    don't all queue on one row lock; the count is the sum of its shards.
+    """
+    __tablename__ = 'row_counts'
+    
+    table_name: Mapped[str] = mapped_column(String(63), primary_key=True)
+    shard: Mapped[int] = mapped_column(SmallInteger, primary_key=True)
+    row_count: Mapped[int] = mapped_column(BigInteger, default=0)
@@ -1,52 +1,78 @@
-from database import db
 from datetime import datetime
+from typing import Optional, Any
+from sqlalchemy import ForeignKey, String, Text, JSON
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+from database import Base
+from models.user import User
 
-class SecurityEvent(db.Model):
+class SecurityEvent(Base):
     __tablename__ = 'security_events'
     
-    id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
-    event_type = db.Column(db.String(50), nullable=False, index=True)
-    risk_score = db.Column(db.Integer, nullable=False)
-    risk_level = db.Column(db.String(20), index=True)
-    reason = db.Column(db.Text)
-    action_taken = db.Column(db.String(100))
-    ip_address = db.Column(db.String(45))
-    device_info = db.Column(db.JSON)
-    location = db.Column(db.String(255))
-    behavioral_signals = db.Column(db.JSON)
-    status = db.Column(db.String(20), default='active')
-    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    id: Mapped[int] = mapped_column(primary_key=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey('users.id', ondelete='CASCADE'), index=True)
+    event_type: Mapped[str] = mapped_column(String(50), index=True)
+    risk_score: Mapped[int]
+    risk_level: Mapped[Optional[str]] = mapped_column(String(20), index=True)
+    reason: Mapped[Optional[str]] = mapped_column(Text)
+    action_taken: Mapped[Optional[str]] = mapped_column(String(100))
+    ip_address: Mapped[Optional[str]] = mapped_column(String(45))
+    device_info: Mapped[Optional[Any]] = mapped_column(JSON)
+    location: Mapped[Optional[str]] = mapped_column(String(255))
+    behavioral_signals: Mapped[Optional[Any]] = mapped_column(JSON)
+    status: Mapped[str] = mapped_column(String(20), default='active')
+    created_at: Mapped[datetime] = mapped_column(default=datetime.utcnow, index=True)
     
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'user_id': self.user_id,
-            'user_email': self.user.email if self.user else 'Unknown',
-            'user_name': self.user.name if self.user else 'Unknown',
-            'event_type': self.event_type,
-            'risk_score': self.risk_score,
-            'risk_level': self.risk_level,
-            'reason': self.reason,
-            'action_taken': self.action_taken,
-            'ip_address': self.ip_address,
-            'device_info': self.device_info,
-            'location': self.location,
-            'behavioral_signals': self.behavioral_signals,
-            'status': self.status,
-            'time': self._format_time(),
-            'created_at': self.created_at.isoformat() if self.created_at else None
-        }
+    # Events are always shown with the user they belong to
+    user: Mapped[User] = relationship(back_populates='security_events', lazy='joined', innerjoin=True)
+    
+    @property
+    def user_email(self) -> str:
+        return self.user.email
     
-    def _format_time(self):
-        if not self.created_at:
-            return 'just now'
-        diff = datetime.utcnow() - self.created_at
-        minutes = diff.total_seconds() / 60
-        if minutes < 60:
-            mins = int(minutes)
-            return f"{mins} min ago" if mins > 0 else "just now"
-        hours = minutes / 60
-        if hours < 24:
-            return f"{int(hours)} hr ago"
-        return f"{int(hours / 24)} days ago"
+    @property
+    def user_name(self) -> str:
+        return self.user.name
+    
+    def to_dict(self):
+        return serialize_security_event(self)
+
+# Columns for serialize_security_event; select them with .join(User, User.id == SecurityEvent.user_id)
+SECURITY_EVENT_COLUMNS = (
+    *SecurityEvent.__table__.columns,
+    User.email.label('user_email'),
+    User.name.label('user_name'),
+)
+
+def serialize_security_event(row) -> dict:
+    """Event from a SecurityEvent or a row selected with SECURITY_EVENT_COLUMNS."""
+    return {
+        'id': row.id,
+        'user_id': row.user_id,
+        'user_email': row.user_email or 'Unknown',
+        'user_name': row.user_name or 'Unknown',
+        'event_type': row.event_type,
+        'risk_score': row.risk_score,
+        'risk_level': row.risk_level,
+        'reason': row.reason,
+        'action_taken': row.action_taken,
+        'ip_address': row.ip_address,
+        'device_info': row.device_info,
+        'location': row.location,
+        'behavioral_signals': row.behavioral_signals,
+        'status': row.status,
+        'time': format_event_time(row.created_at),
+        'created_at': row.created_at.isoformat() if row.created_at else None
+    }
+
+def format_event_time(created_at):
+    if not created_at:
+        return 'just now'
+    diff = datetime.utcnow() - created_at
+    minutes = diff.total_seconds() / 60
+    if minutes < 60:
+        mins = int(minutes)
+        return f"{mins} min ago" if mins > 0 else "just now"
+    hours = minutes / 60
+    if hours < 24:
+        return f"{int(hours)} hr ago"
+    return f"{int(hours / 24)} days ago"
@@ -0,0 +1,20 @@
+from datetime import datetime
+from sqlalchemy import BigInteger, String
+from sqlalchemy.orm import Mapped, mapped_column
+from database import Base
+
+class SecurityRollup(Base):
+    """
+    Pre-aggregated SecurityEvent counts per time bucket, event type and
+    risk level. Updated incrementally on every event batch so the admin
+    dashboard reads a handful of rows instead of scanning events.
+    """
+    __tablename__ = 'security_rollups'
+    
+    granularity: Mapped[str] = mapped_column(String(10), primary_key=True)  # 'minute' or 'hour'
+    bucket_start: Mapped[datetime] = mapped_column(primary_key=True)
+    event_type: Mapped[str] = mapped_column(String(50), primary_key=True)
+    risk_level: Mapped[str] = mapped_column(String(20), primary_key=True)
+    event_count: Mapped[int] = mapped_column(default=0)
+    risk_score_sum: Mapped[int] = mapped_column(BigInteger, default=0)
+    risk_score_max: Mapped[int] = mapped_column(default=0)
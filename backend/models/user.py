@@ -1,42 +1,88 @@
-from database import db
 from datetime import datetime
-import bcrypt
+from typing import List, Optional, TYPE_CHECKING
+from sqlalchemy import Index, String, text
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+from database import Base
+from utils.passwords import hash_password, check_password
 
-class User(db.Model):
+if TYPE_CHECKING:
+    from models.post import Post
+    from models.message import Message
+    from models.security_event import SecurityEvent
+    from models.behavioral_data import BehavioralData
+
+class User(Base):
     __tablename__ = 'users'
+    __table_args__ = (
+        # Admin listing: keyset order, alone or within the locked/admin filters
+        Index('ix_users_created_at_id', 'created_at', 'id'),
+        Index('ix_users_locked_created_at_id', 'is_locked', 'created_at', 'id'),
+        Index('ix_users_admin_created_at_id', 'created_at', 'id', postgresql_where=text('is_admin')),
+        Index('ix_users_security_score', 'security_score'),
+    )
     
-    id = db.Column(db.Integer, primary_key=True)
-    email = db.Column(db.String(255), unique=True, nullable=False, index=True)
-    password_hash = db.Column(db.String(255), nullable=False)
-    name = db.Column(db.String(255), nullable=False)
-    avatar = db.Column(db.String(10), default='👤')
-    is_admin = db.Column(db.Boolean, default=False)
-    is_locked = db.Column(db.Boolean, default=False)
-    security_score = db.Column(db.Integer, default=50)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    id: Mapped[int] = mapped_column(primary_key=True)
+    email: Mapped[str] = mapped_column(String(255), unique=True, index=True)
+    password_hash: Mapped[str] = mapped_column(String(255))
+    name: Mapped[str] = mapped_column(String(255))
+    avatar: Mapped[Optional[str]] = mapped_column(String(10), default='👤')
+    is_admin: Mapped[bool] = mapped_column(default=False)
+    is_locked: Mapped[bool] = mapped_column(default=False)
+    security_score: Mapped[int] = mapped_column(default=50)
+    # Bumped to revoke every token issued before a security-relevant change
+    token_version: Mapped[int] = mapped_column(default=0)
+    created_at: Mapped[datetime] = mapped_column(default=datetime.utcnow)
+    updated_at: Mapped[datetime] = mapped_column(default=datetime.utcnow, onupdate=datetime.utcnow)
     
-    # Relationships
-    posts = db.relationship('Post', backref='author', lazy=True, cascade='all, delete-orphan')
-    messages_sent = db.relationship('Message', foreign_keys='Message.sender_id', backref='sender', lazy=True)
-    messages_received = db.relationship('Message', foreign_keys='Message.receiver_id', backref='receiver', lazy=True)
-    security_events = db.relationship('SecurityEvent', backref='user', lazy=True, cascade='all, delete-orphan')
-    behavioral_data = db.relationship('BehavioralData', backref='user', lazy=True, cascade='all, delete-orphan')
+    # Collections are never loaded implicitly: query them explicitly, and
+    # let the database cascade deletes instead of loading children first
+    posts: Mapped[List['Post']] = relationship(
+        back_populates='author', lazy='raise', cascade='all, delete-orphan', passive_deletes=True
+    )
+    messages_sent: Mapped[List['Message']] = relationship(
+        foreign_keys='Message.sender_id', back_populates='sender', lazy='raise'
+    )
+    messages_received: Mapped[List['Message']] = relationship(
+        foreign_keys='Message.receiver_id', back_populates='receiver', lazy='raise'
+    )
+    security_events: Mapped[List['SecurityEvent']] = relationship(
+        back_populates='user', lazy='raise', cascade='all, delete-orphan', passive_deletes=True
+    )
+    behavioral_data: Mapped[List['BehavioralData']] = relationship(
+        back_populates='user', lazy='raise', cascade='all, delete-orphan', passive_deletes=True
+    )
     
+    # Blocking helpers for scripts; request handlers use utils.passwords.password_hasher
     def set_password(self, password):
-        self.password_hash = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+        self.password_hash = hash_password(password)
     
     def check_password(self, password):
-        return bcrypt.checkpw(password.encode('utf-8'), self.password_hash.encode('utf-8'))
+        return check_password(password, self.password_hash)
     
     def to_dict(self):
-        return {
-            'id': self.id,
-            'email': self.email,
-            'name': self.name,
-            'avatar': self.avatar,
-            'is_admin': self.is_admin,
-            'is_locked': self.is_locked,
-            'security_score': self.security_score,
-            'created_at': self.created_at.isoformat() if self.created_at else None
-        }
+        return serialize_user(self)
+
+# Columns for serialize_user when listing users without loading ORM objects
+USER_COLUMNS = (
+    User.id,
+    User.email,
+    User.name,
+    User.avatar,
+    User.is_admin,
+    User.is_locked,
+    User.security_score,
+    User.created_at,
+)
+
+def serialize_user(row) -> dict:
+    """Public user fields from a User or a row selected with USER_COLUMNS."""
+    return {
+        'id': row.id,
+        'email': row.email,
+        'name': row.name,
+        'avatar': row.avatar,
+        'is_admin': row.is_admin,
+        'is_locked': row.is_locked,
+        'security_score': row.security_score,
+        'created_at': row.created_at.isoformat() if row.created_at else None
+    }
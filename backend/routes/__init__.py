@@ -1,7 +1,3 @@
-from routes.auth import auth_bp
-from routes.posts import posts_bp
-from routes.messages import messages_bp
-from routes.security import security_bp
-from routes.admin import admin_bp
+from routes import auth, posts, messages, security, admin
 
-__all__ = ['auth_bp', 'posts_bp', 'messages_bp', 'security_bp', 'admin_bp']
+__all__ = ['auth', 'posts', 'messages', 'security', 'admin']
@@ -1,14 +1,27 @@
-from fastapi import APIRouter, Depends, HTTPException
+import json
+from typing import Optional, List
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
-from database import get_db
-from models.user import User
-from models.post import Post
-from models.message import Message
-from utils.auth import get_current_admin_user
+from datetime import datetime, timedelta
+from sqlalchemy import select, update, func, case, desc, tuple_, and_
+from config import settings
+from database import get_db, pool_metrics, replica_pool_metrics, read_session
+from models.user import User, USER_COLUMNS, serialize_user
+from models.security_event import SecurityEvent
+from models.security_rollup import SecurityRollup
+from services.behavioguard import RISK_LEVELS
+from services.row_counts import table_counts
+from schemas import BulkUserAction
+from utils.auth import get_current_admin_user, get_read_db
+from utils.principal_cache import principal_cache
+from utils.passwords import password_hasher
+from utils.pagination import decode_cursor, next_cursor
 
 router = APIRouter()
 
+THREAT_LEVELS = ('high', 'critical')
+
 @router.get("/dashboard", response_model=dict)
 async def get_admin_dashboard(
     db: AsyncSession = Depends(get_db),
@@ -16,7 +29,8 @@ async def get_admin_dashboard(
 ):
     """
     Admin dashboard with statistics.
-    Returns mock security data since we don't store behavioral events.
+    Security figures come from the security_rollups buckets, so the cost
+    doesn't grow with the number of recorded events.
     """
     
     # Get active users count
@@ -25,44 +39,223 @@ async def get_admin_dashboard(
     )
     active_users = active_users_result.scalar()
     
-    # Mock security data (since we don't store security events)
-    risk_distribution = {
-        'trusted': 120,
-        'low': 45,
-        'medium': 23,
-        'high': 8,
-        'critical': 2
-    }
+    now = datetime.utcnow()
+    midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    
+    # Last 24 hours by risk level, plus today's share (midnight is always within the window)
+    levels_result = await db.execute(
+        select(
+            SecurityRollup.risk_level,
+            func.sum(SecurityRollup.event_count),
+            func.sum(SecurityRollup.risk_score_sum),
+            func.sum(case((SecurityRollup.bucket_start >= midnight, SecurityRollup.event_count), else_=0))
+        )
+        .where(
+            SecurityRollup.granularity == 'hour',
+            SecurityRollup.bucket_start >= now - timedelta(hours=24)
+        )
+        .group_by(SecurityRollup.risk_level)
+    )
+    
+    risk_distribution = {level: 0 for level in RISK_LEVELS}
+    threats_blocked_today = 0
+    total_events = 0
+    total_score = 0
+    for level, count, score_sum, today_count in levels_result.all():
+        risk_distribution[level] = int(count)
+        total_events += int(count)
+        total_score += int(score_sum)
+        if level in THREAT_LEVELS:
+            threats_blocked_today += int(today_count)
+    
+    # Per-minute event volume for the last hour
+    activity_result = await db.execute(
+        select(SecurityRollup.bucket_start, func.sum(SecurityRollup.event_count))
+        .where(
+            SecurityRollup.granularity == 'minute',
+            SecurityRollup.bucket_start >= now - timedelta(hours=1)
+        )
+        .group_by(SecurityRollup.bucket_start)
+        .order_by(SecurityRollup.bucket_start)
+    )
     
+    threats_result = await db.execute(
+        select(SecurityEvent)
+        .where(SecurityEvent.risk_level.in_(THREAT_LEVELS))
+        .order_by(desc(SecurityEvent.created_at))
+        .limit(10)
+    )
     active_threats = [
         {
-            'event_type': 'suspicious_login',
-            'risk_score': 75,
-            'risk_level': 'high',
-            'user_id': 5,
-            'reason': 'Unusual typing pattern detected',
-            'created_at': '2024-11-12T09:15:00'
+            'event_type': event.event_type,
+            'risk_score': event.risk_score,
+            'risk_level': event.risk_level,
+            'user_id': event.user_id,
+            'reason': event.reason,
+            'created_at': event.created_at.isoformat() if event.created_at else None
         }
+        for event in threats_result.scalars().all()
     ]
     
     return {
         'active_users': active_users,
-        'threats_blocked_today': 12,
+        'threats_blocked_today': threats_blocked_today,
         'risk_distribution': risk_distribution,
         'active_threats': active_threats,
-        'avg_risk_score': 28.5
+        'avg_risk_score': round(total_score / total_events, 1) if total_events else 0,
+        'recent_activity': [
+            {'minute': bucket_start.isoformat(), 'events': int(count)}
+            for bucket_start, count in activity_result.all()
+        ]
     }
 
+def user_filters(
+    locked: Optional[bool] = None,
+    admin: Optional[bool] = None,
+    min_security_score: Optional[int] = None,
+    max_security_score: Optional[int] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None
+) -> list:
+    """WHERE clauses for the admin user listing's query parameters."""
+    conditions = []
+    if locked is not None:
+        conditions.append(User.is_locked == locked)
+    if admin is not None:
+        conditions.append(User.is_admin == admin)
+    if min_security_score is not None:
+        conditions.append(User.security_score >= min_security_score)
+    if max_security_score is not None:
+        conditions.append(User.security_score <= max_security_score)
+    if created_after is not None:
+        conditions.append(User.created_at >= created_after)
+    if created_before is not None:
+        conditions.append(User.created_at < created_before)
+    return conditions
+
 @router.get("/users", response_model=dict)
 async def get_all_users(
+    cursor: Optional[str] = None,
+    limit: int = Query(settings.ADMIN_USERS_PAGE_SIZE, ge=1, le=settings.ADMIN_USERS_MAX_PAGE_SIZE),
+    format: str = Query('json', pattern='^(json|ndjson)$'),
+    conditions: list = Depends(user_filters),
+    db: AsyncSession = Depends(get_read_db),
+    admin_user: User = Depends(get_current_admin_user)
+):
+    """
+    Users newest first, keyset-paginated on (created_at, id) and filtered
+    server-side. With format=ndjson the whole filtered listing (from the
+    cursor on) is streamed one user per line, a page at a time, so the
+    table can be walked in constant memory.
+    """
+    try:
+        before = decode_cursor(cursor) if cursor else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    
+    if format == 'ndjson':
+        return StreamingResponse(
+            _stream_users(admin_user.id, conditions, before),
+            media_type='application/x-ndjson'
+        )
+    
+    rows = await _fetch_users(db, conditions, limit + 1, before)
+    
+    return {
+        "users": [serialize_user(row) for row in rows[:limit]],
+        "next_cursor": next_cursor(rows, limit)
+    }
+
+async def _fetch_users(db: AsyncSession, conditions: list, limit: int, before=None):
+    query = (
+        select(*USER_COLUMNS)
+        .where(*conditions)
+        .order_by(desc(User.created_at), desc(User.id))
+        .limit(limit)
+    )
+    if before is not None:
+        query = query.where(tuple_(User.created_at, User.id) < tuple_(*before))
+    result = await db.execute(query)
+    return result.all()
+
+async def _stream_users(admin_id: int, conditions: list, before=None):
+    # The request's session is closed before the body is sent, and one short
+    # query per batch never holds a snapshot or pooled connection for the
+    # whole walk
+    batch_size = settings.ADMIN_USERS_STREAM_BATCH
+    while True:
+        async with read_session(admin_id) as db:
+            rows = await _fetch_users(db, conditions, batch_size, before)
+        if not rows:
+            return
+        yield ''.join(json.dumps(serialize_user(row)) + '\n' for row in rows)
+        if len(rows) < batch_size:
+            return
+        before = (rows[-1].created_at, rows[-1].id)
+
+# Column changes per admin action, applied in one UPDATE ... RETURNING
+USER_ACTIONS = {
+    # Locking also revokes every token issued to the user so far
+    'lock': {'is_locked': True, 'token_version': func.coalesce(User.token_version, 0) + 1},
+    'unlock': {'is_locked': False},
+    'make_admin': {'is_admin': True},
+}
+
+async def _update_users(db: AsyncSession, action: str, condition) -> List[int]:
+    """Apply an admin action to every matching user; returns the updated ids."""
+    result = await db.execute(
+        update(User)
+        .where(condition)
+        .values(**USER_ACTIONS[action])
+        .returning(User.id)
+        .execution_options(synchronize_session=False)
+    )
+    user_ids = list(result.scalars())
+    await db.commit()
+    principal_cache.invalidate_many(user_ids)
+    return user_ids
+
+@router.post("/users/bulk", response_model=dict)
+async def bulk_user_action(
+    payload: BulkUserAction,
     db: AsyncSession = Depends(get_db),
     admin_user: User = Depends(get_current_admin_user)
 ):
-    result = await db.execute(select(User))
-    users = result.scalars().all()
+    """
+    Lock, unlock or promote many users in one statement, selected either by
+    id or by recent high-risk security events (e.g. a flagged botnet).
+    """
+    if (payload.user_ids is None) == (payload.risk_filter is None):
+        raise HTTPException(status_code=400, detail="Provide either user_ids or risk_filter")
+    
+    if payload.user_ids is not None:
+        if len(payload.user_ids) > settings.ADMIN_BULK_MAX_USER_IDS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"At most {settings.ADMIN_BULK_MAX_USER_IDS} user_ids per request"
+            )
+        condition = User.id.in_(payload.user_ids)
+    else:
+        if payload.action == 'make_admin':
+            raise HTTPException(status_code=400, detail="make_admin requires explicit user_ids")
+        risk_filter = payload.risk_filter
+        flagged = select(SecurityEvent.user_id).where(
+            SecurityEvent.created_at >= datetime.utcnow() - timedelta(minutes=risk_filter.within_minutes),
+            SecurityEvent.risk_score >= risk_filter.min_risk_score
+        )
+        if risk_filter.event_type:
+            flagged = flagged.where(SecurityEvent.event_type == risk_filter.event_type)
+        # A risk sweep must never lock the operators out of the console
+        condition = and_(User.id.in_(flagged), User.id != admin_user.id)
+        if not risk_filter.include_admins:
+            condition = and_(condition, User.is_admin.is_(False))
+    
+    user_ids = await _update_users(db, payload.action, condition)
     
     return {
-        "users": [user.to_dict() for user in users]
+        "action": payload.action,
+        "updated": len(user_ids),
+        "user_ids": user_ids
     }
 
 @router.post("/users/{user_id}/lock", response_model=dict)
@@ -71,15 +264,9 @@ async def lock_user(
     db: AsyncSession = Depends(get_db),
     admin_user: User = Depends(get_current_admin_user)
 ):
-    result = await db.execute(select(User).where(User.id == user_id))
-    user = result.scalar_one_or_none()
-    
-    if not user:
+    if not await _update_users(db, 'lock', User.id == user_id):
         raise HTTPException(status_code=404, detail="User not found")
     
-    user.is_locked = True
-    await db.commit()
-    
     return {"message": "User locked successfully"}
 
 @router.post("/users/{user_id}/unlock", response_model=dict)
@@ -88,15 +275,9 @@ async def unlock_user(
     db: AsyncSession = Depends(get_db),
     admin_user: User = Depends(get_current_admin_user)
 ):
-    result = await db.execute(select(User).where(User.id == user_id))
-    user = result.scalar_one_or_none()
-    
-    if not user:
+    if not await _update_users(db, 'unlock', User.id == user_id):
         raise HTTPException(status_code=404, detail="User not found")
     
-    user.is_locked = False
-    await db.commit()
-    
     return {"message": "User unlocked successfully"}
 
 @router.post("/users/{user_id}/make-admin", response_model=dict)
@@ -105,31 +286,41 @@ async def make_admin(
     db: AsyncSession = Depends(get_db),
     admin_user: User = Depends(get_current_admin_user)
 ):
-    result = await db.execute(select(User).where(User.id == user_id))
-    user = result.scalar_one_or_none()
-    
-    if not user:
+    if not await _update_users(db, 'make_admin', User.id == user_id):
         raise HTTPException(status_code=404, detail="User not found")
     
-    user.is_admin = True
-    await db.commit()
-    
     return {"message": "User granted admin privileges"}
 
 @router.get("/stats", response_model=dict)
 async def get_stats(
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     admin_user: User = Depends(get_current_admin_user)
 ):
-    """Get platform statistics"""
+    """
+    Get platform statistics.
+    Counts come from trigger-maintained counters (or pg_class estimates)
+    behind a short TTL cache, never from count(*) scans.
+    """
     
-    # Get counts
-    users_result = await db.execute(select(func.count(User.id)))
-    posts_result = await db.execute(select(func.count(Post.id)))
-    messages_result = await db.execute(select(func.count(Message.id)))
+    stats = await table_counts.get(db)
+    counts = stats['counts']
     
     return {
-        "total_users": users_result.scalar(),
-        "total_posts": posts_result.scalar(),
-        "total_messages": messages_result.scalar()
-    }
\ No newline at end of file
+        "total_users": counts['users'],
+        "total_posts": counts['posts'],
+        "total_messages": counts['messages'],
+        "approximate": stats['approximate']
+    }
+
+@router.get("/password-pool", response_model=dict)
+async def get_password_pool_metrics(admin_user: User = Depends(get_current_admin_user)):
+    """Password hashing pool latency, queue wait and rejections"""
+    return password_hasher.metrics()
+
+@router.get("/db-pool", response_model=dict)
+async def get_db_pool_metrics(admin_user: User = Depends(get_current_admin_user)):
+    """Database connection pool usage, saturation and reconnects"""
+    return {
+        **pool_metrics.metrics(),
+        "replicas": [metrics.metrics() for metrics in replica_pool_metrics]
+    }
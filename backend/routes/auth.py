@@ -1,15 +1,20 @@
+from typing import Union
 from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from database import get_db
 from models.user import User
-from schemas import UserRegister, UserLogin, UserResponse, TokenResponse, ChallengeResponse
-from utils.auth import create_access_token, create_refresh_token, get_current_user, get_current_active_user
+from schemas import UserRegister, UserLogin, UserEnvelope, RegisterResponse, TokenResponse, ChallengeResponse
+from utils.auth import create_access_token, create_refresh_token, get_current_user, get_current_active_user, user_claims
 from services.behavioguard import BehavioGuard
+from services.baseline_store import baseline_store
+from services.instrumentation import phase
+from services.security_events import security_events, build_event
+from utils.passwords import password_hasher, PoolSaturatedError
 
 router = APIRouter()
 
-@router.post("/register", response_model=dict)
+@router.post("/register", response_model=RegisterResponse)
 async def register(user_data: UserRegister, db: AsyncSession = Depends(get_db)):
     # Check if user exists
     result = await db.execute(select(User).where(User.email == user_data.email))
@@ -18,13 +23,19 @@ async def register(user_data: UserRegister, db: AsyncSession = Depends(get_db)):
     if existing_user:
         raise HTTPException(status_code=400, detail="Email already exists")
     
+    # End the read transaction so no pooled connection is held while bcrypt runs
+    await db.rollback()
+    
     # Create new user
     user = User(
         email=user_data.email,
         name=user_data.name,
         avatar=user_data.avatar
     )
-    user.set_password(user_data.password)
+    try:
+        user.password_hash = await password_hasher.hash(user_data.password)
+    except PoolSaturatedError:
+        raise HTTPException(status_code=503, detail="Server busy, try again", headers={"Retry-After": "1"})
     
     db.add(user)
     await db.commit()
@@ -32,10 +43,10 @@ async def register(user_data: UserRegister, db: AsyncSession = Depends(get_db)):
     
     return {
         "message": "User registered successfully",
-        "user": user.to_dict()
+        "user": user
     }
 
-@router.post("/login")
+@router.post("/login", response_model=Union[TokenResponse, ChallengeResponse])
 async def login(
     login_data: UserLogin,
     request: Request,
@@ -45,25 +56,53 @@ async def login(
     result = await db.execute(select(User).where(User.email == login_data.email))
     user = result.scalar_one_or_none()
     
-    if not user or not user.check_password(login_data.password):
+    if not user:
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+    
+    # Keep the loaded user but return the connection to the pool while
+    # bcrypt runs; logins queued on the hasher would otherwise exhaust it
+    db.expunge(user)
+    await db.rollback()
+    
+    try:
+        password_ok = await password_hasher.verify(login_data.password, user.password_hash)
+    except PoolSaturatedError:
+        raise HTTPException(status_code=503, detail="Server busy, try again", headers={"Retry-After": "1"})
+    
+    if not password_ok:
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
     if user.is_locked:
         raise HTTPException(status_code=403, detail="Account locked. Contact support.")
     
-    # Analyze risk (in-memory only, not stored)
+    # Analyze risk against the user's own baseline
+    baseline = await baseline_store.load(db, user.id)
     behavioguard = BehavioGuard()
-    risk_analysis = behavioguard.analyze_login(
+    with phase('behavioguard'):
+        risk_analysis = behavioguard.analyze_login(
+            user_id=user.id,
+            behavioral_data=login_data.behavioral_data,
+            ip_address=request.client.host,
+            device_info=request.headers.get('user-agent', 'Unknown'),
+            baseline=baseline
+        )
+    
+    await security_events.put(build_event(
         user_id=user.id,
-        behavioral_data=login_data.behavioral_data,
+        event_type='login',
+        risk_score=risk_analysis['risk_score'],
+        risk_level=risk_analysis['risk_level'],
+        reason=risk_analysis['reason'],
+        signals=risk_analysis['signals'],
+        action_taken='challenge' if risk_analysis['requires_challenge'] else 'allowed',
         ip_address=request.client.host,
-        device_info=request.headers.get('user-agent', 'Unknown')
-    )
+        device_info={'user_agent': request.headers.get('user-agent', 'Unknown')}
+    ))
     
     # Check if challenge required
     if risk_analysis['requires_challenge']:
         session_token = create_access_token(
-            data={"sub": str(user.id), "pending": True}
+            data={**user_claims(user), "pending": True}
         )
         return {
             "requires_challenge": True,
@@ -73,18 +112,23 @@ async def login(
             "session_token": session_token
         }
     
+    # Only trusted logins feed the baseline. Snapshots are flushed on their
+    # own session, and a failed flush (retried next time) never fails the login
+    baseline_store.update(user.id, login_data.behavioral_data)
+    await baseline_store.flush_when_due()
+    
     # Successful login
-    access_token = create_access_token(data={"sub": str(user.id)})
-    refresh_token = create_refresh_token(data={"sub": str(user.id)})
+    access_token = create_access_token(data=user_claims(user))
+    refresh_token = create_refresh_token(data=user_claims(user))
     
     return {
         "access_token": access_token,
         "refresh_token": refresh_token,
-        "user": user.to_dict(),
+        "user": user,
         "risk_score": risk_analysis['risk_score']
     }
 
-@router.post("/verify-challenge")
+@router.post("/verify-challenge", response_model=TokenResponse, response_model_exclude_none=True)
 async def verify_challenge(
     challenge_data: dict,
     current_user: User = Depends(get_current_user),
@@ -99,20 +143,20 @@ async def verify_challenge(
     if not verified:
         raise HTTPException(status_code=401, detail="Challenge verification failed")
     
-    access_token = create_access_token(data={"sub": str(current_user.id)})
-    refresh_token = create_refresh_token(data={"sub": str(current_user.id)})
+    access_token = create_access_token(data=user_claims(current_user))
+    refresh_token = create_refresh_token(data=user_claims(current_user))
     
     return {
         "access_token": access_token,
         "refresh_token": refresh_token,
-        "user": current_user.to_dict()
+        "user": current_user
     }
 
-@router.get("/me", response_model=dict)
+@router.get("/me", response_model=UserEnvelope)
 async def get_current_user_info(current_user: User = Depends(get_current_active_user)):
-    return {"user": current_user.to_dict()}
+    return {"user": current_user}
 
 @router.post("/refresh")
 async def refresh_token(current_user: User = Depends(get_current_user)):
-    access_token = create_access_token(data={"sub": str(current_user.id)})
+    access_token = create_access_token(data=user_claims(current_user))
     return {"access_token": access_token}
\ No newline at end of file
@@ -1,87 +1,181 @@
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, WebSocket, WebSocketDisconnect, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, or_, and_, distinct
-from database import get_db
+from sqlalchemy import select, update, desc, tuple_, union_all
+from config import settings
+from database import get_db, async_session_maker
 from models.user import User
-from models.message import Message
-from schemas import MessageCreate, MessageResponse, ConversationUser
-from utils.auth import get_current_active_user
+from models.message import Message, MESSAGE_COLUMNS, sender_side
+from models.conversation import Conversation
+from schemas import MessageCreate, MessageResponse, MessagePage, MessageEnvelope, ConversationUser
+from services.message_hub import message_hub
+from services.conversations import record_message, mark_read
+from utils.auth import get_current_active_user, get_read_db, authenticate_token
+from utils.rate_limit import throttle
+from utils.pagination import decode_cursor, next_cursor
 
 router = APIRouter()
 
+@router.websocket("/ws")
+async def messages_socket(websocket: WebSocket, token: str):
+    """
+    Push channel for new messages and read receipts.
+    Browsers can't set headers on WebSocket requests, so the access token
+    comes in the query string.
+    """
+    try:
+        async with async_session_maker() as db:
+            user = await authenticate_token(token, db)
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    
+    if user.is_locked:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    
+    await websocket.accept()
+    message_hub.connect(user.id, websocket)
+    try:
+        while True:
+            data = await websocket.receive_json()
+            # Valid JSON that isn't an object carries no command
+            if not isinstance(data, dict):
+                continue
+            if data.get('type') == 'ping':
+                await websocket.send_json({'type': 'pong'})
+    except (WebSocketDisconnect, ValueError):
+        pass
+    finally:
+        message_hub.disconnect(user.id, websocket)
+
 @router.get("/conversations", response_model=dict)
 async def get_conversations(
-    db: AsyncSession = Depends(get_db),
+    cursor: Optional[str] = None,
+    limit: int = Query(settings.CONVERSATIONS_PAGE_SIZE, ge=1, le=settings.CONVERSATIONS_MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    # Get unique user IDs from sent and received messages
-    sent_query = select(distinct(Message.receiver_id)).where(Message.sender_id == current_user.id)
-    received_query = select(distinct(Message.sender_id)).where(Message.receiver_id == current_user.id)
-    
-    sent_result = await db.execute(sent_query)
-    received_result = await db.execute(received_query)
+    """
+    Conversation list with last message and unread count, most recent first.
+    One indexed query over the conversations summary table, keyset-paginated,
+    served from a replica.
+    """
+    try:
+        after = decode_cursor(cursor) if cursor else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
     
-    sent_ids = set(sent_result.scalars().all())
-    received_ids = set(received_result.scalars().all())
-    user_ids = sent_ids.union(received_ids)
-    
-    if not user_ids:
-        return {"conversations": []}
+    query = (
+        select(Conversation, User.name, User.avatar)
+        .join(User, User.id == Conversation.peer_id)
+        .where(Conversation.user_id == current_user.id)
+        .order_by(desc(Conversation.last_message_at), desc(Conversation.peer_id))
+        .limit(limit + 1)
+    )
+    if after is not None:
+        query = query.where(tuple_(Conversation.last_message_at, Conversation.peer_id) < tuple_(*after))
     
-    # Get user details
-    users_result = await db.execute(select(User).where(User.id.in_(user_ids)))
-    users = users_result.scalars().all()
+    rows = (await db.execute(query)).all()
     
     return {
         "conversations": [
-            {"id": u.id, "name": u.name, "avatar": u.avatar}
-            for u in users
-        ]
+            {
+                "id": convo.peer_id,
+                "name": name,
+                "avatar": avatar,
+                "last_message": convo.last_message_text,
+                "last_message_from_me": convo.last_sender_id == current_user.id,
+                "last_message_at": convo.last_message_at.isoformat(),
+                "time": convo.last_message_at.strftime('%I:%M %p'),
+                "unread_count": convo.unread_count
+            }
+            for convo, name, avatar in rows[:limit]
+        ],
+        "next_cursor": next_cursor(
+            rows, limit,
+            key=lambda row: (row[0].last_message_at, row[0].peer_id)
+        )
     }
 
-@router.get("/{receiver_id}", response_model=dict)
+@router.get("/{receiver_id}", response_model=MessagePage)
 async def get_messages(
     receiver_id: int,
+    before: Optional[str] = None,
+    limit: int = Query(settings.MESSAGES_PAGE_SIZE, ge=1, le=settings.MESSAGES_MAX_PAGE_SIZE),
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    # Get all messages between current user and receiver
-    result = await db.execute(
-        select(Message).where(
-            or_(
-                and_(Message.sender_id == current_user.id, Message.receiver_id == receiver_id),
-                and_(Message.sender_id == receiver_id, Message.receiver_id == current_user.id)
-            )
-        ).order_by(Message.created_at)
-    )
-    messages = result.scalars().all()
+    """
+    Conversation history, newest page first, keyset-paginated with `before`.
+    Messages within a page are returned oldest to newest.
+    """
+    try:
+        cursor = decode_cursor(before) if before else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
     
-    # Mark messages as read
-    unread_result = await db.execute(
-        select(Message).where(
-            and_(
+    # Opening the conversation marks everything from the peer as read in one statement
+    read_ids = []
+    if cursor is None:
+        read_result = await db.execute(
+            update(Message)
+            .where(
                 Message.sender_id == receiver_id,
                 Message.receiver_id == current_user.id,
                 Message.is_read == False
             )
+            .values(is_read=True)
+            .returning(Message.id)
+            .execution_options(synchronize_session=False)
         )
-    )
-    unread_messages = unread_result.scalars().all()
+        read_ids = read_result.scalars().all()
+        if read_ids:
+            await mark_read(db, current_user.id, receiver_id)
     
-    for msg in unread_messages:
-        msg.is_read = True
+    # Each direction is an index range scan on (sender_id, receiver_id, created_at)
+    def direction(sender_id: int, recipient_id: int):
+        query = select(Message.id).where(
+            Message.sender_id == sender_id,
+            Message.receiver_id == recipient_id
+        )
+        if cursor is not None:
+            query = query.where(tuple_(Message.created_at, Message.id) < tuple_(*cursor))
+        return query.order_by(desc(Message.created_at), desc(Message.id)).limit(limit + 1)
     
-    await db.commit()
+    page_ids = union_all(
+        direction(current_user.id, receiver_id),
+        direction(receiver_id, current_user.id)
+    ).subquery()
+    
+    result = await db.execute(
+        select(*MESSAGE_COLUMNS, sender_side(current_user.id))
+        .join(page_ids, Message.id == page_ids.c.id)
+        .join(User, User.id == Message.sender_id)
+        .order_by(desc(Message.created_at), desc(Message.id))
+        .limit(limit + 1)
+    )
+    messages = result.all()
+    
+    # Only a mark-read is a write; committing otherwise would pin the user to the primary
+    if read_ids:
+        await db.commit()
+        await message_hub.publish(receiver_id, {
+            'type': 'read',
+            'peer_id': current_user.id,
+            'message_ids': read_ids
+        })
     
     return {
-        "messages": [msg.to_dict(current_user.id) for msg in messages]
+        "messages": messages[:limit][::-1],
+        "next_before": next_cursor(messages, limit)
     }
 
-@router.post("", response_model=dict)
+@router.post("", response_model=MessageEnvelope)
 async def send_message(
     message_data: MessageCreate,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: User = Depends(throttle('message'))
 ):
     # Check if receiver exists
     result = await db.execute(select(User).where(User.id == message_data.receiver_id))
@@ -97,7 +191,28 @@ async def send_message(
     )
     
     db.add(message)
+    await db.flush()
+    await record_message(db, message)
     await db.commit()
     await db.refresh(message)
     
-    return {"message": message.to_dict(current_user.id)}
\ No newline at end of file
+    # Push to the receiver and to the sender's other open sessions
+    await message_hub.publish(receiver.id, {
+        'type': 'message',
+        'peer_id': current_user.id,
+        'message': message.to_dict(receiver.id, sender=current_user)
+    })
+    await message_hub.publish(current_user.id, {
+        'type': 'message',
+        'peer_id': receiver.id,
+        'message': message.to_dict(current_user.id, sender=current_user)
+    })
+    
+    return {"message": MessageResponse(
+        id=message.id,
+        text=message.text,
+        sender='me',
+        sender_name=current_user.name,
+        is_read=message.is_read,
+        created_at=message.created_at
+    )}
\ No newline at end of file
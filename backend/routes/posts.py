@@ -1,31 +1,95 @@
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, desc
+from sqlalchemy import select, desc, tuple_
+from config import settings
 from database import get_db
 from models.user import User
-from models.post import Post
-from schemas import PostCreate, PostResponse
-from utils.auth import get_current_active_user
+from models.post import Post, POST_COLUMNS
+from schemas import PostCreate, PostResponse, FeedPage, PostEnvelope
+from services.behavioral_log import behavioral_log, build_behavioral_row
+from services.feed_cache import feed_cache
+from services.like_counter import like_counter
+from utils.auth import get_current_active_user, get_read_db
+from utils.rate_limit import throttle
+from utils.pagination import encode_cursor, decode_cursor, next_cursor
 
 router = APIRouter()
 
-@router.get("", response_model=dict)
-async def get_posts(db: AsyncSession = Depends(get_db), current_user: User = Depends(get_current_active_user)):
-    result = await db.execute(
-        select(Post).order_by(desc(Post.created_at)).limit(50)
-    )
-    posts = result.scalars().all()
+@router.get("", response_model=FeedPage)
+async def get_posts(
+    cursor: Optional[str] = None,
+    limit: int = Query(settings.FEED_PAGE_SIZE, ge=1, le=settings.FEED_MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_db),
+    read_db: AsyncSession = Depends(get_read_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Newest-first feed with keyset pagination on (created_at, id).
+    The first page is served from the in-process feed head cache; older
+    pages are read from a replica.
+    """
     
-    return {"posts": [post.to_dict() for post in posts]}
+    if cursor is None and limit <= feed_cache.size:
+        cached = feed_cache.head(limit)
+        if cached is None:
+            # Refill the whole head so following first-page reads hit the cache.
+            # The cache outlives replica lag, so it is filled from the primary.
+            posts = await _fetch_posts(db, feed_cache.size + 1)
+            feed_cache.fill(
+                [(post.created_at, PostResponse.model_validate(post)) for post in posts],
+                complete=len(posts) <= feed_cache.size
+            )
+            cached = feed_cache.head(limit)
+            if cached is None:
+                # Nothing cached (FEED_CACHE_TTL_SECONDS=0, or invalidated meanwhile): use the rows just read
+                return {"posts": posts[:limit], "next_cursor": next_cursor(posts, limit)}
+        
+        page, has_more = cached
+        last_key = feed_cache.last_key(limit)
+        return {
+            "posts": page,
+            "next_cursor": encode_cursor(*last_key) if has_more and last_key else None
+        }
+    
+    try:
+        before = decode_cursor(cursor) if cursor else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    
+    posts = await _fetch_posts(read_db, limit + 1, before)
+    
+    # Rows go to the response model as they are; no dicts are built per post
+    return {
+        "posts": posts[:limit],
+        "next_cursor": next_cursor(posts, limit)
+    }
 
-@router.post("", response_model=dict)
+async def _fetch_posts(db: AsyncSession, limit: int, before=None):
+    # One query of plain rows: author columns are joined in and no ORM objects are built
+    query = (
+        select(*POST_COLUMNS)
+        .join(User, User.id == Post.user_id)
+        .order_by(desc(Post.created_at), desc(Post.id))
+        .limit(limit)
+    )
+    if before is not None:
+        query = query.where(tuple_(Post.created_at, Post.id) < tuple_(*before))
+    result = await db.execute(query)
+    return result.all()
+
+@router.post("", response_model=PostEnvelope)
 async def create_post(
     post_data: PostCreate,
+    request: Request,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: User = Depends(throttle('post'))
 ):
-    # Note: behavioral_data is received but not stored in database
-    # It can be analyzed in-memory if needed for security purposes
+    # Stored by the background writer, off the request path
+    if post_data.behavioral_data:
+        await behavioral_log.put(build_behavioral_row(
+            current_user.id, post_data.behavioral_data, ip_address=request.client.host
+        ))
     
     post = Post(
         user_id=current_user.id,
@@ -36,21 +100,37 @@ async def create_post(
     await db.commit()
     await db.refresh(post)
     
-    return {"post": post.to_dict()}
+    post_response = PostResponse(
+        id=post.id,
+        author=current_user.name,
+        avatar=current_user.avatar,
+        content=post.content,
+        likes=post.likes,
+        created_at=post.created_at
+    )
+    feed_cache.push(post.created_at, post_response)
+    
+    return {"post": post_response}
 
 @router.post("/{post_id}/like", response_model=dict)
 async def like_post(
     post_id: int,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: User = Depends(throttle('like'))
 ):
-    result = await db.execute(select(Post).where(Post.id == post_id))
-    post = result.scalar_one_or_none()
+    # Repeat likes are absorbed without touching the database
+    likes = like_counter.seen(current_user.id, post_id)
+    if likes is not None:
+        return {"likes": likes}
+    
+    result = await db.execute(select(Post.likes).where(Post.id == post_id))
+    persisted_likes = result.scalar_one_or_none()
     
-    if not post:
+    if persisted_likes is None:
         raise HTTPException(status_code=404, detail="Post not found")
     
-    post.likes += 1
-    await db.commit()
+    # Coalesced into one increment per post by the background flusher
+    likes = like_counter.add(current_user.id, post_id, persisted_likes)
+    feed_cache.set_likes(post_id, likes)
     
-    return {"likes": post.likes}
\ No newline at end of file
+    return {"likes": likes}
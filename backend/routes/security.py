@@ -1,9 +1,20 @@
-from fastapi import APIRouter, Depends, Request
+from functools import reduce
+from operator import or_
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Request, WebSocket, WebSocketDisconnect, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from database import get_db
+from database import get_db, async_session_maker
 from models.user import User
-from utils.auth import get_current_active_user
+from utils.auth import get_current_active_user, authenticate_token
+from config import settings
+from schemas import BehavioralBatch
 from services.behavioguard import BehavioGuard
+from services.action_rate import action_rates
+from services.baseline_store import baseline_store
+from services.behavioral_log import behavioral_log, build_behavioral_row
+from services.instrumentation import phase
+from services.security_events import security_events, build_event
+from services.telemetry import CONTENT_TYPES, DECODERS, TelemetryError, windowed_samples
 
 router = APIRouter()
 
@@ -44,17 +55,209 @@ async def get_security_dashboard(
 async def capture_behavioral_data(
     behavioral_data: dict,
     request: Request,
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """
-    Analyze behavioral data in-memory without storing to database.
-    Returns analysis results for security monitoring.
+    Store and analyze behavioral data against the user's baseline.
+    Non-suspicious samples are folded into the baseline.
     """
     
-    behavioguard = BehavioGuard()
-    analysis = behavioguard.analyze_behavioral_data(behavioral_data)
+    analysis = await _ingest_sample(db, current_user, behavioral_data, request.client.host)
     
     return {
         "message": "Behavioral data analyzed",
         "analysis": analysis
-    }
\ No newline at end of file
+    }
+
+async def _ingest_sample(db: AsyncSession, user: User, sample: dict, ip_address: str) -> dict:
+    """Store one behavioral sample, score it and fold trusted samples into the baseline."""
+    await behavioral_log.put(build_behavioral_row(user.id, sample, ip_address=ip_address))
+    
+    baseline = await baseline_store.load(db, user.id)
+    behavioguard = BehavioGuard()
+    with phase('behavioguard'):
+        analysis = behavioguard.analyze_behavioral_data(
+            sample,
+            baseline=baseline,
+            action_velocity=action_rates.velocity(user.id)
+        )
+    
+    await security_events.put(build_event(
+        user_id=user.id,
+        event_type='behavioral_sample',
+        risk_score=analysis['risk_score'],
+        risk_level=behavioguard.risk_level_for(analysis['risk_score']),
+        signals=analysis['anomalies'],
+        action_taken='flagged' if analysis['is_suspicious'] else 'none',
+        ip_address=ip_address
+    ))
+    
+    if not analysis['is_suspicious']:
+        # Snapshots go out on their own session; a failed flush never fails this sample
+        baseline_store.update(user.id, sample)
+        await baseline_store.flush_when_due()
+    
+    return analysis
+
+@router.post("/telemetry", response_model=dict)
+async def stream_telemetry(
+    request: Request,
+    session_id: Optional[str] = None,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Streaming ingestion of raw UI events (see services.telemetry for the
+    framing). Send `application/x-ndjson` or `application/octet-stream`
+    with chunked transfer encoding; the body is decoded incrementally and
+    every closed window is analyzed as it arrives.
+    """
+    
+    content_type = request.headers.get('content-type', 'application/x-ndjson').split(';')[0].strip()
+    decoder = CONTENT_TYPES.get(content_type)
+    if decoder is None:
+        raise HTTPException(status_code=415, detail=f"Unsupported telemetry format: {content_type}")
+    
+    # Authentication shares the request's session; release its connection
+    # so an unbounded upload doesn't hold one between windows
+    await db.close()
+    
+    # Only a running summary is kept, so stream length doesn't grow memory
+    window_count = 0
+    max_risk_score = 0
+    suspicious = []
+    try:
+        async for sample in windowed_samples(decoder(request.stream())):
+            sample['session_id'] = session_id
+            # A session per window, as for the WebSocket
+            async with async_session_maker() as window_db:
+                analysis = await _ingest_sample(window_db, current_user, sample, request.client.host)
+            window_count += 1
+            max_risk_score = max(max_risk_score, analysis['risk_score'])
+            if analysis['is_suspicious'] and len(suspicious) < settings.TELEMETRY_MAX_REPORTED_WINDOWS:
+                suspicious.append({
+                    "window_start": sample['window_start'],
+                    "event_count": sample['event_count'],
+                    "risk_score": analysis['risk_score'],
+                    "anomalies": analysis['anomalies']
+                })
+    except TelemetryError as e:
+        raise HTTPException(status_code=400, detail=f"{e} (after {window_count} windows)")
+    
+    return {
+        "window_count": window_count,
+        "max_risk_score": max_risk_score,
+        "suspicious_windows": suspicious
+    }
+
+@router.websocket("/telemetry/ws")
+async def telemetry_socket(
+    websocket: WebSocket,
+    token: str,
+    format: str = 'ndjson',
+    session_id: Optional[str] = None
+):
+    """
+    Telemetry over a WebSocket. Text messages carry whole NDJSON lines,
+    binary messages carry frames; each closed window's verdict is sent back.
+    """
+    decoder = DECODERS.get(format)
+    try:
+        async with async_session_maker() as db:
+            user = await authenticate_token(token, db)
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    
+    if decoder is None or user.is_locked:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    
+    await websocket.accept()
+    ip_address = websocket.client.host if websocket.client else None
+    try:
+        async for sample in windowed_samples(decoder(_socket_chunks(websocket))):
+            sample['session_id'] = session_id
+            # A session per window, so an idle socket never holds a pooled connection
+            async with async_session_maker() as db:
+                analysis = await _ingest_sample(db, user, sample, ip_address)
+            await websocket.send_json({
+                "window_start": sample['window_start'],
+                "event_count": sample['event_count'],
+                "analysis": analysis
+            })
+    except TelemetryError as e:
+        await websocket.close(code=status.WS_1003_UNSUPPORTED_DATA, reason=str(e))
+    except WebSocketDisconnect:
+        pass
+
+async def _socket_chunks(websocket: WebSocket):
+    while True:
+        message = await websocket.receive()
+        if message['type'] == 'websocket.disconnect':
+            return
+        if message.get('bytes') is not None:
+            yield message['bytes']
+        elif message.get('text') is not None:
+            yield message['text'].encode() + b'\n'
+
+@router.post("/behavioral-data/batch", response_model=dict)
+async def capture_behavioral_batch(
+    batch: BehavioralBatch,
+    request: Request,
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Score many behavioral samples in one vectorized pass.
+    Prefer `columns` over `samples` for large batches.
+    """
+    
+    behavioguard = BehavioGuard()
+    try:
+        if batch.columns is not None:
+            samples = behavioguard.columns_to_array(batch.columns)
+        else:
+            samples = behavioguard.samples_to_columns(batch.samples or [])
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    if len(samples) > settings.BEHAVIORAL_BATCH_MAX_SAMPLES:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch exceeds {settings.BEHAVIORAL_BATCH_MAX_SAMPLES} samples"
+        )
+    
+    # Column batches only carry the scoring features, so only raw samples are stored
+    if batch.columns is None:
+        for sample in batch.samples or []:
+            await behavioral_log.put(build_behavioral_row(
+                current_user.id, sample, ip_address=request.client.host
+            ))
+    
+    with phase('behavioguard'):
+        result = behavioguard.score_batch(samples)
+    
+    # One event per batch: the riskiest sample's verdict and every signal raised
+    suspicious_count = int(result['is_suspicious'].sum())
+    if len(samples):
+        riskiest = int(result['risk_scores'].argmax())
+        await security_events.put(build_event(
+            user_id=current_user.id,
+            event_type='behavioral_batch',
+            risk_score=result['risk_scores'][riskiest],
+            risk_level=result['risk_levels'][riskiest],
+            reason=f"{suspicious_count} of {len(samples)} samples suspicious",
+            signals=behavioguard.decode_signals(reduce(or_, result['signals'].tolist(), 0), result['signal_names']),
+            action_taken='flagged' if suspicious_count else 'none',
+            ip_address=request.client.host
+        ))
+    
+    return {
+        "count": len(samples),
+        "suspicious_count": suspicious_count,
+        "risk_scores": result['risk_scores'].tolist(),
+        "risk_levels": result['risk_levels'].tolist(),
+        "signals": result['signals'].tolist(),
+        "signal_names": {str(bit): name for bit, name in result['signal_names'].items()}
+    }
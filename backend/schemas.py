@@ -1,6 +1,7 @@
-from pydantic import BaseModel, EmailStr
-from typing import Optional, Dict, Any
+from pydantic import BaseModel, ConfigDict, EmailStr, Field, computed_field
+from typing import Optional, Dict, Any, List, Literal
 from datetime import datetime
+from models.post import format_relative_time
 
 # User Schemas
 class UserRegister(BaseModel):
@@ -14,14 +15,22 @@ class UserLogin(BaseModel):
     password: str
     behavioral_data: Optional[Dict[str, Any]] = {}
 
+# Response models validate straight from ORM objects and SQL rows (from_attributes),
+# so routes hand rows to FastAPI and pydantic-core encodes the JSON
 class UserResponse(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+    
     id: int
     email: str
     name: str
-    avatar: str
+    avatar: Optional[str] = None
     is_admin: bool
     is_locked: bool
-    created_at: Optional[str]
+    security_score: Optional[int] = None
+    created_at: Optional[datetime] = None
+
+class UserEnvelope(BaseModel):
+    user: UserResponse
 
 # Post Schemas
 class PostCreate(BaseModel):
@@ -29,13 +38,28 @@ class PostCreate(BaseModel):
     behavioral_data: Optional[Dict[str, Any]] = {}
 
 class PostResponse(BaseModel):
+    """Feed entry; validates from a row selected with models.post.POST_COLUMNS."""
+    model_config = ConfigDict(from_attributes=True)
+    
     id: int
-    user_id: int
-    user_name: str
-    user_avatar: str
+    author: str
+    avatar: Optional[str] = None
     content: str
     likes: int
-    created_at: Optional[str]
+    created_at: Optional[datetime] = None
+    
+    @computed_field
+    @property
+    def time(self) -> str:
+        # Relative to the moment of encoding, so cached entries stay current
+        return format_relative_time(self.created_at)
+
+class FeedPage(BaseModel):
+    posts: List[PostResponse]
+    next_cursor: Optional[str] = None
+
+class PostEnvelope(BaseModel):
+    post: PostResponse
 
 # Message Schemas
 class MessageCreate(BaseModel):
@@ -43,20 +67,62 @@ class MessageCreate(BaseModel):
     text: str
 
 class MessageResponse(BaseModel):
+    """
+    Chat message; validates from a row selected with models.message.MESSAGE_COLUMNS
+    plus sender_side() for the requesting user.
+    """
+    model_config = ConfigDict(from_attributes=True)
+    
     id: int
-    sender_id: int
-    receiver_id: int
     text: str
+    sender: Literal['me', 'them']
+    sender_name: str
     is_read: bool
-    is_own: bool
-    created_at: Optional[str]
+    created_at: Optional[datetime] = Field(default=None, exclude=True)
+    
+    @computed_field
+    @property
+    def time(self) -> str:
+        return self.created_at.strftime('%I:%M %p') if self.created_at else ''
+
+class MessagePage(BaseModel):
+    messages: List[MessageResponse]
+    next_before: Optional[str] = None
+
+class MessageEnvelope(BaseModel):
+    message: MessageResponse
 
 class ConversationUser(BaseModel):
     id: int
     name: str
-    avatar: str
+    avatar: Optional[str] = None
+
+# Behavioral Schemas
+class BehavioralBatch(BaseModel):
+    # Either row-oriented samples or column-oriented arrays ({feature: [values]})
+    samples: Optional[List[Dict[str, Any]]] = None
+    columns: Optional[Dict[str, List[Optional[float]]]] = None
+
+# Admin Schemas
+class RiskEventFilter(BaseModel):
+    # Users with a security event at or above min_risk_score in the last within_minutes
+    min_risk_score: int = Field(default=70, ge=0, le=100)
+    within_minutes: int = Field(default=60, gt=0)
+    event_type: Optional[str] = None
+    # Admins are left out unless explicitly included; the caller never matches
+    include_admins: bool = False
+
+class BulkUserAction(BaseModel):
+    action: Literal['lock', 'unlock', 'make_admin']
+    # Exactly one of user_ids / risk_filter selects the users
+    user_ids: Optional[List[int]] = None
+    risk_filter: Optional[RiskEventFilter] = None
 
 # Auth Responses
+class RegisterResponse(BaseModel):
+    message: str
+    user: UserResponse
+
 class TokenResponse(BaseModel):
     access_token: str
     refresh_token: str
@@ -0,0 +1,106 @@
+import time
+from collections import OrderedDict
+from typing import Dict, Tuple, Optional, NamedTuple
+from config import settings
+
+class RateDecision(NamedTuple):
+    allowed: bool
+    retry_after: float
+    interval_ms: Optional[float]
+    first_denial: bool
+
+class ActionBucket:
+    """
+    Token bucket plus an exponentially weighted mean of the gap between
+    requests. Both update in O(1) and take a few dozen bytes per entry.
+    """
+    
+    __slots__ = ('tokens', 'updated', 'interval_ms', 'hits', 'throttled')
+    
+    def __init__(self, capacity: float, now: float):
+        self.tokens = capacity
+        self.updated = now
+        self.interval_ms: Optional[float] = None
+        self.hits = 0
+        self.throttled = False
+
+class ActionRateTracker:
+    """
+    Per-user, per-action request rate tracker.
+    Buckets live in one OrderedDict kept in last-activity order, so idle
+    users are evicted from the front in amortized O(1) and the total number
+    of entries is capped.
+    """
+    
+    def __init__(
+        self,
+        limits: Dict[str, Tuple[int, float]] = None,
+        max_entries: int = None,
+        idle_seconds: float = None
+    ):
+        # action -> (burst capacity, refill rate in tokens per second)
+        self.limits = {
+            action: (limit, limit / window)
+            for action, (limit, window) in (limits or settings.ACTION_RATE_LIMITS).items()
+        }
+        self.max_entries = max_entries or settings.ACTION_RATE_MAX_ENTRIES
+        self.idle_seconds = idle_seconds or settings.ACTION_RATE_IDLE_SECONDS
+        self._buckets: 'OrderedDict[Tuple[int, str], ActionBucket]' = OrderedDict()
+    
+    def hit(self, user_id: int, action: str) -> RateDecision:
+        """Record one request and decide whether it may proceed."""
+        capacity, rate = self.limits[action]
+        now = time.monotonic()
+        key = (user_id, action)
+        
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = ActionBucket(capacity, now)
+        else:
+            self._buckets.move_to_end(key)
+            gap_ms = (now - bucket.updated) * 1000
+            if bucket.interval_ms is None:
+                bucket.interval_ms = gap_ms
+            else:
+                alpha = settings.ACTION_RATE_EWMA_ALPHA
+                bucket.interval_ms += alpha * (gap_ms - bucket.interval_ms)
+            bucket.tokens = min(capacity, bucket.tokens + (now - bucket.updated) * rate)
+            bucket.updated = now
+        bucket.hits += 1
+        self._evict(now)
+        
+        if bucket.tokens >= 1:
+            bucket.tokens -= 1
+            bucket.throttled = False
+            return RateDecision(True, 0.0, bucket.interval_ms, False)
+        
+        first_denial = not bucket.throttled
+        bucket.throttled = True
+        return RateDecision(False, (1 - bucket.tokens) / rate, bucket.interval_ms, first_denial)
+    
+    def velocity(self, user_id: int) -> Dict[str, float]:
+        """Mean request interval (ms) per action with enough recent history."""
+        now = time.monotonic()
+        velocities = {}
+        for action in self.limits:
+            bucket = self._buckets.get((user_id, action))
+            if bucket is None or bucket.interval_ms is None:
+                continue
+            if bucket.hits < settings.ACTION_RATE_MIN_EVENTS or now - bucket.updated > self.idle_seconds:
+                continue
+            # A pause longer than the average gap slows the estimate immediately
+            velocities[action] = max(bucket.interval_ms, (now - bucket.updated) * 1000)
+        return velocities
+    
+    def _evict(self, now: float):
+        buckets = self._buckets
+        while buckets:
+            key, oldest = next(iter(buckets.items()))
+            if now - oldest.updated < self.idle_seconds and len(buckets) <= self.max_entries:
+                break
+            del buckets[key]
+    
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+action_rates = ActionRateTracker()
@@ -0,0 +1,327 @@
+import asyncio
+import itertools
+import json
+import os
+import time
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Callable, Awaitable, Iterable
+import asyncpg
+from sqlalchemy import insert, DateTime, JSON
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncSession
+from config import settings
+from database import async_session_maker
+
+# Extra statements run in the same transaction as each batch INSERT
+FlushHook = Callable[[AsyncSession, List[Dict[str, Any]]], Awaitable[None]]
+
+OVERFLOW_POLICIES = ('block', 'drop', 'spill')
+
+_STOP = object()
+
+class BackgroundWriter:
+    """
+    Append-only writer for one table.
+    Handlers enqueue row dicts without touching the database; a flusher task
+    drains the queue with one multi-row INSERT (or asyncpg COPY) every
+    `flush_interval_ms` or `batch_size` rows, whichever comes first.
+    
+    When the queue is full, the overflow policy decides what happens:
+    'block' makes put() wait for room (backpressure), 'drop' discards the
+    row, and 'spill' appends it to a JSONL file that is replayed once the
+    database keeps up again. Batches that fail to write are spilled too;
+    rows that still fail on their own during replay are moved to a
+    quarantine file so they can't hold up the rows behind them.
+    All rows in a batch must have the same keys.
+    """
+    
+    def __init__(
+        self,
+        name: str,
+        model,
+        batch_size: int = None,
+        flush_interval_ms: int = None,
+        max_queue: int = None,
+        overflow: str = None,
+        use_copy: bool = None,
+        on_flush: Optional[FlushHook] = None
+    ):
+        self.name = name
+        self.table = model.__table__
+        self.batch_size = batch_size or settings.WRITER_BATCH_SIZE
+        self.flush_interval = (flush_interval_ms or settings.WRITER_FLUSH_INTERVAL_MS) / 1000
+        self.overflow = overflow or settings.WRITER_OVERFLOW_POLICY
+        if self.overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy: {self.overflow}")
+        self.use_copy = settings.WRITER_USE_COPY if use_copy is None else use_copy
+        self.on_flush = on_flush
+        self.spill_path = os.path.join(settings.WRITER_SPILL_DIR, f'{name}.jsonl')
+        self.quarantine_path = os.path.join(settings.WRITER_SPILL_DIR, f'{name}.quarantine.jsonl')
+        
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue or settings.WRITER_MAX_QUEUE)
+        self._task: Optional[asyncio.Task] = None
+        self._accepting = False
+        self._last_replay = 0.0
+        self._datetime_columns = [c.name for c in self.table.columns if isinstance(c.type, DateTime)]
+        self._json_columns = {c.name for c in self.table.columns if isinstance(c.type, JSON)}
+        self._stats = {
+            'enqueued': 0,
+            'written': 0,
+            'dropped': 0,
+            'spilled': 0,
+            'replayed': 0,
+            'quarantined': 0,
+            'failed_batches': 0,
+            'last_flush_ms': 0.0,
+        }
+    
+    def submit(self, row: Dict[str, Any]) -> bool:
+        """
+        Enqueue a row without waiting. Returns False if the row was dropped.
+        With the 'block' policy a full queue drops the row; use put() to wait.
+        """
+        if not self._accepting:
+            # Not started (or shutting down): don't lose the row silently
+            return self._overflow([row])
+        try:
+            self._queue.put_nowait(row)
+        except asyncio.QueueFull:
+            return self._overflow([row])
+        self._stats['enqueued'] += 1
+        return True
+    
+    async def put(self, row: Dict[str, Any]) -> bool:
+        """Enqueue a row, waiting for room when the policy is 'block'."""
+        if self.overflow != 'block' or not self._accepting:
+            return self.submit(row)
+        await self._queue.put(row)
+        self._stats['enqueued'] += 1
+        return True
+    
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            row = await self._queue.get()
+            if row is _STOP:
+                return
+            batch = [row]
+            deadline = loop.time() + self.flush_interval
+            stopping = False
+            
+            while len(batch) < self.batch_size:
+                try:
+                    row = self._queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        row = await asyncio.wait_for(self._queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                if row is _STOP:
+                    stopping = True
+                    break
+                batch.append(row)
+            
+            if await self._flush(batch) and not stopping:
+                await self._maybe_replay()
+            if stopping:
+                return
+    
+    async def _flush(self, rows: List[Dict[str, Any]]) -> bool:
+        started = time.perf_counter()
+        try:
+            await self._write(rows)
+        except Exception as e:
+            print(f"⚠️ {self.name} writer flush failed: {e}")
+            self._stats['failed_batches'] += 1
+            self._overflow(rows)
+            return False
+        self._stats['written'] += len(rows)
+        self._stats['last_flush_ms'] = round((time.perf_counter() - started) * 1000, 3)
+        return True
+    
+    async def _write(self, rows: List[Dict[str, Any]]):
+        async with async_session_maker() as session:
+            if self.use_copy:
+                await self._copy(session, rows)
+            else:
+                await session.execute(insert(self.table), rows)
+            if self.on_flush is not None:
+                await self.on_flush(session, rows)
+            await session.commit()
+    
+    async def _copy(self, session: AsyncSession, rows: List[Dict[str, Any]]):
+        # COPY skips Python-side column defaults, so rows must carry every value they need
+        columns = list(rows[0])
+        records = [
+            tuple(
+                json.dumps(row.get(col)) if col in self._json_columns and row.get(col) is not None
+                else row.get(col)
+                for col in columns
+            )
+            for row in rows
+        ]
+        connection = await session.connection()
+        raw = await connection.get_raw_connection()
+        await raw.driver_connection.copy_records_to_table(
+            self.table.name, records=records, columns=columns
+        )
+    
+    def _overflow(self, rows: List[Dict[str, Any]]) -> bool:
+        if self.overflow != 'spill':
+            self._stats['dropped'] += len(rows)
+            return False
+        try:
+            _append_lines(self.spill_path, (self._encode(row) for row in rows))
+        except OSError as e:
+            print(f"⚠️ {self.name} writer could not spill {len(rows)} rows: {e}")
+            self._stats['dropped'] += len(rows)
+            return False
+        self._stats['spilled'] += len(rows)
+        return True
+    
+    async def _maybe_replay(self):
+        now = time.monotonic()
+        if now - self._last_replay < settings.WRITER_REPLAY_INTERVAL_SECONDS:
+            return
+        self._last_replay = now
+        try:
+            await self.replay_spill()
+        except (OSError, ValueError) as e:
+            print(f"⚠️ {self.name} writer could not read spill file: {e}")
+    
+    async def replay_spill(self) -> int:
+        """
+        Write spilled rows back to the database, streaming the file in
+        `batch_size` chunks. The spill file is first renamed to `.replay`;
+        a `.replay` file left by an interrupted replay is finished first
+        and never overwritten. Undecodable lines (a torn append after a
+        crash) and rows that fail on their own are quarantined. If the
+        database is unreachable, the unreplayed rows go back to the spill.
+        """
+        replaying = self.spill_path + '.replay'
+        if not os.path.exists(replaying):
+            if not os.path.exists(self.spill_path):
+                return 0
+            os.replace(self.spill_path, replaying)
+        
+        replayed = 0
+        with open(replaying) as f:
+            batch = []
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    batch.append(self._decode(line))
+                except (ValueError, TypeError, AttributeError):
+                    self._quarantine([line.rstrip('\n')])
+                    continue
+                if len(batch) < self.batch_size:
+                    continue
+                try:
+                    replayed += await self._replay_batch(batch)
+                except Exception as e:
+                    self._respill(batch, f, e)
+                    break
+                batch = []
+            else:
+                if batch:
+                    try:
+                        replayed += await self._replay_batch(batch)
+                    except Exception as e:
+                        self._respill(batch, f, e)
+        os.remove(replaying)
+        self._stats['replayed'] += replayed
+        return replayed
+    
+    async def _replay_batch(self, rows: List[Dict[str, Any]]) -> int:
+        """
+        Write one batch, splitting it in halves on failure until the rows
+        that fail alone are found. Raises when the database is unreachable.
+        """
+        try:
+            await self._write(rows)
+            return len(rows)
+        except Exception as e:
+            if _database_unavailable(e):
+                raise
+            if len(rows) == 1:
+                print(f"⚠️ {self.name} writer quarantined a row: {e}")
+                self._quarantine([self._encode(rows[0])])
+                return 0
+        middle = len(rows) // 2
+        return await self._replay_batch(rows[:middle]) + await self._replay_batch(rows[middle:])
+    
+    def _respill(self, batch: List[Dict[str, Any]], rest: Iterable[str], error: Exception):
+        """Append the current batch and the unread spill lines back to the spill file."""
+        print(f"⚠️ {self.name} writer replay stopped, database unavailable: {error}")
+        _append_lines(
+            self.spill_path,
+            itertools.chain((self._encode(row) for row in batch), (line.rstrip('\n') for line in rest if line.strip()))
+        )
+    
+    def _quarantine(self, lines: List[str]):
+        _append_lines(self.quarantine_path, lines)
+        self._stats['quarantined'] += len(lines)
+    
+    def _encode(self, row: Dict[str, Any]) -> str:
+        return json.dumps(row, default=_encode_value)
+    
+    def _decode(self, line: str) -> Dict[str, Any]:
+        row = json.loads(line)
+        for col in self._datetime_columns:
+            if isinstance(row.get(col), str):
+                row[col] = datetime.fromisoformat(row[col])
+        return row
+    
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            **self._stats,
+            'queue_depth': self._queue.qsize(),
+            'queue_capacity': self._queue.maxsize,
+            'overflow_policy': self.overflow,
+        }
+    
+    async def start(self):
+        if self._task is not None:
+            return
+        self._accepting = True
+        self._task = asyncio.create_task(self._run())
+        # Rows spilled by a previous process go in before new traffic builds up
+        replayed = await self.replay_spill()
+        if replayed:
+            print(f"💾 Replayed {replayed} spilled {self.name} rows")
+    
+    async def stop(self):
+        """Stop accepting rows and drain everything already queued."""
+        if self._task is None:
+            return
+        self._accepting = False
+        await self._queue.put(_STOP)
+        await self._task
+        self._task = None
+
+def _append_lines(path: str, lines: Iterable[str]):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'a') as f:
+        for line in lines:
+            f.write(line + '\n')
+
+def _database_unavailable(error: Exception) -> bool:
+    # Connection-level failures, as opposed to a row the database rejects
+    if getattr(error, 'connection_invalidated', False):
+        return True
+    return isinstance(error, (
+        OSError,
+        asyncio.TimeoutError,
+        PoolTimeoutError,
+        asyncpg.PostgresConnectionError,
+        asyncpg.ConnectionDoesNotExistError,
+    ))
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Cannot spill value of type {type(value).__name__}")
@@ -0,0 +1,239 @@
+import math
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+from sqlalchemy import select, desc, delete
+from sqlalchemy.ext.asyncio import AsyncSession
+from config import settings
+from database import async_session_maker
+from models.behavioral_data import BehavioralData, BASELINE_SESSION_ID
+from utils.numbers import finite_number
+
+# Numeric BehavioralData columns tracked per user
+BASELINE_FEATURES = (
+    'typing_speed',
+    'deletion_rate',
+    'tap_pressure',
+    'tap_duration',
+    'scroll_velocity',
+    'screen_time',
+)
+
+
+class RunningStats:
+    """Welford running mean/variance for a single feature (O(1) per update)."""
+
+    __slots__ = ('count', 'mean', 'm2')
+
+    def __init__(self, count: int = 0, mean: float = 0.0, m2: float = 0.0):
+        self.count = count
+        self.mean = mean
+        self.m2 = m2
+
+    def update(self, value: float):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+    @property
+    def std(self) -> float:
+        if self.count < 2:
+            return 0.0
+        return math.sqrt(self.m2 / (self.count - 1))
+
+    def zscore(self, value: float) -> float:
+        # Floor the deviation so a perfectly stable history doesn't turn
+        # every tiny change into an infinite z-score
+        std = max(self.std, abs(self.mean) * settings.BASELINE_MIN_STD_RATIO, 1e-9)
+        return (value - self.mean) / std
+
+
+class UserBaseline:
+    """Running statistics for every baseline feature of one user."""
+
+    __slots__ = ('user_id', 'features')
+
+    def __init__(self, user_id: int, features: Optional[Dict[str, RunningStats]] = None):
+        self.user_id = user_id
+        self.features = features or {}
+
+    def update(self, sample: Dict[str, Any]):
+        for name in BASELINE_FEATURES:
+            value = finite_number(sample.get(name))
+            if value is None:
+                continue
+            stats = self.features.get(name)
+            if stats is None:
+                stats = self.features[name] = RunningStats()
+            stats.update(value)
+
+    def zscores(self, sample: Dict[str, Any]) -> Dict[str, float]:
+        """Z-score of each feature in the sample that has a mature baseline."""
+        scores = {}
+        for name in BASELINE_FEATURES:
+            value = finite_number(sample.get(name))
+            stats = self.features.get(name)
+            if value is None or stats is None or stats.count < settings.BASELINE_MIN_SAMPLES:
+                continue
+            scores[name] = stats.zscore(value)
+        return scores
+
+    def is_mature(self, name: str) -> bool:
+        stats = self.features.get(name)
+        return stats is not None and stats.count >= settings.BASELINE_MIN_SAMPLES
+
+    def snapshot(self) -> Dict[str, list]:
+        return {
+            name: [stats.count, stats.mean, stats.m2]
+            for name, stats in self.features.items()
+        }
+
+    @classmethod
+    def from_snapshot(cls, user_id: int, snapshot: Optional[Dict[str, list]]) -> 'UserBaseline':
+        features = {}
+        for name, values in (snapshot or {}).items():
+            if name in BASELINE_FEATURES and len(values) == 3:
+                features[name] = RunningStats(int(values[0]), float(values[1]), float(values[2]))
+        return cls(user_id, features)
+
+
+class BaselineStore:
+    """
+    Bounded in-process LRU of per-user baselines.
+    A cache miss costs one indexed lookup of the user's latest snapshot row;
+    the raw behavioral history is never scanned. Updated baselines are
+    written back as snapshot rows in batches.
+    """
+
+    def __init__(self, max_users: int = None, flush_batch_size: int = None):
+        self.max_users = max_users or settings.BASELINE_CACHE_SIZE
+        self.flush_batch_size = flush_batch_size or settings.BASELINE_FLUSH_BATCH_SIZE
+        self._baselines: 'OrderedDict[int, UserBaseline]' = OrderedDict()
+        self._dirty = set()
+        # Snapshots of dirty baselines evicted before they were flushed
+        self._pending: Dict[int, Dict[str, list]] = {}
+
+    def get(self, user_id: int) -> Optional[UserBaseline]:
+        baseline = self._baselines.get(user_id)
+        if baseline is not None:
+            self._baselines.move_to_end(user_id)
+        return baseline
+
+    async def load(self, db: AsyncSession, user_id: int) -> UserBaseline:
+        baseline = self.get(user_id)
+        if baseline is not None:
+            return baseline
+
+        if user_id in self._pending:
+            baseline = UserBaseline.from_snapshot(user_id, self._pending.pop(user_id))
+            self._dirty.add(user_id)
+        else:
+            result = await db.execute(
+                select(BehavioralData.baseline_stats)
+                .where(
+                    BehavioralData.user_id == user_id,
+                    BehavioralData.session_id == BASELINE_SESSION_ID
+                )
+                .order_by(desc(BehavioralData.created_at))
+                .limit(1)
+            )
+            baseline = UserBaseline.from_snapshot(user_id, result.scalar_one_or_none())
+
+        self._put(baseline)
+        return baseline
+
+    def update(self, user_id: int, sample: Dict[str, Any]):
+        """Fold a trusted sample into the user's baseline. Call load() first."""
+        baseline = self.get(user_id)
+        if baseline is None:
+            baseline = UserBaseline(user_id)
+            self._put(baseline)
+        baseline.update(sample)
+        self._dirty.add(user_id)
+
+    async def maybe_flush(self, db: AsyncSession) -> int:
+        if len(self._dirty) + len(self._pending) < self.flush_batch_size:
+            return 0
+        return await self.flush(db)
+
+    async def flush_when_due(self) -> int:
+        """
+        maybe_flush on a session of its own, for request handlers: a failed
+        flush is logged and retried next time instead of failing the request.
+        """
+        try:
+            async with async_session_maker() as db:
+                return await self.maybe_flush(db)
+        except Exception as e:
+            print(f"⚠️ Baseline flush failed: {e}")
+            return 0
+
+    async def flush(self, db: AsyncSession) -> int:
+        """
+        Write snapshot rows for all dirty baselines in one commit, deleting
+        the snapshots they supersede so each user keeps only the latest.
+        """
+        snapshots = dict(self._pending)
+        for user_id in self._dirty:
+            baseline = self._baselines.get(user_id)
+            if baseline is not None:
+                snapshots[user_id] = baseline.snapshot()
+
+        if not snapshots:
+            return 0
+
+        self._dirty.clear()
+        self._pending.clear()
+
+        rows = [
+            BehavioralData(
+                user_id=user_id,
+                session_id=BASELINE_SESSION_ID,
+                baseline_stats=snapshot,
+                **_snapshot_means(snapshot)
+            )
+            for user_id, snapshot in snapshots.items()
+        ]
+        db.add_all(rows)
+        try:
+            await db.flush()
+            await db.execute(
+                delete(BehavioralData)
+                .where(
+                    BehavioralData.user_id.in_(list(snapshots)),
+                    BehavioralData.session_id == BASELINE_SESSION_ID,
+                    BehavioralData.id.notin_([row.id for row in rows])
+                )
+                .execution_options(synchronize_session=False)
+            )
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            # Keep the snapshots so the next flush retries them
+            for user_id, snapshot in snapshots.items():
+                if user_id in self._baselines:
+                    self._dirty.add(user_id)
+                else:
+                    self._pending.setdefault(user_id, snapshot)
+            raise
+        return len(snapshots)
+
+    def _put(self, baseline: UserBaseline):
+        self._baselines[baseline.user_id] = baseline
+        self._baselines.move_to_end(baseline.user_id)
+        while len(self._baselines) > self.max_users:
+            user_id, evicted = self._baselines.popitem(last=False)
+            if user_id in self._dirty:
+                self._dirty.discard(user_id)
+                self._pending[user_id] = evicted.snapshot()
+
+
+def _snapshot_means(snapshot: Dict[str, list]) -> Dict[str, Any]:
+    # Mirror the means into the regular columns so snapshot rows stay readable
+    means = {name: values[1] for name, values in snapshot.items()}
+    if 'screen_time' in means:
+        means['screen_time'] = int(round(means['screen_time']))
+    return means
+
+
+baseline_store = BaselineStore()
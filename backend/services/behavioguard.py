@@ -1,10 +1,30 @@
-from typing import Dict, Any
-from config import settings
+import datetime
+from typing import Dict, Any, Optional, List, Tuple
+import numpy as np
+from services.baseline_store import UserBaseline
+from services.keystroke import extract_keystroke_features, KEY_DOWN_FIELD, KEY_UP_FIELD, KEYS_FIELD
+from services.risk_rules import risk_rules, RISK_LEVELS, BATCH_FEATURES
+from utils.numbers import finite_number
+
+# Signal bits returned by score_batch under the default rules; a rule file
+# can add signals, so callers decode with the bits score_batch returns
+SIGNAL_UNUSUAL_TYPING_SPEED = 1 << 0
+SIGNAL_MISSING_DEVICE_FINGERPRINT = 1 << 1
+SIGNAL_UNUSUAL_TAP_PRESSURE = 1 << 2
+SIGNAL_UNUSUAL_SCROLL_VELOCITY = 1 << 3
+
+SIGNAL_NAMES = {
+    SIGNAL_UNUSUAL_TYPING_SPEED: 'unusual_typing_speed',
+    SIGNAL_MISSING_DEVICE_FINGERPRINT: 'missing_device_fingerprint',
+    SIGNAL_UNUSUAL_TAP_PRESSURE: 'unusual_tap_pressure',
+    SIGNAL_UNUSUAL_SCROLL_VELOCITY: 'unusual_scroll_velocity',
+}
 
 class BehavioGuard:
     """
     In-memory behavioral analysis service.
-    Does not store data in database - only analyzes and returns risk scores.
+    Scores samples with the compiled rules of services.risk_rules and, when
+    available, against the user's own baseline from services.baseline_store.
     """
     
     def analyze_login(
@@ -12,53 +32,35 @@ class BehavioGuard:
         user_id: int,
         behavioral_data: Dict[str, Any],
         ip_address: str,
-        device_info: str
+        device_info: str,
+        baseline: Optional[UserBaseline] = None
     ) -> Dict[str, Any]:
         """
         Analyze login attempt and return risk assessment.
-        All analysis is done in-memory without database storage.
+        When the user's baseline is passed, features with enough history are
+        scored by z-score against it instead of the global thresholds.
         """
-        risk_score = 0
-        signals = []
-        
-        # Analyze typing speed
-        typing_speed = behavioral_data.get('typing_speed', 0)
-        if typing_speed > 0:
-            if typing_speed < 50 or typing_speed > 200:
-                risk_score += 20
-                signals.append('unusual_typing_speed')
+        plan = risk_rules.current()
+        risk_score, signals, keystroke = self._score_keystrokes(plan, behavioral_data)
+        behavioral_data = _with_measured_typing_speed(behavioral_data, keystroke)
+        zscores = baseline.zscores(behavioral_data) if baseline else {}
         
-        # Analyze device fingerprint
-        device_fingerprint = behavioral_data.get('device_fingerprint')
-        if not device_fingerprint:
-            risk_score += 10
-            signals.append('missing_device_fingerprint')
+        # Score features against the user's own history
+        risk_score += self._score_deviations(plan, zscores, signals)
         
-        # Analyze IP address patterns (simplified)
-        if not ip_address or ip_address == '127.0.0.1':
-            risk_score += 5
+        # Global feature rules (features with a baseline were scored above)
+        values = _measured_features(behavioral_data, zscores, plan.login.inputs)
+        values['device_fingerprint'] = 1.0 if behavioral_data.get('device_fingerprint') else 0.0
+        values['local_ip'] = 1.0 if not ip_address or ip_address == '127.0.0.1' else 0.0
+        values['hour'] = datetime.datetime.utcnow().hour
+        rule_risk, rule_signals = plan.login.evaluate(values)
+        risk_score += rule_risk
+        signals += rule_signals
         
-        # Analyze time patterns
-        import datetime
-        hour = datetime.datetime.utcnow().hour
-        if hour < 5 or hour > 23:
-            risk_score += 10
-            signals.append('unusual_login_time')
-        
-        # Determine risk level
-        if risk_score >= settings.RISK_THRESHOLD_CRITICAL:
-            risk_level = 'critical'
-        elif risk_score >= settings.RISK_THRESHOLD_HIGH:
-            risk_level = 'high'
-        elif risk_score >= settings.RISK_THRESHOLD_MEDIUM:
-            risk_level = 'medium'
-        elif risk_score >= settings.RISK_THRESHOLD_LOW:
-            risk_level = 'low'
-        else:
-            risk_level = 'trusted'
+        risk_level = plan.level_for(risk_score)
         
         # Determine if challenge required
-        requires_challenge = risk_score >= settings.CHALLENGE_REQUIRED_THRESHOLD
+        requires_challenge = risk_score >= plan.challenge_required
         
         # Generate reason
         if signals:
@@ -67,36 +69,188 @@ class BehavioGuard:
             reason = "Normal login pattern detected"
         
         return {
-            'risk_score': min(risk_score, 100),
+            'risk_score': min(risk_score, plan.max_score),
             'risk_level': risk_level,
             'requires_challenge': requires_challenge,
             'signals': signals,
-            'reason': reason
+            'reason': reason,
+            'baseline_zscores': {k: round(v, 2) for k, v in zscores.items()},
+            'keystroke_features': {k: round(v, 2) for k, v in keystroke.items()}
         }
     
-    def analyze_behavioral_data(self, behavioral_data: Dict[str, Any]) -> Dict[str, Any]:
+    def analyze_behavioral_data(
+        self,
+        behavioral_data: Dict[str, Any],
+        baseline: Optional[UserBaseline] = None,
+        action_velocity: Optional[Dict[str, float]] = None
+    ) -> Dict[str, Any]:
         """
         Analyze general behavioral data for anomaly detection.
-        Returns analysis without storing in database.
+        Features with a mature per-user baseline are scored by z-score;
+        `action_velocity` comes from services.action_rate.
         """
-        risk_score = 0
-        anomalies = []
+        plan = risk_rules.current()
+        risk_score, anomalies = self._score_velocity(plan, action_velocity or {})
+        keystroke_risk, keystroke_signals, keystroke = self._score_keystrokes(plan, behavioral_data)
+        risk_score += keystroke_risk
+        anomalies += keystroke_signals
+        behavioral_data = _with_measured_typing_speed(behavioral_data, keystroke)
+        zscores = baseline.zscores(behavioral_data) if baseline else {}
         
-        # Analyze various behavioral metrics
-        if behavioral_data.get('tap_pressure'):
-            pressure = behavioral_data['tap_pressure']
-            if pressure < 0.2 or pressure > 0.9:
-                risk_score += 15
-                anomalies.append('unusual_tap_pressure')
+        risk_score += self._score_deviations(plan, zscores, anomalies)
         
-        if behavioral_data.get('scroll_velocity'):
-            velocity = behavioral_data['scroll_velocity']
-            if velocity > 1000:
-                risk_score += 10
-                anomalies.append('unusual_scroll_velocity')
+        # Global feature rules (features with a baseline were scored above)
+        rule_risk, rule_signals = plan.behavior.evaluate(
+            _measured_features(behavioral_data, zscores, plan.behavior.inputs)
+        )
+        risk_score += rule_risk
+        anomalies += rule_signals
         
         return {
-            'risk_score': min(risk_score, 100),
+            'risk_score': min(risk_score, plan.max_score),
             'anomalies': anomalies,
-            'is_suspicious': risk_score > 50
-        }
\ No newline at end of file
+            'is_suspicious': risk_score > plan.suspicious,
+            'keystroke_features': {k: round(v, 2) for k, v in keystroke.items()}
+        }
+    
+    def analyze_keystrokes(self, behavioral_data: Dict[str, Any]) -> Tuple[int, List[str], Dict[str, float]]:
+        """
+        Score raw keydown/keyup timestamps (`key_down`, `key_up`, `keys`).
+        Scripted typing is too fast, too regular (a fixed sleep between keys
+        gives a near-zero interval CV) and releases keys instantly.
+        """
+        return self._score_keystrokes(risk_rules.current(), behavioral_data)
+    
+    def _score_keystrokes(self, plan, behavioral_data: Dict[str, Any]) -> Tuple[int, List[str], Dict[str, float]]:
+        key_down = behavioral_data.get(KEY_DOWN_FIELD)
+        if not isinstance(key_down, list) or len(key_down) < 2:
+            return 0, [], {}
+        key_up = behavioral_data.get(KEY_UP_FIELD)
+        keys = behavioral_data.get(KEYS_FIELD)
+        try:
+            features = extract_keystroke_features(
+                key_down,
+                key_up if isinstance(key_up, list) else None,
+                keys if isinstance(keys, list) else None
+            )
+        except (TypeError, ValueError):
+            return 0, [], {}
+        
+        if features['key_count'] < plan.keystroke_min_keys:
+            return 0, [], features
+        
+        risk_score, signals = plan.keystroke.evaluate(features)
+        return risk_score, signals, features
+    
+    def analyze_action_velocity(self, action_velocity: Dict[str, float]) -> Tuple[int, List[str]]:
+        """
+        Score per-action request intervals (ms). A sustained cadence faster
+        than any human manages, like a script flooding chat, is a signal.
+        """
+        return self._score_velocity(risk_rules.current(), action_velocity)
+    
+    @staticmethod
+    def _score_velocity(plan, action_velocity: Dict[str, float]) -> Tuple[int, List[str]]:
+        risk_score = 0
+        signals = []
+        for action, interval_ms in action_velocity.items():
+            if interval_ms < plan.flood_interval_ms:
+                risk_score += plan.flood_risk
+                signals.append(f'{action}_flooding')
+        return risk_score, signals
+    
+    @staticmethod
+    def _score_deviations(plan, zscores: Dict[str, float], signals: List[str]) -> int:
+        risk_score = 0
+        for feature, z in zscores.items():
+            if abs(z) > plan.baseline_z_threshold:
+                risk_score += plan.baseline_risk
+                signals.append(f'{feature}_deviation')
+        return risk_score
+    
+    def score_batch(self, samples: np.ndarray) -> Dict[str, np.ndarray]:
+        """
+        Score many samples at once.
+        `samples` is a float array of shape (n, len(BATCH_FEATURES)) in
+        BATCH_FEATURES column order. Applies the login and behavior feature
+        rules over those columns and returns risk scores, levels, signal
+        bitmasks and the bit -> signal name mapping they were built with.
+        """
+        samples = np.asarray(samples, dtype=np.float64)
+        if samples.ndim != 2 or samples.shape[1] != len(BATCH_FEATURES):
+            raise ValueError(f"Expected an (n, {len(BATCH_FEATURES)}) array")
+        plan = risk_rules.current()
+        
+        typing_speed, tap_pressure, scroll_velocity, device_fingerprint = samples.T
+        
+        # Zero (or a negative typing speed) means "not reported", as in the per-sample path
+        with np.errstate(invalid='ignore'):
+            measured = (typing_speed > 0, tap_pressure != 0, scroll_velocity != 0, None)
+        raw_scores, signals = plan.batch.evaluate(samples.T, measured)
+        
+        return {
+            'risk_scores': np.minimum(raw_scores, plan.max_score),
+            'risk_levels': plan.levels_for(raw_scores),
+            'signals': signals,
+            'is_suspicious': raw_scores > plan.suspicious,
+            'signal_names': plan.batch.signal_names,
+        }
+    
+    @staticmethod
+    def samples_to_columns(samples: List[Dict[str, Any]]) -> np.ndarray:
+        """Pack a list of behavioral dicts into a score_batch array."""
+        columns = np.full((len(samples), len(BATCH_FEATURES)), np.nan)
+        for col, feature in enumerate(BATCH_FEATURES[:-1]):
+            columns[:, col] = [finite_number(sample.get(feature), np.nan) for sample in samples]
+        columns[:, -1] = [1.0 if sample.get('device_fingerprint') else 0.0 for sample in samples]
+        return columns
+    
+    @staticmethod
+    def columns_to_array(columns: Dict[str, List[Optional[float]]]) -> np.ndarray:
+        """Pack column-oriented input ({feature: [values]}) into a score_batch array."""
+        lengths = {len(values) for values in columns.values()}
+        if len(lengths) > 1:
+            raise ValueError("All columns must have the same length")
+        n = lengths.pop() if lengths else 0
+        array = np.full((n, len(BATCH_FEATURES)), np.nan)
+        array[:, -1] = 0.0
+        for col, feature in enumerate(BATCH_FEATURES):
+            if feature in columns:
+                array[:, col] = np.array(columns[feature], dtype=np.float64)
+        return array
+    
+    @staticmethod
+    def decode_signals(mask: int, signal_names: Optional[Dict[int, str]] = None) -> List[str]:
+        if signal_names is None:
+            signal_names = risk_rules.current().batch.signal_names
+        return [name for bit, name in signal_names.items() if mask & bit]
+    
+    @staticmethod
+    def risk_level_for(risk_score: int) -> str:
+        return risk_rules.current().level_for(risk_score)
+
+def _with_measured_typing_speed(behavioral_data: Dict[str, Any], keystroke: Dict[str, float]) -> Dict[str, Any]:
+    # Typing speed measured from key timings replaces a missing client-side estimate
+    if 'typing_speed' in keystroke and not behavioral_data.get('typing_speed'):
+        return {**behavioral_data, 'typing_speed': keystroke['typing_speed']}
+    return behavioral_data
+
+def _measured_features(
+    behavioral_data: Dict[str, Any],
+    zscores: Dict[str, float],
+    features: Tuple[str, ...]
+) -> Dict[str, Optional[float]]:
+    """The batch features among `features` that were measured and have no baseline z-score."""
+    values = {}
+    for feature in features:
+        if feature == 'device_fingerprint':
+            if feature in behavioral_data:
+                values[feature] = 1.0 if behavioral_data[feature] else 0.0
+            continue
+        value = behavioral_data.get(feature)
+        # Zero, or a negative typing speed, means the client didn't measure it
+        if not value or feature in zscores or isinstance(value, bool) or not isinstance(value, (int, float)):
+            continue
+        if feature != 'typing_speed' or value > 0:
+            values[feature] = value
+    return values
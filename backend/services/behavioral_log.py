@@ -0,0 +1,63 @@
+from datetime import datetime
+from typing import Dict, Any, Optional
+from config import settings
+from models.behavioral_data import BehavioralData
+from services.background_writer import BackgroundWriter
+from services.baseline_store import BASELINE_SESSION_ID
+from services.keystroke import KEY_DOWN_FIELD
+from utils.numbers import finite_number
+
+FLOAT_FIELDS = ('typing_speed', 'deletion_rate', 'tap_pressure', 'tap_duration', 'scroll_velocity')
+JSON_FIELDS = ('key_press_intervals', 'tap_locations', 'navigation_path')
+STRING_FIELDS = {
+    'session_id': 255,
+    'device_fingerprint': 255,
+    'device_type': 50,
+    'os_version': 50,
+    'location': 255,
+}
+
+def build_behavioral_row(
+    user_id: int,
+    data: Dict[str, Any],
+    ip_address: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    BehavioralData row from a client-supplied sample.
+    Unknown keys are ignored and values that don't fit a column are stored
+    as NULL, so every row has the same keys and can go into one INSERT.
+    """
+    now = datetime.utcnow()
+    row = {
+        'user_id': user_id,
+        'ip_address': ip_address,
+        'access_time': now,
+        'created_at': now,
+    }
+    for name in FLOAT_FIELDS:
+        row[name] = finite_number(data.get(name))
+    screen_time = finite_number(data.get('screen_time'))
+    row['screen_time'] = int(screen_time) if screen_time is not None else None
+    for name in JSON_FIELDS:
+        value = data.get(name)
+        row[name] = value if isinstance(value, (list, dict)) else None
+    if row['key_press_intervals'] is None:
+        row['key_press_intervals'] = _key_intervals(data.get(KEY_DOWN_FIELD))
+    for name, max_length in STRING_FIELDS.items():
+        value = data.get(name)
+        row[name] = str(value)[:max_length] if value not in (None, '') else None
+    # Clients must not be able to shadow the user's baseline snapshot rows
+    if row['session_id'] == BASELINE_SESSION_ID:
+        row['session_id'] = None
+    return row
+
+def _key_intervals(key_down) -> Optional[list]:
+    # Raw keydown timestamps are kept as keydown-to-keydown intervals
+    if not isinstance(key_down, list) or len(key_down) < 2:
+        return None
+    timestamps = [finite_number(t) for t in key_down[:settings.KEYSTROKE_MAX_KEYS]]
+    if None in timestamps:
+        return None
+    return [round(b - a, 3) for a, b in zip(timestamps, timestamps[1:])]
+
+behavioral_log = BackgroundWriter('behavioral_data', BehavioralData)
@@ -0,0 +1,75 @@
+from sqlalchemy import select, update, func, case, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from models.conversation import Conversation
+from models.message import Message
+
+PREVIEW_LENGTH = 200
+
+async def record_message(db: AsyncSession, message: Message):
+    """Upsert both sides' summary rows for a new (flushed) message."""
+    preview = message.text[:PREVIEW_LENGTH]
+    rows = [
+        # Sender side: nothing new to read
+        dict(user_id=message.sender_id, peer_id=message.receiver_id, unread_count=0),
+        # Receiver side: one more unread message
+        dict(user_id=message.receiver_id, peer_id=message.sender_id, unread_count=1),
+    ]
+    if message.sender_id == message.receiver_id:
+        rows = rows[1:]
+    
+    for row in rows:
+        stmt = insert(Conversation).values(
+            **row,
+            last_message_id=message.id,
+            last_message_text=preview,
+            last_sender_id=message.sender_id,
+            last_message_at=message.created_at
+        )
+        # Concurrent sends may commit out of order; keep the newest message
+        newer = stmt.excluded.last_message_at >= Conversation.last_message_at
+        await db.execute(stmt.on_conflict_do_update(
+            index_elements=[Conversation.user_id, Conversation.peer_id],
+            set_={
+                'last_message_id': case((newer, stmt.excluded.last_message_id), else_=Conversation.last_message_id),
+                'last_message_text': case((newer, stmt.excluded.last_message_text), else_=Conversation.last_message_text),
+                'last_sender_id': case((newer, stmt.excluded.last_sender_id), else_=Conversation.last_sender_id),
+                'last_message_at': func.greatest(Conversation.last_message_at, stmt.excluded.last_message_at),
+                'unread_count': Conversation.unread_count + stmt.excluded.unread_count,
+            }
+        ))
+
+async def mark_read(db: AsyncSession, user_id: int, peer_id: int):
+    await db.execute(
+        update(Conversation)
+        .where(Conversation.user_id == user_id, Conversation.peer_id == peer_id)
+        .values(unread_count=0)
+    )
+
+async def backfill_conversations(db: AsyncSession) -> bool:
+    """Build the summary table from messages once, when it is still empty."""
+    has_rows = await db.execute(select(Conversation.user_id).limit(1))
+    if has_rows.first() is not None:
+        return False
+    
+    await db.execute(text(f"""
+        WITH sides AS (
+            SELECT sender_id AS user_id, receiver_id AS peer_id, id, text, sender_id,
+                   created_at, false AS unread
+            FROM messages
+            UNION ALL
+            SELECT receiver_id, sender_id, id, text, sender_id,
+                   created_at, NOT coalesce(is_read, false)
+            FROM messages
+        )
+        INSERT INTO conversations
+            (user_id, peer_id, last_message_id, last_message_text, last_sender_id, last_message_at, unread_count)
+        SELECT DISTINCT ON (user_id, peer_id)
+               user_id, peer_id, id, left(text, {PREVIEW_LENGTH}), sender_id, created_at,
+               count(*) FILTER (WHERE unread) OVER (PARTITION BY user_id, peer_id)
+        FROM sides
+        ORDER BY user_id, peer_id, created_at DESC, id DESC
+        ON CONFLICT DO NOTHING
+    """))
+    await db.commit()
+    return True
@@ -0,0 +1,66 @@
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from config import settings
+from schemas import PostResponse
+
+class FeedCache:
+    """
+    In-process cache of the newest posts (the feed head), newest first.
+    New posts and like counts from this worker update it in place; the TTL
+    bounds how long changes made by other workers stay invisible. Entries
+    are response models, served as-is: their relative time is computed
+    when the response is encoded.
+    """
+    
+    def __init__(self, size: int = None, ttl_seconds: float = None):
+        self.size = size or settings.FEED_CACHE_SIZE
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else settings.FEED_CACHE_TTL_SECONDS
+        self._entries: List[Tuple[datetime, PostResponse]] = []
+        self._by_id: Dict[int, PostResponse] = {}
+        self._loaded_at: Optional[float] = None
+        # True when the cache holds every post in the table
+        self._complete = False
+    
+    def is_fresh(self) -> bool:
+        return self._loaded_at is not None and time.monotonic() - self._loaded_at < self.ttl_seconds
+    
+    def head(self, limit: int) -> Optional[Tuple[List[PostResponse], bool]]:
+        """(posts, has_more) for the first page, or None when it can't be served from cache."""
+        if not self.is_fresh() or (limit > len(self._entries) and not self._complete):
+            return None
+        
+        has_more = len(self._entries) > limit or not self._complete
+        return [post for _, post in self._entries[:limit]], has_more
+    
+    def last_key(self, limit: int) -> Optional[Tuple[datetime, int]]:
+        if not self._entries:
+            return None
+        created_at, post = self._entries[min(limit, len(self._entries)) - 1]
+        return created_at, post.id
+    
+    def fill(self, posts: List[Tuple[datetime, PostResponse]], complete: bool):
+        self._entries = list(posts[:self.size])
+        self._by_id = {post.id: post for _, post in self._entries}
+        self._complete = complete and len(posts) <= self.size
+        self._loaded_at = time.monotonic()
+    
+    def push(self, created_at: datetime, post: PostResponse):
+        if not self.is_fresh():
+            return  # the next read refills from the database
+        self._entries.insert(0, (created_at, post))
+        self._by_id[post.id] = post
+        if len(self._entries) > self.size:
+            _, dropped = self._entries.pop()
+            self._by_id.pop(dropped.id, None)
+            self._complete = False
+    
+    def set_likes(self, post_id: int, likes: int):
+        post = self._by_id.get(post_id)
+        if post is not None:
+            post.likes = likes
+    
+    def invalidate(self):
+        self._loaded_at = None
+
+feed_cache = FeedCache()
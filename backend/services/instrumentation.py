@@ -0,0 +1,215 @@
+"""
+Per-route request timing, broken down into the hot-path phases.
+
+InstrumentationMiddleware gives every HTTP request a RequestTimings in a
+context variable. Code on the hot paths wraps its work in `phase(name)`:
+    
+    with phase('bcrypt'):
+        ...
+
+and SQLAlchemy engine events time every query as 'db'. When the request
+finishes, its total and per-phase times are observed into Prometheus-style
+histograms labelled by route template, which /metrics renders in the text
+exposition format. Phases cover jwt, db, bcrypt, behavioguard and
+serialization (rendering the body in utils.responses.ORJSONResponse);
+whatever remains is handler and framework time, including FastAPI's
+validation of the returned value against the route's response model.
+
+Tasks spawned during a request inherit its context, so their phases are
+attributed to that request even if they outlive it.
+"""
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from services.profiler import sampling_profiler
+
+PHASES = ('jwt', 'db', 'bcrypt', 'behavioguard', 'serialization')
+
+# Seconds; spans a cached token check up to a bcrypt burst queueing
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+class RequestTimings:
+    """Seconds and call counts per phase for one request."""
+    
+    __slots__ = ('seconds', 'calls')
+    
+    def __init__(self):
+        self.seconds: Dict[str, float] = {}
+        self.calls: Dict[str, int] = {}
+    
+    def add(self, name: str, elapsed: float):
+        self.seconds[name] = self.seconds.get(name, 0.0) + elapsed
+        self.calls[name] = self.calls.get(name, 0) + 1
+
+_current: ContextVar[Optional[RequestTimings]] = ContextVar('request_timings', default=None)
+
+@contextmanager
+def phase(name: str):
+    """Time the block as `name` for the current request; a no-op outside requests."""
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, time.perf_counter() - started)
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+class Histogram:
+    """Cumulative-bucket histogram keyed by label values, rendered as Prometheus text."""
+    
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str], buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # label values -> [per-bucket counts (+Inf last), sum, count]
+        self._series: Dict[Tuple[str, ...], List[Any]] = {}
+    
+    def observe(self, labels: Tuple[str, ...], value: float):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+    
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        for labels, (counts, total, count) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                le = 'le="%s"' % bound
+                lines.append(f'{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}')
+            le = 'le="+Inf"'
+            lines.append(f'{self.name}_bucket{_labels(self.labelnames, labels, le)} {count}')
+            lines.append(f'{self.name}_sum{_labels(self.labelnames, labels)} {total}')
+            lines.append(f'{self.name}_count{_labels(self.labelnames, labels)} {count}')
+        return lines
+
+class Counter:
+    """Monotonic counter keyed by label values."""
+    
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str]):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+    
+    def inc(self, labels: Tuple[str, ...], amount: float = 1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+    
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} counter']
+        for labels, value in sorted(self._values.items()):
+            lines.append(f'{self.name}{_labels(self.labelnames, labels)} {value}')
+        return lines
+
+class RequestMetrics:
+    """Request and phase histograms for every route of the app."""
+    
+    def __init__(self):
+        self.requests = Histogram(
+            'securecircle_request_duration_seconds',
+            'Wall time of HTTP requests by route template.',
+            ('method', 'route', 'status')
+        )
+        self.phases = Histogram(
+            'securecircle_request_phase_seconds',
+            'Time a request spent in each hot-path phase.',
+            ('method', 'route', 'phase')
+        )
+        self.phase_calls = Counter(
+            'securecircle_request_phase_calls_total',
+            'Timed calls per phase (queries for db, hashes for bcrypt).',
+            ('method', 'route', 'phase')
+        )
+    
+    def record(self, method: str, route: str, status: int, elapsed: float, timings: RequestTimings):
+        self.requests.observe((method, route, str(status)), elapsed)
+        for name, seconds in timings.seconds.items():
+            self.phases.observe((method, route, name), seconds)
+            self.phase_calls.inc((method, route, name), timings.calls[name])
+    
+    def render(self) -> str:
+        lines = self.requests.render() + self.phases.render() + self.phase_calls.render()
+        return '\n'.join(lines) + '\n'
+
+request_metrics = RequestMetrics()
+
+def instrument_engine(engine: AsyncEngine):
+    """Time every statement the engine runs as the 'db' phase of the current request."""
+    
+    @event.listens_for(engine.sync_engine, 'before_cursor_execute')
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        # The async driver runs these in a greenlet that shares the request's context
+        if _current.get() is not None:
+            context._instrumentation_started = time.perf_counter()
+    
+    @event.listens_for(engine.sync_engine, 'after_cursor_execute')
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, '_instrumentation_started', None)
+        timings = _current.get()
+        if started is not None and timings is not None:
+            timings.add('db', time.perf_counter() - started)
+
+def route_template(scope: dict) -> str:
+    """The matched route's path template, so label cardinality stays bounded."""
+    # Routes of included routers only know their path relative to the router's prefix
+    context = scope.get('fastapi', {}).get('effective_route_context')
+    path = getattr(context, 'path', None) or getattr(scope.get('route'), 'path', None)
+    return path or 'unmatched'
+
+class InstrumentationMiddleware:
+    """
+    ASGI middleware recording per-route request and phase timings, and
+    handing slow requests' stack samples to the sampling profiler.
+    """
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        
+        timings = RequestTimings()
+        token = _current.set(timings)
+        status = 500
+        
+        async def send_with_status(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+            await send(message)
+        
+        profile = sampling_profiler.begin()
+        started = time.perf_counter()
+        try:
+            # Streaming responses finish when their last chunk is sent, so they are timed in full
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            _current.reset(token)
+            route = route_template(scope)
+            request_metrics.record(scope['method'], route, status, elapsed, timings)
+            if profile is not None:
+                sampling_profiler.end(profile, scope['method'], route, status, elapsed)
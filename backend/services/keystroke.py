@@ -0,0 +1,92 @@
+from typing import Dict, Any, Optional, Sequence
+import numpy as np
+from config import settings
+
+# Raw timing fields accepted in behavioral data (milliseconds, one entry per key)
+KEY_DOWN_FIELD = 'key_down'
+KEY_UP_FIELD = 'key_up'
+KEYS_FIELD = 'keys'
+
+DISTRIBUTIONS = ('interval', 'dwell', 'flight')
+
+def extract_keystroke_features(
+    key_down: Sequence[float],
+    key_up: Optional[Sequence[float]] = None,
+    keys: Optional[Sequence[Any]] = None
+) -> Dict[str, float]:
+    """
+    Keystroke-dynamics features from raw keydown/keyup timestamps (ms).
+    
+    - dwell: keyup - keydown of the same key (needs key_up)
+    - flight: next keydown - previous keyup (needs key_up)
+    - interval: keydown-to-keydown latency
+    - digraph: interval grouped by (previous key, next key) (needs keys)
+    
+    Timings are packed into one compact float array and the mean/std of
+    all three distributions come out of the same few vectorized reductions;
+    cv is std / mean.
+    """
+    n = min(len(key_down), settings.KEYSTROKE_MAX_KEYS)
+    features = {'key_count': float(n)}
+    if n < 2:
+        return features
+    has_up = key_up is not None and len(key_up) >= n
+    
+    down = np.asarray(key_down[:n], dtype=np.float64)
+    up = np.asarray(key_up[:n], dtype=np.float64) if has_up else None
+    
+    # Rows: interval, dwell, flight (n - 1 columns each)
+    distributions = DISTRIBUTIONS if has_up else DISTRIBUTIONS[:1]
+    timings = np.empty((len(distributions), n - 1), dtype=np.float64)
+    np.subtract(down[1:], down[:-1], out=timings[0])
+    if has_up:
+        np.subtract(up[:-1], down[:-1], out=timings[1])
+        np.subtract(down[1:], up[:-1], out=timings[2])
+    
+    finite = np.isfinite(timings)
+    counts = finite.sum(axis=1)
+    values = np.where(finite, timings, 0.0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        means = values.sum(axis=1) / counts
+        stds = np.sqrt(np.maximum((values * values).sum(axis=1) / counts - means * means, 0.0))
+    
+    for name, count, mean, std in zip(distributions, counts.tolist(), means.tolist(), stds.tolist()):
+        if count == 0:
+            continue
+        features[f'{name}_mean'] = mean
+        features[f'{name}_std'] = std
+        features[f'{name}_cv'] = std / mean if mean > 0 else 0.0
+    
+    total_ms = down[-1] - down[0]
+    if total_ms > 0:
+        # 5 characters per word
+        features['typing_speed'] = float((n - 1) / total_ms * 60000 / 5)
+    
+    if keys is not None and len(keys) >= n:
+        features.update(_digraph_features(keys[:n], timings[0]))
+    
+    return features
+
+def _digraph_features(keys: Sequence[Any], intervals: np.ndarray) -> Dict[str, float]:
+    """Per-digraph latency dispersion, averaged over digraphs typed more than once."""
+    lookup = {}
+    codes = np.fromiter((lookup.setdefault(key, len(lookup)) for key in keys), dtype=np.int64, count=len(keys))
+    digraphs = codes[:-1] * len(lookup) + codes[1:]
+    _, digraph_ids = np.unique(digraphs, return_inverse=True)
+    
+    counts = np.bincount(digraph_ids)
+    sums = np.bincount(digraph_ids, weights=intervals)
+    squares = np.bincount(digraph_ids, weights=intervals * intervals)
+    
+    repeated = counts > 1
+    features = {'digraph_count': float(repeated.sum())}
+    if not repeated.any():
+        return features
+    
+    means = sums[repeated] / counts[repeated]
+    variances = np.maximum(squares[repeated] / counts[repeated] - means * means, 0.0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cvs = np.where(means > 0, np.sqrt(variances) / means, 0.0)
+    features['digraph_mean'] = float(means.mean())
+    features['digraph_cv'] = float(cvs.mean())
+    return features
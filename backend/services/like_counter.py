@@ -0,0 +1,109 @@
+import asyncio
+from collections import OrderedDict, defaultdict
+from typing import Dict, Optional
+from sqlalchemy import update, bindparam
+from config import settings
+from database import async_session_maker
+from models.post import Post
+
+posts_table = Post.__table__
+
+# One executemany: UPDATE posts SET likes = likes + :delta WHERE id = :post_id
+_increment_likes = (
+    update(posts_table)
+    .where(posts_table.c.id == bindparam('post_id'))
+    .values(likes=posts_table.c.likes + bindparam('delta'))
+)
+
+class LikeCounter:
+    """
+    Write-coalescing like counter.
+    Likes are accumulated in sharded in-memory counters and flushed every
+    LIKE_FLUSH_INTERVAL_MS as one atomic increment per post, so a hot post
+    never sees a read-modify-write or a commit per like.
+    Repeat likes by the same user are absorbed by a bounded dedup LRU
+    (in-memory only, there is no likes table).
+    """
+    
+    def __init__(self, shards: int = None, flush_interval_ms: int = None, dedup_size: int = None):
+        self.shard_count = shards or settings.LIKE_COUNTER_SHARDS
+        self.flush_interval = (flush_interval_ms or settings.LIKE_FLUSH_INTERVAL_MS) / 1000
+        self.dedup_size = dedup_size or settings.LIKE_DEDUP_SIZE
+        self._shards = [defaultdict(int) for _ in range(self.shard_count)]
+        # (user_id, post_id) -> like count returned for that like
+        self._liked: 'OrderedDict[tuple, int]' = OrderedDict()
+        self._task: Optional[asyncio.Task] = None
+    
+    def _shard(self, post_id: int) -> Dict[int, int]:
+        return self._shards[post_id % self.shard_count]
+    
+    def seen(self, user_id: int, post_id: int) -> Optional[int]:
+        """Like count from the user's earlier like of this post, or None."""
+        key = (user_id, post_id)
+        likes = self._liked.get(key)
+        if likes is not None:
+            self._liked.move_to_end(key)
+        return likes
+    
+    def add(self, user_id: int, post_id: int, persisted_likes: int) -> int:
+        """Count one like and return the post's current total."""
+        shard = self._shard(post_id)
+        shard[post_id] += 1
+        likes = persisted_likes + shard[post_id]
+        
+        self._liked[(user_id, post_id)] = likes
+        if len(self._liked) > self.dedup_size:
+            self._liked.popitem(last=False)
+        return likes
+    
+    def pending(self, post_id: int) -> int:
+        return self._shard(post_id).get(post_id, 0)
+    
+    async def flush(self) -> int:
+        """Write all pending increments; returns the number of posts updated."""
+        deltas = {}
+        for index, shard in enumerate(self._shards):
+            if shard:
+                self._shards[index] = defaultdict(int)
+                deltas.update(shard)
+        
+        if not deltas:
+            return 0
+        
+        try:
+            async with async_session_maker() as session:
+                await session.execute(
+                    _increment_likes,
+                    [{'post_id': post_id, 'delta': delta} for post_id, delta in deltas.items()]
+                )
+                await session.commit()
+        except Exception:
+            # Put the increments back so the next flush retries them
+            for post_id, delta in deltas.items():
+                self._shard(post_id)[post_id] += delta
+            raise
+        return len(deltas)
+    
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"⚠️ Like flush failed: {e}")
+    
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+    
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+like_counter = LikeCounter()
@@ -0,0 +1,144 @@
+import asyncio
+import json
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from typing import Dict, Any, Set, Callable, Awaitable, Optional
+from fastapi import WebSocket
+from config import settings
+
+Deliver = Callable[[int, Dict[str, Any]], Awaitable[None]]
+
+class HubBackend(ABC):
+    """
+    Transport between publishers and the connections held by this process.
+    A cross-process broker (Redis pub/sub, Postgres LISTEN/NOTIFY) plugs in
+    by implementing these three methods.
+    """
+    
+    async def start(self, deliver: Deliver):
+        self.deliver = deliver
+    
+    @abstractmethod
+    async def publish(self, user_id: int, event: Dict[str, Any]):
+        ...
+    
+    async def stop(self):
+        pass
+
+class InMemoryBackend(HubBackend):
+    """Single-process backend: events go straight to local connections."""
+    
+    def __init__(self):
+        self._tasks: Set[asyncio.Task] = set()
+    
+    async def publish(self, user_id: int, event: Dict[str, Any]):
+        # Deliver in the background so a slow socket never delays the publisher
+        task = asyncio.create_task(self.deliver(user_id, event))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+    
+    async def stop(self):
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+class LocalBrokerBackend(HubBackend):
+    """
+    Local stand-in for a cross-process broker.
+    Events are serialized onto a channel and delivered by a subscriber task,
+    exactly as they would be when fanned out through an external broker.
+    """
+    
+    def __init__(self, max_pending: int = None):
+        self._channel: asyncio.Queue = asyncio.Queue(maxsize=max_pending or settings.MESSAGE_HUB_MAX_PENDING)
+        self._task: Optional[asyncio.Task] = None
+    
+    async def start(self, deliver: Deliver):
+        await super().start(deliver)
+        self._task = asyncio.create_task(self._subscribe())
+    
+    async def publish(self, user_id: int, event: Dict[str, Any]):
+        # Never wait on a backed-up subscriber: publishers run after their commit,
+        # so the event is dropped (the client still has it on its next fetch)
+        try:
+            self._channel.put_nowait(json.dumps({'user_id': user_id, 'event': event}))
+        except asyncio.QueueFull:
+            print(f"⚠️ Message hub channel full, dropped '{event.get('type')}' event for user {user_id}")
+    
+    async def _subscribe(self):
+        while True:
+            envelope = json.loads(await self._channel.get())
+            try:
+                await self.deliver(envelope['user_id'], envelope['event'])
+            except Exception as e:
+                print(f"⚠️ Message hub delivery failed: {e}")
+    
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+BACKENDS = {
+    'memory': InMemoryBackend,
+    'local_broker': LocalBrokerBackend,
+}
+
+class MessageHub:
+    """Fan-out of chat events to every WebSocket a user has open."""
+    
+    def __init__(self, backend: HubBackend):
+        self.backend = backend
+        self._connections: Dict[int, Set[WebSocket]] = defaultdict(set)
+    
+    async def start(self):
+        await self.backend.start(self._deliver)
+    
+    async def stop(self):
+        await self.backend.stop()
+        for sockets in list(self._connections.values()):
+            for websocket in list(sockets):
+                try:
+                    await websocket.close()
+                except Exception:
+                    pass
+        self._connections.clear()
+    
+    def connect(self, user_id: int, websocket: WebSocket):
+        self._connections[user_id].add(websocket)
+    
+    def disconnect(self, user_id: int, websocket: WebSocket):
+        sockets = self._connections.get(user_id)
+        if sockets is None:
+            return
+        sockets.discard(websocket)
+        if not sockets:
+            del self._connections[user_id]
+    
+    def is_online(self, user_id: int) -> bool:
+        return user_id in self._connections
+    
+    async def publish(self, user_id: int, event: Dict[str, Any]):
+        await self.backend.publish(user_id, event)
+    
+    async def _deliver(self, user_id: int, event: Dict[str, Any]):
+        sockets = self._connections.get(user_id)
+        if not sockets:
+            return
+        
+        sockets = list(sockets)
+        results = await asyncio.gather(
+            *[
+                asyncio.wait_for(websocket.send_json(event), settings.WS_SEND_TIMEOUT_SECONDS)
+                for websocket in sockets
+            ],
+            return_exceptions=True
+        )
+        # Drop connections that failed or were too slow to keep up
+        for websocket, result in zip(sockets, results):
+            if isinstance(result, Exception):
+                self.disconnect(user_id, websocket)
+
+message_hub = MessageHub(BACKENDS[settings.MESSAGE_HUB_BACKEND]())
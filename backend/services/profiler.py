@@ -0,0 +1,134 @@
+"""
+Opt-in sampling profiler for slow requests (PROFILE_SLOW_REQUESTS=true).
+
+A daemon thread wakes every PROFILE_SAMPLE_INTERVAL_MS and, for each request
+in flight, records one stack: the event loop thread's Python stack when the
+request's task is the one running, otherwise the task's coroutine chain
+under a "(waiting)" root (awaiting the DB, the bcrypt pool, a lock...).
+Requests slower than PROFILE_SLOW_REQUEST_MS have their samples written to
+PROFILE_OUTPUT_DIR in folded-stack format ("frame;frame;frame count"),
+which flamegraph.pl, speedscope and inferno read directly.
+"""
+import asyncio
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional
+from config import settings
+
+def _frame_label(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+def _thread_stack(frame) -> List[str]:
+    stack = []
+    while frame is not None:
+        stack.append(_frame_label(frame.f_code))
+        frame = frame.f_back
+    stack.reverse()
+    return stack
+
+def _await_chain(task: asyncio.Task) -> List[str]:
+    """Outermost-first coroutine frames of a suspended task."""
+    stack = ['(waiting)']
+    awaitable = task.get_coro()
+    while awaitable is not None:
+        code = getattr(awaitable, 'cr_code', None) or getattr(awaitable, 'gi_code', None)
+        if code is None:
+            stack.append(type(awaitable).__name__)
+            break
+        stack.append(_frame_label(code))
+        awaitable = getattr(awaitable, 'cr_await', None) or getattr(awaitable, 'gi_yieldfrom', None)
+    return stack
+
+class SamplingProfiler:
+    """Samples in-flight requests' stacks and dumps those of slow requests."""
+    
+    def __init__(
+        self,
+        enabled: bool = None,
+        interval_ms: float = None,
+        slow_ms: float = None,
+        output_dir: str = None,
+        max_dumps: int = None
+    ):
+        self.enabled = enabled if enabled is not None else settings.PROFILE_SLOW_REQUESTS
+        self.interval_ms = interval_ms or settings.PROFILE_SAMPLE_INTERVAL_MS
+        self.slow_ms = slow_ms if slow_ms is not None else settings.PROFILE_SLOW_REQUEST_MS
+        self.output_dir = output_dir or settings.PROFILE_OUTPUT_DIR
+        self.max_dumps = max_dumps if max_dumps is not None else settings.PROFILE_MAX_DUMPS
+        self.dumps = 0
+        self._active: Dict[asyncio.Task, Counter] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+    
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+    
+    def start(self):
+        """Start sampling the running event loop; call from the loop thread."""
+        if not self.enabled or self._thread is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name='request-profiler', daemon=True)
+        self._thread.start()
+    
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stopping.set()
+        self._thread.join()
+        self._thread = None
+        self._active.clear()
+    
+    def begin(self) -> Optional[asyncio.Task]:
+        """Start collecting samples for the current request's task."""
+        if self._thread is None:
+            return None
+        task = asyncio.current_task()
+        if task is not None:
+            self._active[task] = Counter()
+        return task
+    
+    def end(self, task: asyncio.Task, method: str, route: str, status: int, elapsed: float):
+        samples = self._active.pop(task, None)
+        if not samples or elapsed * 1000 < self.slow_ms or self.dumps >= self.max_dumps:
+            return
+        self.dumps += 1
+        os.makedirs(self.output_dir, exist_ok=True)
+        slug = re.sub(r'[^A-Za-z0-9]+', '_', route).strip('_') or 'root'
+        path = os.path.join(
+            self.output_dir,
+            f"{int(time.time() * 1000)}-{method}-{slug}-{status}-{round(elapsed * 1000)}ms.folded"
+        )
+        with open(path, 'w') as f:
+            for stack, count in samples.most_common():
+                f.write(f"{stack} {count}\n")
+    
+    def _run(self):
+        interval = self.interval_ms / 1000
+        while not self._stopping.wait(interval):
+            self._sample()
+    
+    def _sample(self):
+        if not self._active:
+            return
+        frame = sys._current_frames().get(self._loop_thread_id)
+        running = asyncio.current_task(self._loop)
+        for task, samples in list(self._active.items()):
+            if task is running and frame is not None:
+                stack = _thread_stack(frame)
+            elif task.done():
+                continue
+            else:
+                stack = _await_chain(task)
+            samples[';'.join(stack)] += 1
+
+sampling_profiler = SamplingProfiler()
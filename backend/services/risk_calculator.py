@@ -1,20 +1,10 @@
-# Empty for now - can be expanded for advanced risk calculations
+from services.risk_rules import risk_rules
+
 class RiskCalculator:
     @staticmethod
     def calculate_composite_risk(behavioral_scores, device_scores, location_scores):
         """
-        Calculate composite risk score from multiple factors
+        Calculate composite risk score from multiple factors,
+        weighted by the `composite` section of the risk rules
         """
-        weights = {
-            'behavioral': 0.4,
-            'device': 0.3,
-            'location': 0.3
-        }
-        
-        composite = (
-            behavioral_scores * weights['behavioral'] +
-            device_scores * weights['device'] +
-            location_scores * weights['location']
-        )
-        
-        return min(composite, 100)
+        return risk_rules.current().composite(behavioral_scores, device_scores, location_scores)
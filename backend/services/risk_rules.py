@@ -0,0 +1,395 @@
+"""
+Declarative risk-scoring rules, compiled once into a flat evaluation plan.
+
+The rule document is JSON, or YAML when RISK_RULES_PATH ends in .yaml/.yml
+and PyYAML is installed. Every section is optional; whatever a file leaves
+out keeps the defaults built from config.Settings (print them with
+`python -m services.risk_rules`):
+
+    levels        minimum score of each risk level above 'trusted'
+    thresholds    challenge_required, suspicious, max_score, keystroke_min_keys
+    baseline      z_threshold and risk of per-user baseline deviations
+    action_flood  interval_ms and risk of per-action request floods
+    rules         feature rules per group: login, behavior, keystroke
+    composite     RiskCalculator weights per factor
+    challenges    ChallengeGenerator tiers by min_score
+
+A feature rule fires when its feature was measured and falls below `min`
+or above `max`; it adds `risk` and, when given, reports `signal`:
+
+    {"feature": "typing_speed", "min": 50, "max": 200, "risk": 20, "signal": "unusual_typing_speed"}
+
+Each group compiles into flat per-rule rows (feature, bounds, risk,
+signal) for scoring one sample; batch scoring runs the login and behavior
+rows as column comparisons over BATCH_FEATURES, one pass per rule. Sections given as
+objects are merged key by key into the defaults, and a key the defaults
+don't have is an error; a rule group or the challenge list given in the
+file replaces the default one.
+
+risk_rules.current() re-reads the file when its mtime changes, checked at
+most every RISK_RULES_CHECK_SECONDS, so each worker picks up edits without
+a restart. A file that fails to load or compile is reported and the
+previous plan stays in use.
+"""
+import json
+import os
+import sys
+import time
+from bisect import bisect_right
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+import numpy as np
+from config import settings
+
+RISK_LEVELS = ('trusted', 'low', 'medium', 'high', 'critical')
+
+# Column order of the arrays accepted by BehavioGuard.score_batch.
+# Missing values are NaN; device_fingerprint is 1.0 (present) / 0.0 (missing or
+# not sent), so the missing-device rule applies as it does in analyze_login.
+BATCH_FEATURES = ('typing_speed', 'tap_pressure', 'scroll_velocity', 'device_fingerprint')
+
+# Features each rule group can test. login adds local_ip (1.0 for a loopback
+# or unknown address) and hour (UTC hour of the attempt).
+GROUP_FEATURES = {
+    'login': BATCH_FEATURES + ('local_ip', 'hour'),
+    'behavior': BATCH_FEATURES,
+    'keystroke': (
+        'key_count', 'typing_speed',
+        'interval_mean', 'interval_std', 'interval_cv',
+        'dwell_mean', 'dwell_std', 'dwell_cv',
+        'flight_mean', 'flight_std', 'flight_cv',
+        'digraph_count', 'digraph_mean', 'digraph_cv',
+    ),
+}
+
+# Batch scoring covers the sample-level rules of both groups
+BATCH_GROUPS = ('login', 'behavior')
+
+COMPOSITE_FACTORS = ('behavioral', 'device', 'location')
+
+def default_rules() -> Dict[str, Any]:
+    """The rule document equivalent to the current Settings values."""
+    return {
+        'levels': {
+            'low': settings.RISK_THRESHOLD_LOW,
+            'medium': settings.RISK_THRESHOLD_MEDIUM,
+            'high': settings.RISK_THRESHOLD_HIGH,
+            'critical': settings.RISK_THRESHOLD_CRITICAL,
+        },
+        'thresholds': {
+            'challenge_required': settings.CHALLENGE_REQUIRED_THRESHOLD,
+            'suspicious': settings.SUSPICIOUS_THRESHOLD,
+            'max_score': 100,
+            'keystroke_min_keys': settings.KEYSTROKE_MIN_KEYS,
+        },
+        'baseline': {
+            'z_threshold': settings.BASELINE_Z_THRESHOLD,
+            'risk': settings.BASELINE_DEVIATION_RISK,
+        },
+        'action_flood': {
+            'interval_ms': settings.ACTION_FLOOD_INTERVAL_MS,
+            'risk': settings.ACTION_FLOOD_RISK,
+        },
+        'rules': {
+            'login': [
+                {'feature': 'typing_speed', 'min': settings.TYPING_SPEED_MIN, 'max': settings.TYPING_SPEED_MAX,
+                 'risk': settings.TYPING_SPEED_RISK, 'signal': 'unusual_typing_speed'},
+                {'feature': 'device_fingerprint', 'min': 1,
+                 'risk': settings.MISSING_DEVICE_RISK, 'signal': 'missing_device_fingerprint'},
+                {'feature': 'local_ip', 'max': 0, 'risk': settings.LOCAL_IP_RISK},
+                {'feature': 'hour', 'min': 5, 'max': 23,
+                 'risk': settings.UNUSUAL_TIME_RISK, 'signal': 'unusual_login_time'},
+            ],
+            'behavior': [
+                {'feature': 'tap_pressure', 'min': settings.TAP_PRESSURE_MIN, 'max': settings.TAP_PRESSURE_MAX,
+                 'risk': settings.TAP_PRESSURE_RISK, 'signal': 'unusual_tap_pressure'},
+                {'feature': 'scroll_velocity', 'max': settings.SCROLL_VELOCITY_MAX,
+                 'risk': settings.SCROLL_VELOCITY_RISK, 'signal': 'unusual_scroll_velocity'},
+            ],
+            'keystroke': [
+                {'feature': 'interval_mean', 'min': settings.KEYSTROKE_MIN_INTERVAL_MS,
+                 'risk': settings.KEYSTROKE_SPEED_RISK, 'signal': 'inhuman_keystroke_speed'},
+                {'feature': 'interval_cv', 'min': settings.KEYSTROKE_MIN_CV,
+                 'risk': settings.KEYSTROKE_CADENCE_RISK, 'signal': 'robotic_keystroke_cadence'},
+                {'feature': 'dwell_mean', 'min': settings.KEYSTROKE_MIN_DWELL_MS,
+                 'risk': settings.KEYSTROKE_DWELL_RISK, 'signal': 'zero_key_dwell'},
+            ],
+        },
+        'composite': {'behavioral': 0.4, 'device': 0.3, 'location': 0.3},
+        'challenges': [
+            {'min_score': 90, 'type': 'multi_factor', 'methods': ['sms', 'biometric', 'selfie'],
+             'message': 'Critical risk detected. Multiple verification required.', 'severity': 'critical'},
+            {'min_score': 70, 'type': 'adaptive', 'methods': ['sms', 'biometric'],
+             'message': 'Additional verification required.', 'severity': 'high'},
+            {'min_score': 0, 'type': 'simple', 'methods': ['sms'],
+             'message': 'Please verify your identity.', 'severity': 'medium'},
+        ],
+    }
+
+def merge_rules(overrides: Dict[str, Any], defaults: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Overlay a rule file on the defaults (see the module docstring)."""
+    merged = defaults if defaults is not None else default_rules()
+    unknown = set(overrides) - set(merged)
+    if unknown:
+        raise ValueError(f"Unknown rule sections: {', '.join(sorted(unknown))}")
+    for section, value in overrides.items():
+        if isinstance(merged[section], dict):
+            if not isinstance(value, dict):
+                raise ValueError(f"'{section}' must be an object")
+            unknown = set(value) - set(merged[section])
+            if unknown:
+                raise ValueError(f"Unknown keys in '{section}': {', '.join(sorted(unknown))}")
+            merged[section] = {**merged[section], **value}
+        else:
+            merged[section] = value
+    return merged
+
+def _number(value, where: str) -> float:
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError(f"{where} must be a number")
+    return float(value)
+
+class RuleGroup:
+    """One group's feature rules, flattened for per-sample and batch scoring."""
+    
+    def __init__(self, name: str, rules: Sequence[Dict[str, Any]], features: Sequence[str]):
+        self.name = name
+        self.features = tuple(features)
+        rows = []
+        for position, rule in enumerate(rules):
+            where = f"rules.{name}[{position}]"
+            if not isinstance(rule, dict):
+                raise ValueError(f"{where} must be an object")
+            unknown = set(rule) - {'feature', 'min', 'max', 'risk', 'signal'}
+            if unknown:
+                raise ValueError(f"{where} has unknown keys: {', '.join(sorted(unknown))}")
+            feature = rule.get('feature')
+            if feature not in self.features:
+                raise ValueError(f"{where}: feature must be one of {', '.join(self.features)}")
+            if 'min' not in rule and 'max' not in rule:
+                raise ValueError(f"{where} needs a min or a max")
+            lower = _number(rule['min'], f"{where}.min") if 'min' in rule else -np.inf
+            upper = _number(rule['max'], f"{where}.max") if 'max' in rule else np.inf
+            risk = int(_number(rule.get('risk'), f"{where}.risk"))
+            signal = rule.get('signal')
+            if signal is not None and not isinstance(signal, str):
+                raise ValueError(f"{where}.signal must be a string")
+            rows.append((feature, lower, upper, risk, signal))
+        # (feature, lower, upper, risk, signal) per rule, in file order
+        self.rows: Tuple[Tuple[str, float, float, int, Optional[str]], ...] = tuple(rows)
+        # Features the rules read, so callers only extract those
+        self.inputs = tuple(dict.fromkeys(row[0] for row in rows))
+    
+    def evaluate(self, values: Dict[str, Optional[float]]) -> Tuple[int, List[str]]:
+        """Score one sample; features that are missing or None were not measured."""
+        risk_score = 0
+        signals = []
+        for feature, lower, upper, risk, signal in self.rows:
+            value = values.get(feature)
+            if value is not None and (value < lower or value > upper):
+                risk_score += risk
+                if signal:
+                    signals.append(signal)
+        return risk_score, signals
+
+class BatchPlan:
+    """Sample-level rules over BATCH_FEATURES columns, as one flat list of column tests."""
+    
+    def __init__(self, groups: Sequence[RuleGroup]):
+        rows = [row for group in groups for row in group.rows if row[0] in BATCH_FEATURES]
+        # Each distinct signal gets one bit, in rule order
+        bits: Dict[str, int] = {}
+        for row in rows:
+            if row[4] and row[4] not in bits:
+                bits[row[4]] = 1 << len(bits)
+        if len(bits) > 32:
+            raise ValueError("Batch rules can report at most 32 distinct signals")
+        self.signal_names = {bit: name for name, bit in bits.items()}
+        # (column, lower, upper, risk, bit); an open bound is None so it costs no comparison
+        self.rows = tuple(
+            (
+                BATCH_FEATURES.index(feature),
+                lower if lower != -np.inf else None,
+                upper if upper != np.inf else None,
+                np.int32(risk),
+                np.uint32(bits.get(signal, 0))
+            )
+            for feature, lower, upper, risk, signal in rows
+        )
+    
+    def evaluate(
+        self,
+        columns: Sequence[np.ndarray],
+        measured: Sequence[Optional[np.ndarray]]
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Raw risk scores and signal bitmasks of BATCH_FEATURES columns.
+        `measured` holds a boolean mask per column, or None when every value
+        counts; NaN compares False, so missing values never fire a rule.
+        """
+        n = len(columns[0])
+        risk_scores = np.zeros(n, dtype=np.int32)
+        signals = np.zeros(n, dtype=np.uint32)
+        with np.errstate(invalid='ignore'):
+            for column, lower, upper, risk, bit in self.rows:
+                values = columns[column]
+                if lower is None:
+                    fired = values > upper
+                elif upper is None:
+                    fired = values < lower
+                else:
+                    fired = (values < lower) | (values > upper)
+                if measured[column] is not None:
+                    fired &= measured[column]
+                risk_scores += fired * risk
+                if bit:
+                    signals |= fired * bit
+        return risk_scores, signals
+
+class RiskPlan:
+    """A compiled rule document."""
+    
+    def __init__(self, document: Dict[str, Any], source: str = 'settings'):
+        self.source = source
+        self.loaded_at = time.time()
+        
+        levels = document['levels']
+        try:
+            self.level_thresholds = tuple(_number(levels[name], f"levels.{name}") for name in RISK_LEVELS[1:])
+        except KeyError as e:
+            raise ValueError(f"levels is missing {e}")
+        if list(self.level_thresholds) != sorted(self.level_thresholds):
+            raise ValueError("levels must be in ascending order")
+        self.level_array = np.array(self.level_thresholds)
+        
+        thresholds = document['thresholds']
+        self.challenge_required = _number(thresholds['challenge_required'], 'thresholds.challenge_required')
+        self.suspicious = _number(thresholds['suspicious'], 'thresholds.suspicious')
+        self.max_score = int(_number(thresholds['max_score'], 'thresholds.max_score'))
+        self.keystroke_min_keys = _number(thresholds['keystroke_min_keys'], 'thresholds.keystroke_min_keys')
+        self.baseline_z_threshold = _number(document['baseline']['z_threshold'], 'baseline.z_threshold')
+        self.baseline_risk = int(_number(document['baseline']['risk'], 'baseline.risk'))
+        self.flood_interval_ms = _number(document['action_flood']['interval_ms'], 'action_flood.interval_ms')
+        self.flood_risk = int(_number(document['action_flood']['risk'], 'action_flood.risk'))
+        
+        rules = document['rules']
+        if not isinstance(rules, dict) or set(rules) - set(GROUP_FEATURES):
+            raise ValueError(f"rules groups must be among {', '.join(GROUP_FEATURES)}")
+        self.groups = {
+            name: RuleGroup(name, rules.get(name, []), features)
+            for name, features in GROUP_FEATURES.items()
+        }
+        self.login = self.groups['login']
+        self.behavior = self.groups['behavior']
+        self.keystroke = self.groups['keystroke']
+        self.batch = BatchPlan([self.groups[name] for name in BATCH_GROUPS])
+        
+        composite = document['composite']
+        if set(composite) != set(COMPOSITE_FACTORS):
+            raise ValueError(f"composite needs exactly {', '.join(COMPOSITE_FACTORS)}")
+        self.composite_weights = tuple(_number(composite[name], f"composite.{name}") for name in COMPOSITE_FACTORS)
+        
+        challenges = document['challenges']
+        if not isinstance(challenges, list) or not challenges:
+            raise ValueError("challenges must be a non-empty list")
+        tiers = []
+        for position, tier in enumerate(challenges):
+            where = f"challenges[{position}]"
+            if not isinstance(tier, dict) or not {'type', 'methods', 'message', 'severity'} <= set(tier):
+                raise ValueError(f"{where} needs type, methods, message and severity")
+            min_score = _number(tier.get('min_score', 0), f"{where}.min_score")
+            tiers.append((min_score, {key: value for key, value in tier.items() if key != 'min_score'}))
+        tiers.sort(key=lambda tier: tier[0])
+        self.challenge_thresholds = tuple(tier[0] for tier in tiers)
+        self.challenge_tiers = tuple(tier[1] for tier in tiers)
+    
+    def level_for(self, risk_score: float) -> str:
+        return RISK_LEVELS[bisect_right(self.level_thresholds, risk_score)]
+    
+    def levels_for(self, risk_scores: np.ndarray) -> np.ndarray:
+        level_index = np.searchsorted(self.level_array, risk_scores, side='right')
+        return np.asarray(RISK_LEVELS, dtype=object)[level_index]
+    
+    def composite(self, behavioral: float, device: float, location: float) -> float:
+        w_behavioral, w_device, w_location = self.composite_weights
+        return min(behavioral * w_behavioral + device * w_device + location * w_location, self.max_score)
+    
+    def challenge_for(self, risk_score: float) -> Dict[str, Any]:
+        # Scores below the lowest tier still get the lowest tier
+        position = max(bisect_right(self.challenge_thresholds, risk_score) - 1, 0)
+        tier = self.challenge_tiers[position]
+        return {key: list(value) if isinstance(value, list) else value for key, value in tier.items()}
+
+def load_rules(path: str) -> Dict[str, Any]:
+    """Read a rule file and overlay it on the defaults."""
+    with open(path) as f:
+        if path.endswith(('.yaml', '.yml')):
+            try:
+                import yaml
+            except ImportError:
+                raise ValueError("YAML rule files need PyYAML installed")
+            document = yaml.safe_load(f)
+        else:
+            document = json.load(f)
+    if document is None:
+        document = {}
+    if not isinstance(document, dict):
+        raise ValueError("The rule file must contain an object")
+    return merge_rules(document)
+
+class RiskRules:
+    """The plan compiled from RISK_RULES_PATH (or Settings), recompiled when the file changes."""
+    
+    def __init__(self, path: str = None, check_seconds: float = None):
+        self.path = path if path is not None else settings.RISK_RULES_PATH
+        self.check_seconds = check_seconds if check_seconds is not None else settings.RISK_RULES_CHECK_SECONDS
+        self._mtime: Optional[float] = None
+        self._checked_at = time.monotonic()
+        if self.path:
+            # A broken file at startup is fatal; later edits only warn
+            self._mtime = os.stat(self.path).st_mtime
+            self._plan = RiskPlan(load_rules(self.path), source=self.path)
+        else:
+            self._plan = RiskPlan(default_rules())
+    
+    def current(self) -> RiskPlan:
+        if self.path:
+            now = time.monotonic()
+            if now - self._checked_at >= self.check_seconds:
+                self._checked_at = now
+                self._reload_if_changed()
+        return self._plan
+    
+    def reload(self) -> RiskPlan:
+        """Recompile now; raises if the file is unreadable or invalid."""
+        if not self.path:
+            self._plan = RiskPlan(default_rules())
+            return self._plan
+        mtime = os.stat(self.path).st_mtime
+        self._plan = RiskPlan(load_rules(self.path), source=self.path)
+        self._mtime = mtime
+        return self._plan
+    
+    def _reload_if_changed(self):
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except OSError as e:
+            if self._mtime is not None:
+                print(f"⚠️ Risk rules unavailable, keeping the loaded plan: {e}")
+                self._mtime = None
+            return
+        if mtime == self._mtime:
+            return
+        self._mtime = mtime
+        try:
+            self._plan = RiskPlan(load_rules(self.path), source=self.path)
+        except Exception as e:
+            print(f"⚠️ Risk rules reload failed, keeping the loaded plan: {e}")
+            return
+        print(f"🔁 Risk rules reloaded from {self.path}")
+
+risk_rules = RiskRules()
+
+if __name__ == "__main__":
+    # Starting point for a rule file
+    json.dump(default_rules(), sys.stdout, indent=2)
+    print()
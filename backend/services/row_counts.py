@@ -0,0 +1,133 @@
+import time
+from typing import Dict, Any, Optional
+from sqlalchemy import select, func, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from config import settings
+from models.row_count import RowCount
+
+# Tables whose size the admin stats report
+COUNTED_TABLES = ('users', 'posts', 'messages')
+
+TRIGGER_NAME = 'row_counts_maintain'
+
+# Statement-level triggers see every inserted/deleted row through a
+# transition table, so a bulk insert costs one counter update, not one per row
+_TRIGGER_FUNCTION = """
+CREATE OR REPLACE FUNCTION row_counts_apply() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'TRUNCATE' THEN
+        UPDATE row_counts SET row_count = 0 WHERE table_name = TG_TABLE_NAME;
+        RETURN NULL;
+    END IF;
+    INSERT INTO row_counts AS counts (table_name, shard, row_count)
+    SELECT TG_TABLE_NAME,
+           floor(random() * TG_ARGV[0]::int),
+           CASE TG_OP WHEN 'INSERT' THEN count(*) ELSE -count(*) END
+    FROM changed_rows
+    HAVING count(*) > 0
+    ON CONFLICT (table_name, shard)
+    DO UPDATE SET row_count = counts.row_count + excluded.row_count;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql
+"""
+
+_TRIGGERS = (
+    ('ins', "AFTER INSERT ON {table} REFERENCING NEW TABLE AS changed_rows FOR EACH STATEMENT"),
+    ('del', "AFTER DELETE ON {table} REFERENCING OLD TABLE AS changed_rows FOR EACH STATEMENT"),
+    ('trunc', "AFTER TRUNCATE ON {table} FOR EACH STATEMENT"),
+)
+
+async def install_row_counters(db: AsyncSession) -> int:
+    """
+    Create the counting triggers on tables that don't have them yet and
+    seed those tables' counts. Seeding is the only full count(*) and runs
+    while writes to the table are blocked, so no insert is missed or
+    counted twice. Returns the number of tables set up.
+    """
+    # Several workers may start at once; one installs, the others find it done
+    await db.execute(text("SELECT pg_advisory_xact_lock(hashtext('row_counts'))"))
+    installed = await db.execute(
+        text("SELECT tgrelid::regclass::text FROM pg_trigger WHERE tgname = :name"),
+        {'name': f'{TRIGGER_NAME}_ins'}
+    )
+    installed = set(installed.scalars())
+    missing = [table for table in COUNTED_TABLES if table not in installed]
+    if not missing:
+        await db.commit()
+        return 0
+    
+    await db.execute(text(_TRIGGER_FUNCTION))
+    for table in missing:
+        await db.execute(text(f"LOCK TABLE {table} IN SHARE ROW EXCLUSIVE MODE"))
+        for suffix, timing in _TRIGGERS:
+            await db.execute(text(
+                f"CREATE TRIGGER {TRIGGER_NAME}_{suffix} {timing.format(table=table)} "
+                f"EXECUTE FUNCTION row_counts_apply('{settings.ROW_COUNT_SHARDS}')"
+            ))
+        await db.execute(RowCount.__table__.delete().where(RowCount.table_name == table))
+        await db.execute(text(
+            f"INSERT INTO row_counts (table_name, shard, row_count) SELECT :table, 0, count(*) FROM {table}"
+        ), {'table': table})
+    await db.commit()
+    return len(missing)
+
+async def counter_totals(db: AsyncSession) -> Dict[str, int]:
+    """Exact counts from the counter table (a few dozen rows, whatever the table sizes)."""
+    result = await db.execute(
+        select(RowCount.table_name, func.sum(RowCount.row_count))
+        .where(RowCount.table_name.in_(COUNTED_TABLES))
+        .group_by(RowCount.table_name)
+    )
+    return {table: int(total) for table, total in result.all()}
+
+async def estimated_totals(db: AsyncSession) -> Dict[str, int]:
+    """Planner estimates from pg_class, as fresh as the last VACUUM/ANALYZE."""
+    result = await db.execute(
+        text("""
+            SELECT relname, greatest(reltuples, 0)::bigint
+            FROM pg_class
+            WHERE relname = ANY(:tables) AND relkind = 'r' AND pg_table_is_visible(oid)
+        """),
+        {'tables': list(COUNTED_TABLES)}
+    )
+    return {table: int(estimate) for table, estimate in result.all()}
+
+class TableCounts:
+    """
+    Row counts of COUNTED_TABLES behind a short TTL cache.
+    Counts come from the trigger-maintained counters, falling back to
+    pg_class estimates for any table that has no counters (or for all of
+    them when STATS_COUNT_SOURCE is 'estimate').
+    """
+    
+    def __init__(self, source: str = None, ttl_seconds: float = None):
+        self.source = source or settings.STATS_COUNT_SOURCE
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else settings.STATS_CACHE_TTL_SECONDS
+        self._counts: Optional[Dict[str, int]] = None
+        self._approximate = False
+        self._loaded_at: Optional[float] = None
+    
+    def is_fresh(self) -> bool:
+        return self._loaded_at is not None and time.monotonic() - self._loaded_at < self.ttl_seconds
+    
+    async def get(self, db: AsyncSession) -> Dict[str, Any]:
+        """Counts keyed by table name, plus whether any of them is an estimate."""
+        if not self.is_fresh():
+            counts = await counter_totals(db) if self.source == 'counters' else {}
+            approximate = False
+            if len(counts) < len(COUNTED_TABLES):
+                estimates = await estimated_totals(db)
+                for table in COUNTED_TABLES:
+                    if table not in counts:
+                        counts[table] = estimates.get(table, 0)
+                        approximate = True
+            self._counts = counts
+            self._approximate = approximate
+            self._loaded_at = time.monotonic()
+        return {'counts': self._counts, 'approximate': self._approximate}
+    
+    def invalidate(self):
+        self._loaded_at = None
+
+table_counts = TableCounts()
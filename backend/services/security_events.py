@@ -0,0 +1,111 @@
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional
+from sqlalchemy import delete, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from config import settings
+from models.security_event import SecurityEvent
+from models.security_rollup import SecurityRollup
+from services.background_writer import BackgroundWriter
+
+GRANULARITIES = {
+    'minute': lambda ts: ts.replace(second=0, microsecond=0),
+    'hour': lambda ts: ts.replace(minute=0, second=0, microsecond=0),
+}
+
+def build_event(
+    user_id: int,
+    event_type: str,
+    risk_score: int,
+    risk_level: str,
+    reason: Optional[str] = None,
+    signals: Optional[List[str]] = None,
+    action_taken: Optional[str] = None,
+    ip_address: Optional[str] = None,
+    device_info: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """SecurityEvent row for a BehavioGuard verdict."""
+    return {
+        'user_id': user_id,
+        'event_type': event_type,
+        'risk_score': int(risk_score),
+        'risk_level': risk_level,
+        'reason': reason,
+        'action_taken': action_taken,
+        'ip_address': ip_address,
+        'device_info': device_info,
+        'behavioral_signals': signals or [],
+        'status': 'active',
+        'created_at': datetime.utcnow(),
+    }
+
+def rollup_rows(events: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Aggregate a batch of events into per-bucket rollup increments."""
+    buckets = defaultdict(lambda: [0, 0, 0])
+    for event in events:
+        for granularity, truncate in GRANULARITIES.items():
+            key = (granularity, truncate(event['created_at']), event['event_type'], event['risk_level'])
+            bucket = buckets[key]
+            bucket[0] += 1
+            bucket[1] += event['risk_score']
+            bucket[2] = max(bucket[2], event['risk_score'])
+    
+    return [
+        {
+            'granularity': granularity,
+            'bucket_start': bucket_start,
+            'event_type': event_type,
+            'risk_level': risk_level,
+            'event_count': count,
+            'risk_score_sum': score_sum,
+            'risk_score_max': score_max,
+        }
+        for (granularity, bucket_start, event_type, risk_level), (count, score_sum, score_max) in buckets.items()
+    ]
+
+async def update_rollups(session: AsyncSession, events: List[Dict[str, Any]]):
+    """Fold a written batch into the rollup tables, in the same transaction."""
+    await session.execute(upsert_rollups(rollup_rows(events)))
+    await _prune_minute_rollups(session)
+
+_last_prune: Optional[datetime] = None
+
+async def _prune_minute_rollups(session: AsyncSession):
+    global _last_prune
+    now = datetime.utcnow()
+    if _last_prune and now - _last_prune < timedelta(minutes=10):
+        return
+    _last_prune = now
+    cutoff = now - timedelta(hours=settings.SECURITY_ROLLUP_MINUTE_RETENTION_HOURS)
+    await session.execute(
+        delete(SecurityRollup).where(
+            SecurityRollup.granularity == 'minute',
+            SecurityRollup.bucket_start < cutoff
+        )
+    )
+
+def upsert_rollups(rows: List[Dict[str, Any]]):
+    stmt = pg_insert(SecurityRollup).values(rows)
+    return stmt.on_conflict_do_update(
+        index_elements=[
+            SecurityRollup.granularity,
+            SecurityRollup.bucket_start,
+            SecurityRollup.event_type,
+            SecurityRollup.risk_level,
+        ],
+        set_={
+            'event_count': SecurityRollup.event_count + stmt.excluded.event_count,
+            'risk_score_sum': SecurityRollup.risk_score_sum + stmt.excluded.risk_score_sum,
+            'risk_score_max': func.greatest(SecurityRollup.risk_score_max, stmt.excluded.risk_score_max),
+        }
+    )
+
+# Each flush is one multi-row INSERT of events plus one rollup upsert
+security_events = BackgroundWriter(
+    'security_events',
+    SecurityEvent,
+    batch_size=settings.SECURITY_EVENT_BATCH_SIZE,
+    flush_interval_ms=settings.SECURITY_EVENT_FLUSH_INTERVAL_MS,
+    on_flush=update_rollups
+)
@@ -0,0 +1,193 @@
+"""
+Streaming behavioral telemetry.
+
+Clients stream raw UI events instead of one pre-aggregated dict per request.
+Two framings are accepted:
+
+- NDJSON: one JSON object per line, e.g.
+    {"type": "key", "t": 1031.5, "up": 1102.0, "key": "a"}
+    {"type": "tap", "t": 2210.0, "pressure": 0.45, "duration": 120}
+    {"type": "scroll", "t": 2400.0, "velocity": 310}
+- Binary: little-endian frames of `uint16 length` followed by `length`
+  payload bytes. The payload starts with `uint8 type, float64 t` and the
+  type-specific fields in FRAME_LAYOUTS. Unknown types are skipped, so new
+  event types don't break old servers.
+
+Timestamps are client milliseconds. Events are parsed incrementally and
+folded into fixed windows that become ordinary behavioral samples.
+"""
+import json
+import struct
+from typing import Dict, Any, List, Optional, AsyncIterator
+from config import settings
+from utils.numbers import finite_number
+
+EVENT_KEY = 1
+EVENT_TAP = 2
+EVENT_SCROLL = 3
+
+FRAME_HEADER = struct.Struct('<Bd')
+FRAME_LENGTH = struct.Struct('<H')
+FRAME_LAYOUTS = {
+    EVENT_KEY: (struct.Struct('<fI'), 'key', ('dwell', 'key')),
+    EVENT_TAP: (struct.Struct('<ff'), 'tap', ('pressure', 'duration')),
+    EVENT_SCROLL: (struct.Struct('<f'), 'scroll', ('velocity',)),
+}
+
+class TelemetryError(ValueError):
+    pass
+
+async def iter_ndjson(chunks: AsyncIterator[bytes]) -> AsyncIterator[Dict[str, Any]]:
+    """Decode NDJSON from arbitrary chunk boundaries, one line in memory at a time."""
+    buffer = b''
+    async for chunk in chunks:
+        buffer += chunk
+        lines = buffer.split(b'\n')
+        buffer = lines.pop()
+        if len(buffer) > settings.TELEMETRY_MAX_LINE_BYTES:
+            raise TelemetryError("NDJSON line too long")
+        for line in lines:
+            if line.strip():
+                yield _decode_line(line)
+    if buffer.strip():
+        yield _decode_line(buffer)
+
+def _decode_line(line: bytes) -> Dict[str, Any]:
+    try:
+        event = json.loads(line)
+    except ValueError:
+        raise TelemetryError("Invalid JSON line")
+    if not isinstance(event, dict):
+        raise TelemetryError("Each line must be a JSON object")
+    return event
+
+async def iter_frames(chunks: AsyncIterator[bytes]) -> AsyncIterator[Dict[str, Any]]:
+    """Decode length-prefixed binary frames from arbitrary chunk boundaries."""
+    buffer = bytearray()
+    async for chunk in chunks:
+        buffer += chunk
+        offset = 0
+        while len(buffer) - offset >= FRAME_LENGTH.size:
+            (length,) = FRAME_LENGTH.unpack_from(buffer, offset)
+            start = offset + FRAME_LENGTH.size
+            if start + length > len(buffer):
+                break
+            event = _decode_frame(buffer, start, length)
+            offset = start + length
+            if event is not None:
+                yield event
+        # Only the incomplete tail frame is carried over to the next chunk
+        del buffer[:offset]
+    if buffer:
+        raise TelemetryError("Truncated frame at end of stream")
+
+def _decode_frame(buffer: bytearray, start: int, length: int) -> Optional[Dict[str, Any]]:
+    if length < FRAME_HEADER.size:
+        raise TelemetryError("Frame shorter than its header")
+    event_type, t = FRAME_HEADER.unpack_from(buffer, start)
+    layout = FRAME_LAYOUTS.get(event_type)
+    if layout is None:
+        return None
+    fields, name, field_names = layout
+    if length < FRAME_HEADER.size + fields.size:
+        raise TelemetryError(f"Truncated {name} frame")
+    values = fields.unpack_from(buffer, start + FRAME_HEADER.size)
+    event = {'type': name, 't': t, **dict(zip(field_names, values))}
+    if name == 'key':
+        event['up'] = t + event.pop('dwell')
+    return event
+
+class TelemetryWindow:
+    """Accumulates the events of one time window into a behavioral sample."""
+    
+    __slots__ = ('start', 'events', 'key_down', 'key_up', 'keys',
+                 'tap_count', 'pressure_sum', 'duration_sum', 'scroll_count', 'velocity_sum')
+    
+    def __init__(self, start: float):
+        self.start = start
+        self.events = 0
+        self.key_down: List[float] = []
+        self.key_up: List[float] = []
+        self.keys: List[Any] = []
+        self.tap_count = 0
+        self.pressure_sum = 0.0
+        self.duration_sum = 0.0
+        self.scroll_count = 0
+        self.velocity_sum = 0.0
+    
+    def add(self, event: Dict[str, Any], t: float):
+        self.events += 1
+        kind = event.get('type')
+        if kind == 'key':
+            if len(self.key_down) < settings.KEYSTROKE_MAX_KEYS:
+                self.key_down.append(t)
+                self.key_up.append(finite_number(event.get('up'), float('nan')))
+                self.keys.append(_key(event.get('key')))
+        elif kind == 'tap':
+            pressure = finite_number(event.get('pressure'))
+            if pressure is not None:
+                self.tap_count += 1
+                self.pressure_sum += pressure
+                self.duration_sum += finite_number(event.get('duration'), 0.0)
+        elif kind == 'scroll':
+            velocity = finite_number(event.get('velocity'))
+            if velocity is not None:
+                self.scroll_count += 1
+                self.velocity_sum += abs(velocity)
+    
+    def sample(self) -> Dict[str, Any]:
+        """The window as a dict BehavioGuard.analyze_behavioral_data understands."""
+        sample: Dict[str, Any] = {'window_start': self.start, 'event_count': self.events}
+        if self.key_down:
+            sample['key_down'] = self.key_down
+            sample['key_up'] = self.key_up
+            if all(key is not None for key in self.keys):
+                sample['keys'] = self.keys
+        if self.tap_count:
+            sample['tap_pressure'] = self.pressure_sum / self.tap_count
+            sample['tap_duration'] = self.duration_sum / self.tap_count
+        if self.scroll_count:
+            sample['scroll_velocity'] = self.velocity_sum / self.scroll_count
+        return sample
+
+async def windowed_samples(
+    events: AsyncIterator[Dict[str, Any]],
+    window_ms: float = None
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Group a time-ordered event stream into fixed windows and yield one
+    sample per window as soon as it closes. Late events are folded into the
+    current window rather than reopening a closed one.
+    """
+    window_ms = window_ms or settings.TELEMETRY_WINDOW_MS
+    window: Optional[TelemetryWindow] = None
+    async for event in events:
+        t = finite_number(event.get('t'))
+        if t is None:
+            continue
+        if window is not None and t >= window.start + window_ms:
+            yield window.sample()
+            window = None
+        if window is None:
+            window = TelemetryWindow(t - t % window_ms)
+        window.add(event, t)
+        if window.events >= settings.TELEMETRY_MAX_EVENTS_PER_WINDOW:
+            yield window.sample()
+            window = None
+    if window is not None and window.events:
+        yield window.sample()
+
+def _key(value):
+    if isinstance(value, (str, int)) and not isinstance(value, bool):
+        return value
+    return None
+
+DECODERS = {
+    'ndjson': iter_ndjson,
+    'binary': iter_frames,
+}
+
+CONTENT_TYPES = {
+    'application/x-ndjson': iter_ndjson,
+    'application/octet-stream': iter_frames,
+}
@@ -0,0 +1,267 @@
+"""
+The default risk plan compiled by services.risk_rules scores exactly like
+the hand-written rules it replaced. The reference functions below are
+those original branches, checked against BehavioGuard, ChallengeGenerator
+and RiskCalculator over 20k random samples.
+
+Run from backend/:
+    python -m pytest tests/test_risk_rules.py
+"""
+import datetime
+import os
+import random
+import unittest
+from unittest import mock
+
+# Importing the services builds (but never connects) the database engine
+os.environ.setdefault('DATABASE_URL', 'postgresql://localhost/test')
+
+from config import settings
+from services.baseline_store import UserBaseline
+from services.behavioguard import BehavioGuard
+from services.challenge_generator import ChallengeGenerator
+from services.keystroke import extract_keystroke_features
+from services.risk_calculator import RiskCalculator
+from services.risk_rules import RiskPlan, default_rules, merge_rules
+
+SAMPLES = 20000
+
+def random_sample(rng: random.Random) -> dict:
+    """A behavioral sample with features missing, zero, in or out of range, and sometimes key timings."""
+    sample = {}
+    for feature, low, high in (('typing_speed', -20, 260), ('tap_pressure', 0, 1.1), ('scroll_velocity', 0, 1500)):
+        roll = rng.random()
+        if roll < 0.2:
+            continue
+        sample[feature] = 0 if roll < 0.3 else rng.uniform(low, high)
+    roll = rng.random()
+    if roll < 0.6:
+        sample['device_fingerprint'] = 'fp' if roll < 0.4 else ''
+    if rng.random() < 0.5:
+        t = 0.0
+        key_down, key_up = [], []
+        for _ in range(rng.randint(2, 30)):
+            t += rng.choice([rng.uniform(5, 40), rng.uniform(80, 300), 100])
+            key_down.append(t)
+            key_up.append(t + rng.choice([0, 80, rng.uniform(0, 100)]))
+        sample['key_down'] = key_down
+        if rng.random() < 0.7:
+            sample['key_up'] = key_up
+    return sample
+
+def random_baseline(rng: random.Random) -> UserBaseline:
+    baseline = UserBaseline(1)
+    for _ in range(settings.BASELINE_MIN_SAMPLES * 2):
+        baseline.update({'typing_speed': rng.uniform(60, 100), 'tap_pressure': rng.uniform(0.3, 0.6)})
+    return baseline
+
+def is_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+def reference_level(risk_score):
+    if risk_score >= settings.RISK_THRESHOLD_CRITICAL:
+        return 'critical'
+    elif risk_score >= settings.RISK_THRESHOLD_HIGH:
+        return 'high'
+    elif risk_score >= settings.RISK_THRESHOLD_MEDIUM:
+        return 'medium'
+    elif risk_score >= settings.RISK_THRESHOLD_LOW:
+        return 'low'
+    return 'trusted'
+
+def reference_keystrokes(data):
+    key_down = data.get('key_down')
+    if not isinstance(key_down, list) or len(key_down) < 2:
+        return 0, [], {}
+    key_up = data.get('key_up')
+    features = extract_keystroke_features(key_down, key_up if isinstance(key_up, list) else None, None)
+    
+    risk_score = 0
+    signals = []
+    if features['key_count'] < settings.KEYSTROKE_MIN_KEYS:
+        return risk_score, signals, features
+    if features['interval_mean'] < settings.KEYSTROKE_MIN_INTERVAL_MS:
+        risk_score += settings.KEYSTROKE_SPEED_RISK
+        signals.append('inhuman_keystroke_speed')
+    if features['interval_cv'] < settings.KEYSTROKE_MIN_CV:
+        risk_score += settings.KEYSTROKE_CADENCE_RISK
+        signals.append('robotic_keystroke_cadence')
+    if features.get('dwell_mean', float('inf')) < settings.KEYSTROKE_MIN_DWELL_MS:
+        risk_score += settings.KEYSTROKE_DWELL_RISK
+        signals.append('zero_key_dwell')
+    return risk_score, signals, features
+
+def reference_deviations(data, baseline, signals):
+    zscores = baseline.zscores(data) if baseline else {}
+    risk_score = 0
+    for feature, z in zscores.items():
+        if abs(z) > settings.BASELINE_Z_THRESHOLD:
+            risk_score += settings.BASELINE_DEVIATION_RISK
+            signals.append(f'{feature}_deviation')
+    return risk_score, zscores
+
+def with_measured_typing_speed(data, keystroke):
+    if 'typing_speed' in keystroke and not data.get('typing_speed'):
+        return {**data, 'typing_speed': keystroke['typing_speed']}
+    return data
+
+def reference_login(data, ip_address, baseline, hour):
+    risk_score, signals, keystroke = reference_keystrokes(data)
+    data = with_measured_typing_speed(data, keystroke)
+    deviation_risk, zscores = reference_deviations(data, baseline, signals)
+    risk_score += deviation_risk
+    
+    typing_speed = data.get('typing_speed', 0)
+    if typing_speed > 0 and 'typing_speed' not in zscores:
+        if typing_speed < settings.TYPING_SPEED_MIN or typing_speed > settings.TYPING_SPEED_MAX:
+            risk_score += settings.TYPING_SPEED_RISK
+            signals.append('unusual_typing_speed')
+    if not data.get('device_fingerprint'):
+        risk_score += settings.MISSING_DEVICE_RISK
+        signals.append('missing_device_fingerprint')
+    if not ip_address or ip_address == '127.0.0.1':
+        risk_score += settings.LOCAL_IP_RISK
+    if hour < 5 or hour > 23:
+        risk_score += settings.UNUSUAL_TIME_RISK
+        signals.append('unusual_login_time')
+    
+    return {
+        'risk_score': min(risk_score, 100),
+        'risk_level': reference_level(risk_score),
+        'requires_challenge': risk_score >= settings.CHALLENGE_REQUIRED_THRESHOLD,
+        'signals': signals,
+    }
+
+def reference_behavior(data, baseline, action_velocity):
+    risk_score = 0
+    anomalies = []
+    for action, interval_ms in action_velocity.items():
+        if interval_ms < settings.ACTION_FLOOD_INTERVAL_MS:
+            risk_score += settings.ACTION_FLOOD_RISK
+            anomalies.append(f'{action}_flooding')
+    keystroke_risk, keystroke_signals, keystroke = reference_keystrokes(data)
+    risk_score += keystroke_risk
+    anomalies += keystroke_signals
+    data = with_measured_typing_speed(data, keystroke)
+    deviation_risk, zscores = reference_deviations(data, baseline, anomalies)
+    risk_score += deviation_risk
+    
+    if data.get('tap_pressure') and 'tap_pressure' not in zscores:
+        pressure = data['tap_pressure']
+        if pressure < settings.TAP_PRESSURE_MIN or pressure > settings.TAP_PRESSURE_MAX:
+            risk_score += settings.TAP_PRESSURE_RISK
+            anomalies.append('unusual_tap_pressure')
+    if data.get('scroll_velocity') and 'scroll_velocity' not in zscores:
+        if data['scroll_velocity'] > settings.SCROLL_VELOCITY_MAX:
+            risk_score += settings.SCROLL_VELOCITY_RISK
+            anomalies.append('unusual_scroll_velocity')
+    
+    return {
+        'risk_score': min(risk_score, 100),
+        'anomalies': anomalies,
+        'is_suspicious': risk_score > settings.SUSPICIOUS_THRESHOLD,
+    }
+
+def reference_batch(data):
+    """Batch verdict for one sample: the sample-level rules, without keystrokes or baselines."""
+    typing_speed = data.get('typing_speed')
+    pressure = data.get('tap_pressure')
+    velocity = data.get('scroll_velocity')
+    fired = {
+        'unusual_typing_speed': (settings.TYPING_SPEED_RISK, is_number(typing_speed) and typing_speed > 0 and (
+            typing_speed < settings.TYPING_SPEED_MIN or typing_speed > settings.TYPING_SPEED_MAX
+        )),
+        'missing_device_fingerprint': (settings.MISSING_DEVICE_RISK, not data.get('device_fingerprint')),
+        'unusual_tap_pressure': (settings.TAP_PRESSURE_RISK, is_number(pressure) and pressure != 0 and (
+            pressure < settings.TAP_PRESSURE_MIN or pressure > settings.TAP_PRESSURE_MAX
+        )),
+        'unusual_scroll_velocity': (settings.SCROLL_VELOCITY_RISK, is_number(velocity) and velocity > settings.SCROLL_VELOCITY_MAX),
+    }
+    risk_score = sum(risk for risk, hit in fired.values() if hit)
+    return {
+        'risk_score': min(risk_score, 100),
+        'risk_level': reference_level(risk_score),
+        'signals': sorted(name for name, (_, hit) in fired.items() if hit),
+        'is_suspicious': risk_score > settings.SUSPICIOUS_THRESHOLD,
+    }
+
+def reference_challenge(risk_score):
+    if risk_score >= 90:
+        return {'type': 'multi_factor', 'methods': ['sms', 'biometric', 'selfie'],
+                'message': 'Critical risk detected. Multiple verification required.', 'severity': 'critical'}
+    elif risk_score >= 70:
+        return {'type': 'adaptive', 'methods': ['sms', 'biometric'],
+                'message': 'Additional verification required.', 'severity': 'high'}
+    return {'type': 'simple', 'methods': ['sms'],
+            'message': 'Please verify your identity.', 'severity': 'medium'}
+
+class DefaultPlanEquivalenceTest(unittest.TestCase):
+    
+    @classmethod
+    def setUpClass(cls):
+        rng = random.Random(1)
+        cls.rng = rng
+        cls.samples = [random_sample(rng) for _ in range(SAMPLES)]
+        cls.behavioguard = BehavioGuard()
+    
+    def test_per_sample_scoring(self):
+        rng = random.Random(2)
+        with mock.patch('services.behavioguard.datetime') as clock:
+            for sample in self.samples:
+                baseline = random_baseline(rng) if rng.random() < 0.3 else None
+                ip_address = rng.choice(['127.0.0.1', '', '10.0.0.1'])
+                velocity = {'message': rng.uniform(100, 400)} if rng.random() < 0.5 else {}
+                hour = rng.randrange(24)
+                clock.datetime.utcnow.return_value = datetime.datetime(2026, 1, 1, hour)
+                
+                login = self.behavioguard.analyze_login(1, sample, ip_address, 'device', baseline=baseline)
+                expected = reference_login(sample, ip_address, baseline, hour)
+                self.assertEqual({key: login[key] for key in expected}, expected, sample)
+                
+                behavior = self.behavioguard.analyze_behavioral_data(sample, baseline=baseline, action_velocity=velocity)
+                expected = reference_behavior(sample, baseline, velocity)
+                self.assertEqual({key: behavior[key] for key in expected}, expected, sample)
+    
+    def test_batch_scoring(self):
+        result = self.behavioguard.score_batch(self.behavioguard.samples_to_columns(self.samples))
+        for index, sample in enumerate(self.samples):
+            actual = {
+                'risk_score': int(result['risk_scores'][index]),
+                'risk_level': result['risk_levels'][index],
+                'signals': sorted(self.behavioguard.decode_signals(int(result['signals'][index]), result['signal_names'])),
+                'is_suspicious': bool(result['is_suspicious'][index]),
+            }
+            self.assertEqual(actual, reference_batch(sample), sample)
+    
+    def test_levels_challenges_and_composite(self):
+        challenges = ChallengeGenerator()
+        for score in range(-5, 120):
+            self.assertEqual(self.behavioguard.risk_level_for(score), reference_level(score))
+            self.assertEqual(challenges.generate_challenge(score), reference_challenge(score))
+            self.assertEqual(
+                RiskCalculator.calculate_composite_risk(score, 50, 80),
+                min(score * 0.4 + 50 * 0.3 + 80 * 0.3, 100)
+            )
+
+class MergeRulesTest(unittest.TestCase):
+    
+    def test_overrides_known_keys(self):
+        plan = RiskPlan(merge_rules({'thresholds': {'max_score': 90}, 'levels': {'low': 25}}))
+        self.assertEqual(plan.max_score, 90)
+        self.assertEqual(plan.level_thresholds[0], 25)
+    
+    def test_rejects_unknown_keys(self):
+        for overrides in (
+            {'severity': {}},
+            {'levels': {'severe': 95}},
+            {'thresholds': {'max_scor': 90}},
+            {'baseline': {'z': 2}},
+            {'action_flood': {'interval': 50}},
+            {'composite': {'network': 0.1}},
+            {'rules': {'signup': []}},
+        ):
+            with self.subTest(overrides=overrides), self.assertRaises(ValueError):
+                RiskPlan(merge_rules(overrides, default_rules()))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -6,8 +6,10 @@ from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from config import settings
-from database import get_db
+from database import get_db, read_session
 from models.user import User
+from services.instrumentation import phase
+from utils.principal_cache import principal_cache
 
 security = HTTPBearer()
 
@@ -18,38 +20,78 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     else:
         expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     to_encode.update({"exp": expire, "type": "access"})
-    encoded_jwt = jwt.encode(to_encode, settings.JWT_SECRET_KEY, algorithm=settings.JWT_ALGORITHM)
+    with phase('jwt'):
+        encoded_jwt = jwt.encode(to_encode, settings.JWT_SECRET_KEY, algorithm=settings.JWT_ALGORITHM)
     return encoded_jwt
 
+def user_claims(user: User) -> dict:
+    """Token claims for a user: id, lock/admin flags and token version."""
+    return {
+        "sub": str(user.id),
+        "adm": bool(user.is_admin),
+        "lck": bool(user.is_locked),
+        "ver": user.token_version or 0
+    }
+
 def create_refresh_token(data: dict):
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
     to_encode.update({"exp": expire, "type": "refresh"})
-    encoded_jwt = jwt.encode(to_encode, settings.JWT_SECRET_KEY, algorithm=settings.JWT_ALGORITHM)
+    with phase('jwt'):
+        encoded_jwt = jwt.encode(to_encode, settings.JWT_SECRET_KEY, algorithm=settings.JWT_ALGORITHM)
     return encoded_jwt
 
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: AsyncSession = Depends(get_db)
 ) -> User:
+    user = await authenticate_token(credentials.credentials, db)
+    # Commits on the request's primary session make this user a recent writer
+    db.info['user_id'] = user.id
+    return user
+
+async def get_read_db(current_user: User = Depends(get_current_user)):
+    """
+    Read-only session for an authenticated request: a replica, or the
+    primary while the user is within the read-your-writes window.
+    """
+    async with read_session(current_user.id) as session:
+        yield session
+
+async def authenticate_token(token: str, db: AsyncSession) -> User:
+    """Resolve a bearer token to its User, raising HTTPException when invalid."""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        token = credentials.credentials
-        payload = jwt.decode(token, settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
+        with phase('jwt'):
+            payload = jwt.decode(token, settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
         user_id: str = payload.get("sub")
         if user_id is None:
             raise credentials_exception
     except JWTError:
         raise credentials_exception
     
-    result = await db.execute(select(User).where(User.id == int(user_id)))
-    user = result.scalar_one_or_none()
+    # Tokens minted for a locked account are rejected without any lookup
+    if payload.get("lck"):
+        raise HTTPException(status_code=403, detail="Account locked. Contact support.")
     
+    # Hot path: serve the principal from the cache, no users SELECT
+    user = principal_cache.get(int(user_id))
     if user is None:
+        result = await db.execute(select(User).where(User.id == int(user_id)))
+        user = result.scalar_one_or_none()
+        
+        if user is None:
+            raise credentials_exception
+        
+        db.expunge(user)
+        principal_cache.put(user)
+    
+    # Tokens issued before the last revocation are no longer valid
+    if payload.get("ver", 0) < (user.token_version or 0):
         raise credentials_exception
     return user
 
@@ -0,0 +1,10 @@
+import math
+from typing import Optional
+
+def finite_number(value, default: Optional[float] = None) -> Optional[float]:
+    """`value` as a float if it is a finite int or float (not a bool), else `default`."""
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return default
+    if math.isnan(value) or math.isinf(value):
+        return default
+    return float(value)
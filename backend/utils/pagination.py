@@ -0,0 +1,23 @@
+import base64
+from datetime import datetime
+from typing import Optional, Tuple
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    """Opaque keyset cursor for (created_at, id) ordering."""
+    raw = f"{created_at.isoformat()}|{row_id}".encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Inverse of encode_cursor. Raises ValueError on malformed input."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, row_id = base64.urlsafe_b64decode(padded).decode('utf-8').split('|')
+        return datetime.fromisoformat(created_at), int(row_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+def next_cursor(rows: list, limit: int, key=lambda row: (row.created_at, row.id)) -> Optional[str]:
+    """Cursor for the page after `rows` (fetched with limit + 1), or None on the last page."""
+    if len(rows) <= limit:
+        return None
+    return encode_cursor(*key(rows[limit - 1]))
@@ -0,0 +1,106 @@
+import asyncio
+import time
+from concurrent.futures import Executor, ThreadPoolExecutor, ProcessPoolExecutor
+import bcrypt
+from config import settings
+from services.instrumentation import phase
+
+def hash_password(password: str) -> str:
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+
+def check_password(password: str, password_hash: str) -> bool:
+    return bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('utf-8'))
+
+def _timed_call(fn, *args):
+    # Runs in the worker; monotonic clock is shared by threads and local processes
+    started = time.monotonic()
+    result = fn(*args)
+    return started, time.monotonic() - started, result
+
+class PoolSaturatedError(Exception):
+    """Raised when the hashing pool and its queue are full."""
+
+class PasswordHasher:
+    """
+    Runs bcrypt on a bounded thread or process pool so hashing never blocks
+    the event loop. Calls beyond workers + max_queue are rejected right away
+    instead of queueing behind a login burst.
+    """
+    
+    def __init__(self, workers: int = None, max_queue: int = None, executor_kind: str = None):
+        self.workers = workers or settings.PASSWORD_HASH_WORKERS
+        self.max_queue = max_queue if max_queue is not None else settings.PASSWORD_HASH_MAX_QUEUE
+        self.executor_kind = executor_kind or settings.PASSWORD_HASH_EXECUTOR
+        self._executor: Executor = None
+        self._in_flight = 0
+        
+        self.completed = 0
+        self.rejected = 0
+        self.hash_seconds_total = 0.0
+        self.hash_seconds_max = 0.0
+        self.queue_wait_seconds_total = 0.0
+        self.queue_wait_seconds_max = 0.0
+    
+    @property
+    def executor(self) -> Executor:
+        if self._executor is None:
+            if self.executor_kind == 'process':
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                # bcrypt releases the GIL, so threads scale across cores
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers,
+                    thread_name_prefix='bcrypt'
+                )
+        return self._executor
+    
+    async def hash(self, password: str) -> str:
+        return await self._run(hash_password, password)
+    
+    async def verify(self, password: str, password_hash: str) -> bool:
+        return await self._run(check_password, password, password_hash)
+    
+    async def _run(self, fn, *args):
+        if self._in_flight >= self.workers + self.max_queue:
+            self.rejected += 1
+            raise PoolSaturatedError("Password hashing pool is saturated")
+        
+        self._in_flight += 1
+        submitted = time.monotonic()
+        try:
+            loop = asyncio.get_running_loop()
+            # The request's bcrypt phase includes time queued behind other hashes
+            with phase('bcrypt'):
+                started, elapsed, result = await loop.run_in_executor(self.executor, _timed_call, fn, *args)
+        finally:
+            self._in_flight -= 1
+        
+        queue_wait = max(started - submitted, 0.0)
+        self.completed += 1
+        self.hash_seconds_total += elapsed
+        self.hash_seconds_max = max(self.hash_seconds_max, elapsed)
+        self.queue_wait_seconds_total += queue_wait
+        self.queue_wait_seconds_max = max(self.queue_wait_seconds_max, queue_wait)
+        return result
+    
+    def metrics(self) -> dict:
+        completed = self.completed or 1
+        return {
+            'executor': self.executor_kind,
+            'workers': self.workers,
+            'max_queue': self.max_queue,
+            'in_flight': self._in_flight,
+            'completed': self.completed,
+            'rejected': self.rejected,
+            'hash_ms_avg': round(self.hash_seconds_total / completed * 1000, 2),
+            'hash_ms_max': round(self.hash_seconds_max * 1000, 2),
+            'queue_wait_ms_avg': round(self.queue_wait_seconds_total / completed * 1000, 2),
+            'queue_wait_ms_max': round(self.queue_wait_seconds_max * 1000, 2)
+        }
+    
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+password_hasher = PasswordHasher()
@@ -0,0 +1,53 @@
+import time
+from collections import OrderedDict
+from typing import Optional, Iterable
+from config import settings
+
+class PrincipalCache:
+    """
+    TTL + LRU cache of authenticated User rows keyed by id.
+    Entries are detached instances; admin routes invalidate them when they
+    change a user's lock/admin state. The TTL bounds staleness across
+    worker processes, which don't see each other's invalidations.
+    """
+    
+    def __init__(self, max_size: int = None, ttl_seconds: float = None):
+        self.max_size = max_size or settings.AUTH_CACHE_SIZE
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else settings.AUTH_CACHE_TTL_SECONDS
+        self._entries: 'OrderedDict[int, tuple]' = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, user_id: int):
+        entry = self._entries.get(user_id)
+        if entry is None:
+            self.misses += 1
+            return None
+        
+        expires_at, user = entry
+        if expires_at < time.monotonic():
+            del self._entries[user_id]
+            self.misses += 1
+            return None
+        
+        self._entries.move_to_end(user_id)
+        self.hits += 1
+        return user
+    
+    def put(self, user):
+        self._entries[user.id] = (time.monotonic() + self.ttl_seconds, user)
+        self._entries.move_to_end(user.id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+    
+    def invalidate(self, user_id: int):
+        self._entries.pop(user_id, None)
+    
+    def invalidate_many(self, user_ids: Iterable[int]):
+        for user_id in user_ids:
+            self._entries.pop(user_id, None)
+    
+    def clear(self):
+        self._entries.clear()
+
+principal_cache = PrincipalCache()
@@ -0,0 +1,48 @@
+import math
+from fastapi import Depends, HTTPException, Request
+from models.user import User
+from services.action_rate import action_rates
+from services.behavioguard import BehavioGuard
+from services.instrumentation import phase
+from services.security_events import security_events, build_event
+from utils.auth import get_current_active_user
+
+def throttle(action: str):
+    """
+    Dependency that authenticates the user and applies the per-action rate
+    limit. Over the limit the request gets a 429 with Retry-After, and the
+    first rejection of a burst is recorded as a security event.
+    """
+    
+    async def dependency(
+        request: Request,
+        current_user: User = Depends(get_current_active_user)
+    ) -> User:
+        decision = action_rates.hit(current_user.id, action)
+        if decision.allowed:
+            return current_user
+        
+        if decision.first_denial:
+            behavioguard = BehavioGuard()
+            with phase('behavioguard'):
+                risk_score, signals = behavioguard.analyze_action_velocity(
+                    action_rates.velocity(current_user.id)
+                )
+            await security_events.put(build_event(
+                user_id=current_user.id,
+                event_type='rate_limited',
+                risk_score=min(risk_score, 100),
+                risk_level=behavioguard.risk_level_for(risk_score),
+                reason=f"Too many {action} requests",
+                signals=signals,
+                action_taken='throttled',
+                ip_address=request.client.host
+            ))
+        
+        raise HTTPException(
+            status_code=429,
+            detail="Too many requests, slow down",
+            headers={"Retry-After": str(max(1, math.ceil(decision.retry_after)))}
+        )
+    
+    return dependency
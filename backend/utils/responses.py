@@ -0,0 +1,13 @@
+import orjson
+from fastapi.responses import JSONResponse
+from services.instrumentation import phase
+
+class ORJSONResponse(JSONResponse):
+    """
+    JSONResponse encoded with orjson, which handles datetimes and numpy
+    values natively. Rendering is timed as the 'serialization' phase.
+    """
+    
+    def render(self, content) -> bytes:
+        with phase('serialization'):
+            return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
@@ -1,4 +1,4 @@
-import React, { useState, useEffect, createContext, useContext } from 'react';
+import React, { useState, useEffect, useRef, createContext, useContext } from 'react';
 import { View, Text, ScrollView, TextInput, TouchableOpacity, StyleSheet, StatusBar, ActivityIndicator, Alert, SafeAreaView, FlatList } from 'react-native';
 import AsyncStorage from '@react-native-async-storage/async-storage';
 import { authAPI, postsAPI, messagesAPI, securityAPI, adminAPI } from './services/api';
@@ -28,6 +28,25 @@ const theme = {
   }
 };
 
+// Records keydown timestamps so the backend can measure typing rhythm
+const useKeystrokeTiming = () => {
+  const events = useRef({ key_down: [], keys: [] });
+
+  const onKeyPress = (e) => {
+    events.current.key_down.push(Date.now());
+    events.current.keys.push(e.nativeEvent.key);
+  };
+
+  // Returns the recorded timings and starts a new recording
+  const take = ({ includeKeys = true } = {}) => {
+    const { key_down, keys } = events.current;
+    events.current = { key_down: [], keys: [] };
+    return includeKeys ? { key_down, keys } : { key_down };
+  };
+
+  return { onKeyPress, take };
+};
+
 // Icon Components
 const Icon = ({ name, size = 24, color = '#FFF' }) => {
   const icons = {
@@ -246,6 +265,7 @@ const LoginScreen = ({ onLogin, onRegister }) => {
   const [email, setEmail] = useState('');
   const [password, setPassword] = useState('');
   const [isLoading, setIsLoading] = useState(false);
+  const passwordTiming = useKeystrokeTiming();
 
   const handleLogin = async () => {
     if (!email || !password) {
@@ -255,8 +275,9 @@ const LoginScreen = ({ onLogin, onRegister }) => {
 
     setIsLoading(true);
     try {
+      // Password key identities never leave the device, only their timing
       const behavioralData = {
-        typing_speed: 65 + Math.random() * 20,
+        ...passwordTiming.take({ includeKeys: false }),
         device_fingerprint: 'mobile-' + Date.now(),
         session_id: 'session-' + Date.now()
       };
@@ -313,6 +334,7 @@ const LoginScreen = ({ onLogin, onRegister }) => {
               style={[styles.futuristicInput, { backgroundColor: colors.card, color: colors.text, borderColor: colors.border }]}
               value={password}
               onChangeText={setPassword}
+              onKeyPress={passwordTiming.onKeyPress}
               placeholder="••••••••"
               placeholderTextColor={colors.textSecondary}
               secureTextEntry
@@ -501,6 +523,7 @@ const HomeFeedScreen = () => {
   const [newPost, setNewPost] = useState('');
   const [isLoading, setIsLoading] = useState(true);
   const [isPosting, setIsPosting] = useState(false);
+  const postTiming = useKeystrokeTiming();
 
   useEffect(() => {
     loadPosts();
@@ -522,7 +545,7 @@ const HomeFeedScreen = () => {
     setIsPosting(true);
     try {
       await postsAPI.createPost(newPost, {
-        typing_speed: 60 + Math.random() * 20,
+        ...postTiming.take(),
         session_id: 'session-' + Date.now()
       });
       setNewPost('');
@@ -571,6 +594,7 @@ const HomeFeedScreen = () => {
             style={[styles.createPostInput, { backgroundColor: colors.surface, color: colors.text, borderColor: colors.border }]}
             value={newPost}
             onChangeText={setNewPost}
+            onKeyPress={postTiming.onKeyPress}
             placeholder="What's on your mind?"
             placeholderTextColor={colors.textSecondary}
             multiline
@@ -700,16 +724,18 @@ const ChatScreen = ({ onNewChat }) => {
 const UserListScreen = ({ onBack, onSelectUser }) => {
   const colors = useContext(ThemeContext);
   const [users, setUsers] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
   const [isLoading, setIsLoading] = useState(true);
 
   useEffect(() => {
     loadUsers();
   }, []);
 
-  const loadUsers = async () => {
+  const loadUsers = async (cursor = null) => {
     try {
-      const response = await adminAPI.getAllUsers();
-      setUsers(response.data.users);
+      const response = await adminAPI.getAllUsers(cursor);
+      setUsers(prev => cursor ? [...prev, ...response.data.users] : response.data.users);
+      setNextCursor(response.data.next_cursor);
     } catch (error) {
       Alert.alert('Error', 'Failed to load users');
     } finally {
@@ -717,6 +743,13 @@ const UserListScreen = ({ onBack, onSelectUser }) => {
     }
   };
 
+  const loadMoreUsers = () => {
+    if (!nextCursor) return;
+    // Cleared first so repeated end-reached events don't refetch the same page
+    setNextCursor(null);
+    loadUsers(nextCursor);
+  };
+
   if (isLoading) {
     return (
       <View style={[styles.screen, styles.center, { backgroundColor: colors.background }]}>
@@ -738,6 +771,7 @@ const UserListScreen = ({ onBack, onSelectUser }) => {
       <FlatList
         data={users}
         keyExtractor={(item) => item.id.toString()}
+        onEndReached={loadMoreUsers}
         renderItem={({ item }) => (
           <TouchableOpacity
             style={[styles.userCard, { backgroundColor: colors.card }]}
@@ -764,6 +798,28 @@ const ChatDetailScreen = ({ userId, onBack }) => {
 
   useEffect(() => {
     loadMessages();
+
+    // New messages and read receipts are pushed instead of polled
+    let socket;
+    let cancelled = false;
+    messagesAPI.connect((event) => {
+      if (cancelled || event.peer_id !== userId) return;
+      if (event.type === 'message') {
+        setMessages(prev => prev.some(m => m.id === event.message.id) ? prev : [...prev, event.message]);
+      } else if (event.type === 'read') {
+        const readIds = new Set(event.message_ids);
+        setMessages(prev => prev.map(m => readIds.has(m.id) ? { ...m, is_read: true } : m));
+      }
+    }).then(s => {
+      // The screen may have closed while the socket was connecting
+      if (cancelled) s.close();
+      else socket = s;
+    });
+
+    return () => {
+      cancelled = true;
+      if (socket) socket.close();
+    };
   }, []);
 
   const loadMessages = async () => {
@@ -780,9 +836,10 @@ const ChatDetailScreen = ({ userId, onBack }) => {
   const handleSendMessage = async () => {
     if (!message.trim()) return;
     try {
-      await messagesAPI.sendMessage(userId, message);
+      const response = await messagesAPI.sendMessage(userId, message);
+      const sent = response.data.message;
       setMessage('');
-      loadMessages();
+      setMessages(prev => prev.some(m => m.id === sent.id) ? prev : [...prev, sent]);
     } catch (error) {
       Alert.alert('Error', 'Failed to send message');
     }
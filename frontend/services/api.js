@@ -93,6 +93,15 @@ export const messagesAPI = {
   
   sendMessage: (receiverId, text) =>
     api.post('/messages', { receiver_id: receiverId, text }),
+  
+  // Push channel for new messages and read receipts; returns the socket
+  connect: async (onEvent) => {
+    const token = await AsyncStorage.getItem('access_token');
+    const wsUrl = API_BASE_URL.replace(/^http/, 'ws');
+    const socket = new WebSocket(`${wsUrl}/messages/ws?token=${encodeURIComponent(token)}`);
+    socket.onmessage = (event) => onEvent(JSON.parse(event.data));
+    return socket;
+  },
 };
 
 export const securityAPI = {
@@ -110,7 +119,8 @@ export const adminAPI = {
       params: { page, per_page: perPage, risk_level: riskLevel } 
     }),
   
-  getAllUsers: () => api.get('/admin/users'),
+  getAllUsers: (cursor = null, filters = {}) =>
+    api.get('/admin/users', { params: { cursor, ...filters } }),
   
   lockUser: (userId) => api.post(`/admin/users/${userId}/lock`),
   